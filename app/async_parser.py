@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from functools import partial
+from itertools import islice
+from os import PathLike
+from typing import TYPE_CHECKING
+
+__all__ = ["AsyncSqliteParser"]
+
+from app.cursor import table_root
+from app.models import Page
+from app.pager import PreadPageSource
+from app.parser import SqliteParser
+
+if TYPE_CHECKING:
+    from app.plans import QueryPlan, TableScan
+
+DEFAULT_WORKERS = 4
+DEFAULT_PREFETCH = 8
+# Rows a query other than a full scan hands back per trip to the pool.
+BATCH_SIZE = 1024
+
+
+class AsyncSqliteParser:
+    """An asyncio front end to SqliteParser.
+
+    Full table scans read their leaf pages on a bounded thread pool, keeping
+    up to `prefetch` reads in flight ahead of the rows being decoded. All
+    decoding runs on the pool too, and rows come back in batches, so the
+    event loop never blocks on the file. The wrapped parser, with its caches
+    and plans, is used by one thread at a time.
+    """
+
+    def __init__(
+        self,
+        db_path: PathLike,
+        *,
+        workers: int = DEFAULT_WORKERS,
+        prefetch: int = DEFAULT_PREFETCH,
+        stream_blobs=False,
+    ):
+        # pread keeps no file position, so pool threads can share the file.
+        self.page_source = PreadPageSource(db_path)
+        self.parser = SqliteParser(
+            db_path, page_source=self.page_source, stream_blobs=stream_blobs
+        )
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="sqlite-reader")
+        self.prefetch = prefetch
+        self._lock = threading.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        await self._run(self.parser.__exit__, None, None, None)
+        self.executor.shutdown()
+        self.page_source.close()
+
+    def _locked(self, function: Callable, *args):
+        with self._lock:
+            return function(*args)
+
+    async def _run(self, function: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self._locked, function, *args)
+        )
+
+    async def read_page(self, page_number: int) -> Page:
+        loop = asyncio.get_running_loop()
+        buffer = await loop.run_in_executor(
+            self.executor, self.page_source.get_page, page_number
+        )
+        return Page.from_buffer(page_number, buffer)
+
+    async def db_info(self):
+        return await self._run(self.parser.db_info)
+
+    async def tables(self):
+        return await self._run(self.parser.tables)
+
+    async def leaf_page_numbers(self, root_page: int) -> list[int]:
+        """Like TableCursor.leaf_page_numbers, reading each level concurrently."""
+        known = self.parser.known_leaf_pages(root_page)
+        if known is not None:
+            return known
+        level = [table_root(await self.read_page(root_page))]
+        while not level[0].is_leaf:
+            numbers = [child for page in level for child in page.child_pages()]
+            first = await self.read_page(numbers[0])
+            if first.is_leaf:
+                return numbers
+            level = [first] + list(
+                await asyncio.gather(*map(self.read_page, numbers[1:]))
+            )
+        return [root_page]
+
+    async def scan_pages(self, page_numbers: list[int]) -> AsyncIterator[Page]:
+        """Yield pages in order while the next `prefetch` reads are in flight."""
+        numbers = iter(page_numbers)
+        pending = deque()
+
+        def schedule():
+            for page_number in numbers:
+                pending.append(asyncio.ensure_future(self.read_page(page_number)))
+                if len(pending) >= self.prefetch:
+                    return
+
+        schedule()
+        try:
+            while pending:
+                page = await pending.popleft()
+                schedule()
+                yield page
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def rows(self, sql: str) -> AsyncIterator[tuple]:
+        """Iterate over the result rows of sql, a batch at a time."""
+        plan = await self._run(self.parser.prepare, sql)
+        if plan.scan is None:
+            stream = self.plan_rows(plan)
+        else:
+            stream = self.scan_rows(plan.scan)
+        async with aclosing(stream) as batches:
+            async for batch in batches:
+                for row in batch:
+                    yield row
+
+    async def plan_rows(self, plan: "QueryPlan") -> AsyncIterator[list[tuple]]:
+        """Run a plan on the pool, BATCH_SIZE rows per trip."""
+
+        def start():
+            result = plan.run()
+            return iter([(result,)] if plan.command.is_count() else result)
+
+        def next_batch():
+            return list(islice(rows, BATCH_SIZE))
+
+        rows = await self._run(start)
+        try:
+            while batch := await self._run(next_batch):
+                yield batch
+        finally:
+            if hasattr(rows, "close"):
+                await self._run(rows.close)
+
+    async def scan_rows(self, scan: "TableScan") -> AsyncIterator[list[tuple]]:
+        """The rows of a full table scan, one leaf page per batch.
+
+        Leaf pages are read ahead without the lock; each is decoded, with any
+        overflow pages its records spill onto, on the pool under it.
+        """
+        if scan.limit == 0:
+            return
+        # Leaf pages bypass the page cache, so a large scan does not flush it
+        # for other queries.
+        page_numbers = await self.leaf_page_numbers(scan.cell.root_page)
+        remaining = scan.limit
+        decode = self.parser.decode_lazy_record
+
+        def decode_page(page: Page) -> list[tuple]:
+            records = (decode(page.buffer, offset) for offset in page.cell_offsets)
+            if scan.predicate is not None:
+                records = filter(scan.predicate, records)
+            return [
+                tuple(get(record) for get in scan.getters)
+                for record in islice(records, remaining)
+            ]
+
+        async with aclosing(self.scan_pages(page_numbers)) as pages:
+            async for page in pages:
+                batch = await self._run(decode_page, page)
+                if batch:
+                    yield batch
+                if remaining is not None:
+                    remaining -= len(batch)
+                    if remaining == 0:
+                        return
+
+    async def sql(self, sql: str):
+        """The rows of sql, or the count for count(*); nothing is printed."""
+        plan = await self._run(self.parser.prepare, sql)
+        if plan.command.is_count():
+            return await self._run(plan.run)
+        return [row async for row in self.rows(sql)]
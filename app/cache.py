@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import RLock
+
+__all__ = ["CacheStats", "PageCache", "PlanCache"]
+
+DEFAULT_CACHE_SIZE = 8 * 1024 * 1024
+DEFAULT_PLAN_CACHE_SIZE = 1024
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PageCache:
+    """LRU cache of decoded pages with a byte budget.
+
+    Pinned pages count towards the budget but are never evicted. All
+    operations hold a lock, so one cache can be shared between threads.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = CacheStats()
+        # Unpinned entries in LRU order; pinned ones live apart so that
+        # eviction never has to skip over them.
+        self._entries = OrderedDict()
+        self._pinned_entries = {}
+        self._pinned_keys = set()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries) + len(self._pinned_entries)
+
+    def __contains__(self, key):
+        return key in self._entries or key in self._pinned_entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._pinned_entries.get(key)
+            if entry is None:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.stats.misses += 1
+                    return None
+                self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int):
+        with self._lock:
+            self.discard(key)
+            if key in self._pinned_keys:
+                self._pinned_entries[key] = (value, size)
+            else:
+                self._entries[key] = (value, size)
+            self.size += size
+            self.evict()
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None) or self._pinned_entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def pin(self, key):
+        with self._lock:
+            self._pinned_keys.add(key)
+            if key in self._entries:
+                self._pinned_entries[key] = self._entries.pop(key)
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned_keys.discard(key)
+            if key in self._pinned_entries:
+                self._entries[key] = self._pinned_entries.pop(key)
+                self.evict()
+
+    def evict(self):
+        with self._lock:
+            while self.size > self.max_bytes and self._entries:
+                _, (_, size) = self._entries.popitem(last=False)
+                self.size -= size
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pinned_entries.clear()
+            self.size = 0
+
+
+class PlanCache:
+    """LRU cache of query plans keyed by SQL text.
+
+    Plans depend on the schema, so the whole cache belongs to one version of
+    the database, the (file_change_counter, schema_cookie) pair, and is
+    emptied when that changes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_PLAN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.version = None
+        self.stats = CacheStats()
+        self._plans = OrderedDict()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def __contains__(self, sql):
+        return sql in self._plans
+
+    def get(self, sql):
+        plan = self._plans.get(sql)
+        if plan is None:
+            self.stats.misses += 1
+            return None
+        self._plans.move_to_end(sql)
+        self.stats.hits += 1
+        return plan
+
+    def put(self, sql, plan):
+        self._plans[sql] = plan
+        self._plans.move_to_end(sql)
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+            self.stats.evictions += 1
+
+    def reset(self, version):
+        self._plans.clear()
+        self.version = version
@@ -0,0 +1,203 @@
+from dataclasses import dataclass, replace
+from typing import Any
+
+from app.cursor import TableCursor
+from app.models import Cell
+from app.utils import Range, is_finite_number, sort_key
+
+__all__ = ["AccessPath", "TreeStats", "candidate_paths", "lookup_paths", "tree_stats"]
+
+SCAN = "scan"
+ROWID = "rowid"
+INDEX = "index"
+# A full scan of an index that holds every column the query reads.
+INDEX_SCAN = "index scan"
+
+# Without statistics an equality on an index is taken to match this many
+# rows, the same guess SQLite makes.
+EQUALITY_ROWS = 10
+
+
+@dataclass(frozen=True, slots=True)
+class TreeStats:
+    """The shape of a B-tree, estimated from its left edge."""
+
+    depth: int
+    leaf_pages: float
+    rows: float
+    min_row_id: int | None = None
+    max_row_id: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class AccessPath:
+    """One way to reach the rows of a table, with what it should cost.
+
+    cost is the estimated number of pages read, rows the estimated number
+    of rows the path yields before the WHERE clause is rechecked.
+    """
+
+    kind: str
+    cost: float
+    rows: float
+    column: str | None = None
+    value: Any = None
+    index_cell: Cell | None = None
+    # Whether the index entries alone answer the query, so the table
+    # B-tree is never read.
+    covering: bool = False
+
+    def describe(self, table_name: str) -> str:
+        index = f"{'COVERING ' if self.covering else ''}INDEX"
+        if self.kind == ROWID:
+            using = f"INTEGER PRIMARY KEY ({self.condition('rowid')})"
+            text = f"SEARCH {table_name} USING {using}"
+        elif self.kind == INDEX:
+            using = f"{index} {self.index_cell.name} ({self.condition(self.column)})"
+            text = f"SEARCH {table_name} USING {using}"
+        elif self.kind == INDEX_SCAN:
+            text = f"SCAN {table_name} USING {index} {self.index_cell.name}"
+        else:
+            text = f"SCAN {table_name}"
+        return f"{text} (~{self.rows:.0f} rows, ~{self.cost:.0f} pages)"
+
+    def condition(self, column: str) -> str:
+        if not isinstance(self.value, Range):
+            return f"{column}=?"
+        bounds = []
+        if self.value.low is not None:
+            bounds.append(f"{column}>{'=' if self.value.low_inclusive else ''}?")
+        if self.value.high is not None:
+            bounds.append(f"{column}<{'=' if self.value.high_inclusive else ''}?")
+        return " AND ".join(bounds)
+
+
+def tree_stats(parser, root_page: int, *, table=True) -> TreeStats:
+    """Estimate the size of the B-tree at root_page reading only its edges.
+
+    Each level holds about as many pages as the level above times the
+    fanout of its leftmost page; on the root level that count is exact.
+    Rows per leaf are sampled from the leftmost leaf too, since the right
+    edge is where appends leave pages part-filled.
+    """
+    page = parser.get_page(root_page)
+    depth = 1
+    pages = 1.0
+    while not page.is_leaf:
+        pages *= len(page.cell_offsets) + 1
+        page = parser.get_page(page.child_page(0))
+        depth += 1
+    # The tree can never have more leaves than the file has pages.
+    size_in_pages = parser.schema_table.db_header.size_in_pages
+    pages = min(pages, size_in_pages) if size_in_pages else pages
+    rows = pages * len(page.cell_offsets)
+    if not table or not rows:
+        return TreeStats(depth, pages, rows)
+    cursor = TableCursor(parser, root_page)
+    min_row_id = cursor.leaf_row_id(page.buffer, page.cell_offsets[0])
+    last = parser.get_page(root_page)
+    while not last.is_leaf:
+        last = parser.get_page(last.right_most_pointer)
+    max_row_id = cursor.leaf_row_id(last.buffer, last.cell_offsets[-1])
+    return TreeStats(depth, pages, rows, min_row_id, max_row_id)
+
+
+def range_fraction(stats: TreeStats, value: Range) -> float:
+    """Share of the table's rowids that fall in value, assuming they are dense."""
+    start, stop = value.row_id_bounds()
+    low = stats.min_row_id if start is None else max(start, stats.min_row_id)
+    high = stats.max_row_id if stop is None else min(stop, stats.max_row_id)
+    span = stats.max_row_id - stats.min_row_id + 1
+    return max(0, high - low + 1) / span
+
+
+def candidate_paths(
+    parser, table_cell: Cell, conditions: dict, columns: set[str] | None = None
+) -> list[AccessPath]:
+    """Every usable access path for conditions, seeks first, full scans last.
+
+    columns are the columns the query reads, None for all of them. An index
+    holding each of them, or the rowid, answers the query from its own
+    pages, by a seek on its first column or by a scan of all its entries.
+    """
+    table = parser.tree_stats(table_cell.root_page)
+    index_cells = parser.get_index_cells(table_cell.tbl_name)
+    covering = [
+        index_cell
+        for index_cell in index_cells
+        if columns is not None
+        and all(
+            column in index_cell.columns or table_cell.is_rowid(column)
+            for column in columns
+        )
+    ]
+    paths = []
+    for column, value in conditions.items():
+        if table_cell.is_rowid(column):
+            if not isinstance(value, Range):
+                if is_finite_number(value):
+                    paths.append(AccessPath(ROWID, table.depth, 1, column, value))
+                continue
+            if not value.is_finite():
+                # Text or infinite bounds leave nothing to seek to.
+                continue
+            fraction = range_fraction(table, value) if table.rows else 1.0
+            cost = table.depth - 1 + max(1.0, fraction * table.leaf_pages)
+            paths.append(AccessPath(ROWID, cost, fraction * table.rows, column, value))
+        elif not isinstance(value, Range):
+            for index_cell in index_cells:
+                if index_cell.columns[:1] != [column]:
+                    continue
+                index = parser.tree_stats(index_cell.root_page, table=False)
+                rows = min(EQUALITY_ROWS, table.rows)
+                if not in_range(
+                    parser.column_range(table_cell.root_page, column), value
+                ):
+                    rows = 0
+                is_covering = index_cell in covering
+                if is_covering:
+                    per_leaf = index.rows / index.leaf_pages if index.rows else 1
+                    cost = index.depth - 1 + max(1.0, rows / per_leaf)
+                else:
+                    # Every entry found costs one more descent of the table.
+                    cost = index.depth + rows * table.depth
+                path = AccessPath(INDEX, cost, rows, column, value, index_cell)
+                paths.append(replace(path, covering=is_covering))
+    for index_cell in covering:
+        index = parser.tree_stats(index_cell.root_page, table=False)
+        cost = index.depth - 1 + index.leaf_pages
+        paths.append(
+            AccessPath(
+                INDEX_SCAN, cost, table.rows, index_cell=index_cell, covering=True
+            )
+        )
+    scan_cost = table.depth - 1 + table.leaf_pages
+    paths.append(AccessPath(SCAN, scan_cost, table.rows))
+    return paths
+
+
+def lookup_paths(parser, table_cell: Cell, column: str) -> list[AccessPath]:
+    """Ways to seek the rows of table_cell by one value of column.
+
+    These are the inner side of an index nested-loop join; cost and rows
+    are per lookup.
+    """
+    table = parser.tree_stats(table_cell.root_page)
+    if table_cell.is_rowid(column):
+        return [AccessPath(ROWID, table.depth, min(1, table.rows), column)]
+    paths = []
+    for index_cell in parser.get_index_cells(table_cell.tbl_name):
+        if index_cell.columns[:1] == [column]:
+            index = parser.tree_stats(index_cell.root_page, table=False)
+            rows = min(EQUALITY_ROWS, table.rows)
+            cost = index.depth + rows * table.depth
+            paths.append(AccessPath(INDEX, cost, rows, column, index_cell=index_cell))
+    return paths
+
+
+def in_range(bounds: list | None, value) -> bool:
+    """Whether value can lie within a column's known [min, max]."""
+    if bounds is None:
+        return True
+    low, high = bounds
+    return sort_key(low) <= sort_key(value) <= sort_key(high)
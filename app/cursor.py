@@ -0,0 +1,233 @@
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Sequence
+
+__all__ = ["IndexCursor", "TableCursor"]
+
+from app.models import Page, Record
+from app.pager import coalesce_pages
+from app.utils import sort_key
+
+# Pages this far apart are still fetched in one read during read-ahead.
+READ_AHEAD_GAP = 4
+
+
+def table_root(page: Page) -> Page:
+    """page, checked to be the root of a table B-tree."""
+    if not page.is_table:
+        # A WITHOUT ROWID table is stored in an index B-tree.
+        raise ValueError("WITHOUT ROWID tables are not supported")
+    return page
+
+
+class CellKeys(Sequence):
+    """Keys of a page's cells, decoded only when bisect probes them."""
+
+    def __init__(self, page: Page, key):
+        self.page = page
+        self.key = key
+
+    def __len__(self):
+        return len(self.page.cell_offsets)
+
+    def __getitem__(self, i):
+        return self.key(self.page.buffer, self.page.cell_offsets[i])
+
+
+class TableCursor:
+    """Walks a table B-tree of any depth and yields its rows in rowid order."""
+
+    def __init__(self, parser, root_page: int, *, lazy=False, read_ahead: int = 0):
+        self.parser = parser
+        self.root_page = root_page
+        self.decode = parser.decode_lazy_record if lazy else parser.decode_record
+        # Full scans read this many leaf pages at a time in bulk when set.
+        self.read_ahead = read_ahead
+
+    def __iter__(self) -> Iterator[Record]:
+        return self.scan()
+
+    def count(self) -> int:
+        pages = self.read_ahead_pages() if self.read_ahead else self.leaf_pages()
+        return sum(page.header.cell_count for page in pages)
+
+    def interior_key(self, buffer, offset: int) -> int:
+        return self.parser.get_varint(buffer, offset + 4)[0]
+
+    def leaf_row_id(self, buffer, offset: int) -> int:
+        _, offset = self.parser.get_varint(buffer, offset)
+        return self.parser.get_varint(buffer, offset)[0]
+
+    def root(self) -> Page:
+        return table_root(self.parser.get_page(self.root_page))
+
+    def leaf_pages(self, row_id: int | None = None) -> Iterator[Page]:
+        """Leaf pages in rowid order, starting with the one that holds row_id."""
+        # Depth-first with an explicit stack of lazily read children, so
+        # memory stays proportional to the depth of the tree.
+        get_page = self.parser.get_page
+        stack = [iter((self.root(),))]
+        while stack:
+            page = next(stack[-1], None)
+            if page is None:
+                stack.pop()
+            elif page.is_leaf:
+                yield page
+            elif row_id is None:
+                stack.append(map(get_page, page.child_pages()))
+            else:
+                # Skip the children whose rowids all sort before row_id.
+                start = bisect_left(CellKeys(page, self.interior_key), row_id)
+                stack.append(map(get_page, page.child_pages(start)))
+
+    def leaf_page_numbers(self) -> list[int]:
+        """Numbers of all leaf pages in rowid order, without reading the leaves.
+
+        Every leaf of a B-tree sits at the same depth, so the interior pages
+        are read one level at a time and only the first child of the last
+        level is opened to find out that it is a leaf. A current sidecar
+        already lists them.
+        """
+        known = self.parser.known_leaf_pages(self.root_page)
+        if known is not None:
+            return known
+        level = [self.root_page]
+        page = self.root()
+        while not page.is_leaf:
+            level = [
+                child
+                for page_number in level
+                for child in self.parser.get_page(page_number).child_pages()
+            ]
+            page = self.parser.get_page(level[0])
+        return level
+
+    def read_ahead_pages(self) -> Iterator[Page]:
+        """All leaf pages in rowid order, fetched with bulk sequential reads.
+
+        The leaves are taken read_ahead at a time. Within such a window
+        the page numbers are sorted and merged into contiguous runs, one
+        read each, and the kernel is told about the next window while the
+        current one is decoded. The pages bypass the page cache, which a
+        full scan would only flush.
+        """
+        source = self.parser.page_source
+        page_size = source.page_size
+        page_numbers = self.leaf_page_numbers()
+        windows = [
+            coalesce_pages(
+                page_numbers[i : i + self.read_ahead],
+                max_gap=READ_AHEAD_GAP,
+            )
+            for i in range(0, len(page_numbers), self.read_ahead)
+        ]
+        for i, runs in enumerate(windows):
+            if i + 1 < len(windows):
+                for first, count in windows[i + 1]:
+                    source.will_need(first, count)
+            buffers = {}
+            for first, count in runs:
+                data = source.read_run(first, count)
+                for j in range(count):
+                    buffers[first + j] = data[j * page_size : (j + 1) * page_size]
+            window = page_numbers[i * self.read_ahead : (i + 1) * self.read_ahead]
+            for page_number in window:
+                yield Page.from_buffer(page_number, buffers[page_number])
+
+    def scan_pages(self, page_numbers: Iterable[int]) -> Iterator[Record]:
+        """Yield the rows stored on the given leaf pages."""
+        for page_number in page_numbers:
+            page = self.parser.get_page(page_number)
+            for offset in page.cell_offsets:
+                yield self.decode(page.buffer, offset)
+
+    def scan(self, start: int | None = None, stop: int | None = None):
+        """Yield the rows with start <= rowid <= stop, in rowid order."""
+        if self.read_ahead and start is None:
+            pages = self.read_ahead_pages()
+        else:
+            pages = self.leaf_pages(start)
+        for page in pages:
+            first = 0
+            if start is not None:
+                first = bisect_left(CellKeys(page, self.leaf_row_id), start)
+            for offset in page.cell_offsets[first:]:
+                record = self.decode(page.buffer, offset)
+                if stop is not None and record.row_id > stop:
+                    return
+                yield record
+
+    def seek(self, row_id: int) -> Record | None:
+        page = self.root()
+        while not page.is_leaf:
+            # Each interior key is the largest rowid in its left child.
+            i = bisect_left(CellKeys(page, self.interior_key), row_id)
+            page = self.parser.get_page(page.child_page(i))
+        keys = CellKeys(page, self.leaf_row_id)
+        i = bisect_left(keys, row_id)
+        if i < len(keys) and keys[i] == row_id:
+            return self.decode(page.buffer, page.cell_offsets[i])
+        return None
+
+
+class IndexCursor:
+    """Reads an index B-tree: seeks entries matching a key prefix, or scans them all."""
+
+    def __init__(self, parser, root_page: int):
+        self.parser = parser
+        self.root_page = root_page
+
+    def read_entry(self, page: Page, offset: int) -> Record:
+        if not page.is_leaf:
+            # Skip the left child pointer of interior cells.
+            offset += 4
+        return self.parser.decode_index_record(page.buffer, offset)
+
+    def seek(self, *key) -> Iterator[Record]:
+        target = tuple(sort_key(value) for value in key)
+        yield from self._seek(self.root_page, target)
+
+    def _seek(self, page_number: int, target: tuple) -> Iterator[Record]:
+        page = self.parser.get_page(page_number)
+
+        def entry_key(entry):
+            return tuple(sort_key(value) for value in entry.values[: len(target)])
+
+        keys = CellKeys(
+            page, lambda _, offset: entry_key(self.read_entry(page, offset))
+        )
+        for i in range(bisect_left(keys, target), len(keys)):
+            # Entries in the left child sort before the interior cell's own
+            # entry, so they have to be visited first.
+            if not page.is_leaf:
+                yield from self._seek(page.child_page(i), target)
+            entry = self.read_entry(page, page.cell_offsets[i])
+            if entry_key(entry) != target:
+                return
+            yield entry
+        if not page.is_leaf:
+            yield from self._seek(page.right_most_pointer, target)
+
+    def scan(self) -> Iterator[Record]:
+        """Yield every entry in key order."""
+        yield from self._scan(self.root_page)
+
+    def _scan(self, page_number: int) -> Iterator[Record]:
+        page = self.parser.get_page(page_number)
+        for i, offset in enumerate(page.cell_offsets):
+            if not page.is_leaf:
+                yield from self._scan(page.child_page(i))
+            yield self.read_entry(page, offset)
+        if not page.is_leaf:
+            yield from self._scan(page.right_most_pointer)
+
+    def count(self) -> int:
+        """Number of entries, read off the cell counts without decoding any."""
+        # Interior cells of an index B-tree hold entries of their own.
+        count = 0
+        stack = [self.root_page]
+        while stack:
+            page = self.parser.get_page(stack.pop())
+            count += page.header.cell_count
+            if not page.is_leaf:
+                stack.extend(page.child_pages())
+        return count
@@ -0,0 +1,193 @@
+from functools import lru_cache
+from struct import Struct
+
+__all__ = [
+    "compile_header",
+    "decode_payload",
+    "decode_value",
+    "decode_values",
+    "header_layout",
+    "read_record_header",
+    "read_varint",
+    "serial_type_size",
+]
+
+_INT8 = Struct(">b").unpack_from
+_INT16 = Struct(">h").unpack_from
+_INT32 = Struct(">i").unpack_from
+_INT64 = Struct(">q").unpack_from
+_FLOAT64 = Struct(">d").unpack_from
+
+
+def _int24(buffer, offset):
+    return (int.from_bytes(buffer[offset : offset + 3], "big", signed=True),)
+
+
+def _int48(buffer, offset):
+    return (int.from_bytes(buffer[offset : offset + 6], "big", signed=True),)
+
+
+def _constant(value):
+    return lambda buffer, offset: (value,)
+
+
+# struct codes for the serial types struct can unpack natively.
+STRUCT_CODES = {1: "b", 2: "h", 4: "i", 6: "q", 7: "d"}
+# Serial types whose value is implied by the type and takes no body bytes.
+CONSTANTS = {0: None, 8: 0, 9: 1}
+
+# Serial types 0-9 have a fixed content size and a decoder returning a
+# 1-tuple, like struct.unpack_from; 10 and 11 are reserved.
+FIXED_SIZES = (0, 1, 2, 3, 4, 6, 8, 8, 0, 0)
+FIXED_DECODERS = (
+    _constant(None),
+    _INT8,
+    _INT16,
+    _int24,
+    _INT32,
+    _int48,
+    _INT64,
+    _FLOAT64,
+    _constant(0),
+    _constant(1),
+)
+
+
+def read_varint(buffer, offset: int) -> tuple[int, int]:
+    """Decode the varint at buffer[offset], returning it and the next offset."""
+    byte = buffer[offset]
+    if byte < 0x80:
+        return byte, offset + 1
+    result = byte & 0x7F
+    for i in range(1, 8):
+        byte = buffer[offset + i]
+        result = (result << 7) | (byte & 0x7F)
+        if byte < 0x80:
+            return result, offset + i + 1
+    # The ninth byte contributes all 8 of its bits.
+    return (result << 8) | buffer[offset + 8], offset + 9
+
+
+def read_record_header(buffer, offset: int) -> tuple[list[int], int]:
+    """Read a record header in one pass.
+
+    Returns the serial types and the offset where the record body starts.
+    """
+    header_size, position = read_varint(buffer, offset)
+    body_offset = offset + header_size
+    serial_types = []
+    append = serial_types.append
+    while position < body_offset:
+        byte = buffer[position]
+        if byte < 0x80:
+            # Single-byte serial types cover every fixed-width value and
+            # TEXT/BLOB up to 57 bytes.
+            append(byte)
+            position += 1
+        else:
+            serial_type, position = read_varint(buffer, position)
+            append(serial_type)
+    return serial_types, body_offset
+
+
+def serial_type_size(serial_type: int) -> int:
+    if serial_type >= 12:
+        return (serial_type - 12) >> 1
+    if serial_type >= 10:
+        raise ValueError(f"Invalid serial type code: {serial_type}")
+    return FIXED_SIZES[serial_type]
+
+
+def decode_value(buffer, offset: int, serial_type: int):
+    if serial_type >= 12:
+        end = offset + ((serial_type - 12) >> 1)
+        if serial_type & 1:
+            return str(buffer[offset:end], "utf-8"), end
+        return bytes(buffer[offset:end]), end
+    if serial_type >= 10:
+        raise ValueError(f"Invalid serial type code: {serial_type}")
+    size = FIXED_SIZES[serial_type]
+    return FIXED_DECODERS[serial_type](buffer, offset)[0], offset + size
+
+
+def decode_values(buffer, offset: int, serial_types) -> list:
+    values = []
+    append = values.append
+    for serial_type in serial_types:
+        if serial_type >= 12:
+            end = offset + ((serial_type - 12) >> 1)
+            if serial_type & 1:
+                append(str(buffer[offset:end], "utf-8"))
+            else:
+                append(bytes(buffer[offset:end]))
+            offset = end
+        elif serial_type < 10:
+            append(FIXED_DECODERS[serial_type](buffer, offset)[0])
+            offset += FIXED_SIZES[serial_type]
+        else:
+            raise ValueError(f"Invalid serial type code: {serial_type}")
+    return values
+
+
+def _decode_text(data):
+    return str(data, "utf-8")
+
+
+def _decode_int(data):
+    return int.from_bytes(data, "big", signed=True)
+
+
+@lru_cache(maxsize=4096)
+def compile_header(header: bytes):
+    """Compile a raw record header into one struct unpacker for the body.
+
+    Returns the unpacker and (index, converter) fix-ups for the values struct
+    cannot produce directly: TEXT, 24/48-bit integers and the constants.
+    Rows of a table mostly share a handful of headers, so this is cached.
+    """
+    serial_types, _ = read_record_header(header, 0)
+    codes = [">"]
+    fixups = []
+    for i, serial_type in enumerate(serial_types):
+        if serial_type >= 12:
+            codes.append(f"{serial_type_size(serial_type)}s")
+            if serial_type & 1:
+                fixups.append((i, _decode_text))
+        elif serial_type in STRUCT_CODES:
+            codes.append(STRUCT_CODES[serial_type])
+        elif serial_type in (3, 5):
+            codes.append(f"{FIXED_SIZES[serial_type]}s")
+            fixups.append((i, _decode_int))
+        elif serial_type in CONSTANTS:
+            codes.append("0s")
+            constant = CONSTANTS[serial_type]
+            fixups.append((i, lambda _, constant=constant: constant))
+        else:
+            raise ValueError(f"Invalid serial type code: {serial_type}")
+    return Struct("".join(codes)).unpack_from, tuple(fixups)
+
+
+def decode_payload(buffer, offset: int) -> tuple[int, tuple]:
+    """Decode the record at buffer[offset], returning its header size and values."""
+    header_size, _ = read_varint(buffer, offset)
+    body_offset = offset + header_size
+    unpack, fixups = compile_header(bytes(buffer[offset:body_offset]))
+    values = unpack(buffer, body_offset)
+    if not fixups:
+        return header_size, values
+    values = list(values)
+    for i, convert in fixups:
+        values[i] = convert(values[i])
+    return header_size, tuple(values)
+
+
+@lru_cache(maxsize=4096)
+def header_layout(header: bytes) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """Serial types of a raw record header and each column's offset in the body."""
+    serial_types, _ = read_record_header(header, 0)
+    offsets = []
+    offset = 0
+    for serial_type in serial_types:
+        offsets.append(offset)
+        offset += serial_type_size(serial_type)
+    return tuple(serial_types), tuple(offsets)
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from itertools import islice
+from os import PathLike
+from typing import TextIO
+
+__all__ = ["FORMATS", "open_output", "write_rows"]
+
+FORMATS = ("csv", "jsonl", "tsv")
+# Rows are formatted and handed to the writer this many at a time.
+CHUNK_SIZE = 4096
+BUFFER_SIZE = 1 << 20
+
+
+@contextmanager
+def open_output(path: PathLike | str | None = None) -> Iterator[TextIO]:
+    """A text stream with a large write buffer over path, or stdout for None or "-"."""
+    if path is None or str(path) == "-":
+        if not hasattr(sys.stdout, "buffer"):
+            yield sys.stdout
+            return
+        sys.stdout.flush()
+        stream = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="")
+        try:
+            yield stream
+        finally:
+            stream.flush()
+            # Leave stdout itself open for whoever writes next.
+            stream.detach()
+        return
+    with open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as stream:
+        yield stream
+
+
+def text_value(value):
+    # BLOBs are written as hex, like sqlite3's hex() would show them.
+    return value.hex() if isinstance(value, bytes | bytearray) else value
+
+
+def unique_names(names: list[str]) -> list[str]:
+    # A join can select two columns of one name; like sqlite3 naming the
+    # columns of a view, later ones get a ":1", ":2", ... suffix.
+    seen = set()
+    unique = []
+    for name in names:
+        label, n = name, 0
+        while label in seen:
+            n += 1
+            label = f"{name}:{n}"
+        seen.add(label)
+        unique.append(label)
+    return unique
+
+
+def write_rows(
+    stream: TextIO,
+    rows: Iterable[tuple],
+    names: list[str],
+    output_format: str = "csv",
+    *,
+    header=True,
+) -> int:
+    """Write rows to stream as CSV, TSV or JSON Lines; returns the row count.
+
+    Rows are consumed CHUNK_SIZE at a time, so memory stays bounded however
+    many rows the query yields.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    rows = iter(rows)
+    count = 0
+    if output_format == "jsonl":
+        encode = json.JSONEncoder(ensure_ascii=False, default=text_value).encode
+        names = unique_names(names)
+        while chunk := list(islice(rows, CHUNK_SIZE)):
+            stream.write("".join(encode(dict(zip(names, row))) + "\n" for row in chunk))
+            count += len(chunk)
+        return count
+
+    delimiter = "\t" if output_format == "tsv" else ","
+    writer = csv.writer(stream, delimiter=delimiter, lineterminator="\n")
+    if header:
+        writer.writerow(names)
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        writer.writerows(
+            tuple(map(text_value, row))
+            if any(isinstance(value, bytes) for value in row)
+            else row
+            for row in chunk
+        )
+        count += len(chunk)
+    return count
@@ -0,0 +1,217 @@
+import json
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Any, TextIO
+
+from app.pager import PageSource
+
+__all__ = [
+    "Instrumentation",
+    "InstrumentedPageSource",
+    "JsonSink",
+    "LoggingSink",
+    "QueryStats",
+    "format_stats",
+]
+
+
+@dataclass
+class QueryStats:
+    """What one query cost, collected while instrumentation is on."""
+
+    sql: str = ""
+    pages_read: int = 0
+    bytes_read: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    records_decoded: int = 0
+    # Varints read for cell headers and B-tree keys; record bodies are
+    # unpacked by compiled structs and do not go through them one by one.
+    varints_parsed: int = 0
+    rows_filtered: int = 0
+    rows_returned: int = 0
+    plan_seconds: float = 0.0
+    execute_seconds: float = 0.0
+    output_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class InstrumentedPageSource(PageSource):
+    """Counts the pages and bytes read through another page source."""
+
+    def __init__(self, source: PageSource, instrumentation: "Instrumentation"):
+        super().__init__(source.page_size, source.file_size)
+        self.source = source
+        self.instrumentation = instrumentation
+
+    def get_page(self, page_number: int) -> memoryview:
+        stats = self.instrumentation.current
+        stats.pages_read += 1
+        stats.bytes_read += self.page_size
+        return self.source.get_page(page_number)
+
+    def read_run(self, first: int, count: int) -> memoryview:
+        stats = self.instrumentation.current
+        stats.pages_read += count
+        stats.bytes_read += self.page_size * count
+        return self.source.read_run(first, count)
+
+    def will_need(self, first: int, count: int):
+        self.source.will_need(first, count)
+
+    def read_header(self) -> bytes:
+        return self.source.read_header()
+
+    def refresh(self):
+        self.source.refresh()
+        self.page_size = self.source.page_size
+        self.file_size = self.source.file_size
+
+    def close(self):
+        self.source.close()
+
+
+class Instrumentation:
+    """Collects QueryStats for each query a parser runs and passes them to sinks.
+
+    A sink is any callable taking the finished QueryStats. Nothing is
+    wrapped until install(), so a parser without instrumentation pays
+    nothing for it.
+    """
+
+    def __init__(self, *sinks: Callable[[QueryStats], Any]):
+        self.sinks = list(sinks)
+        self.current = QueryStats()
+        self.last: QueryStats | None = None
+
+    def install(self, parser):
+        """Wrap the parser's page source and decoding hot paths with counters."""
+        parser.page_source = InstrumentedPageSource(parser.page_source, self)
+
+        def counted(decode):
+            def decode_counted(buffer, offset):
+                self.current.records_decoded += 1
+                return decode(buffer, offset)
+
+            return decode_counted
+
+        # Cursors look these up on the parser, so instance attributes win.
+        for name in ("decode_record", "decode_lazy_record", "decode_index_record"):
+            setattr(parser, name, counted(getattr(parser, name)))
+
+        get_varint = parser.get_varint
+
+        def get_varint_counted(buffer, offset):
+            self.current.varints_parsed += 1
+            return get_varint(buffer, offset)
+
+        parser.get_varint = get_varint_counted
+
+        compile_where = parser.compile_where
+
+        def compile_where_counted(cell, where):
+            predicate = compile_where(cell, where)
+            if predicate is None:
+                return None
+
+            def predicate_counted(record):
+                if predicate(record):
+                    return True
+                self.current.rows_filtered += 1
+                return False
+
+            return predicate_counted
+
+        parser.compile_where = compile_where_counted
+
+    @contextmanager
+    def query(self, sql: str, page_cache=None) -> Iterator[QueryStats]:
+        """Collect the stats of the query run inside the block."""
+        stats = self.current = QueryStats(sql=sql)
+        cache_stats = None if page_cache is None else page_cache.stats
+        if cache_stats is not None:
+            hits, misses = cache_stats.hits, cache_stats.misses
+        started = perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.total_seconds = perf_counter() - started
+            # Whatever the caller did with the rows in between.
+            stats.output_seconds = max(
+                0.0, stats.total_seconds - stats.plan_seconds - stats.execute_seconds
+            )
+            if cache_stats is not None:
+                stats.cache_hits = cache_stats.hits - hits
+                stats.cache_misses = cache_stats.misses - misses
+            self.last = stats
+            for sink in self.sinks:
+                sink(stats)
+
+    def run(self, parser, sql: str):
+        """Plan and start sql like parser.run_query, timing each phase."""
+        stats = self.current
+        started = perf_counter()
+        plan = parser.prepare(sql)
+        stats.plan_seconds += perf_counter() - started
+        if plan.command.is_count():
+            started = perf_counter()
+            count = plan.run()
+            stats.execute_seconds += perf_counter() - started
+            stats.rows_returned += 1
+            return plan, count
+        return plan, self.timed_rows(plan.run())
+
+    def timed_rows(self, rows: Iterable) -> Iterator:
+        stats = self.current
+        rows = iter(rows)
+        while True:
+            started = perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                stats.execute_seconds += perf_counter() - started
+                return
+            stats.execute_seconds += perf_counter() - started
+            stats.rows_returned += 1
+            yield row
+
+
+class JsonSink:
+    """Writes each query's stats to a stream as one line of JSON."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def __call__(self, stats: QueryStats):
+        self.stream.write(json.dumps(stats.as_dict()) + "\n")
+
+
+class LoggingSink:
+    """Logs each query's stats, as JSON, to a logger."""
+
+    def __init__(self, logger: logging.Logger | None = None, level=logging.INFO):
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, stats: QueryStats):
+        self.logger.log(self.level, "query stats %s", json.dumps(stats.as_dict()))
+
+
+def format_stats(stats: QueryStats) -> str:
+    """The stats as an EXPLAIN ANALYZE-style report, one figure per line."""
+    lines = [f"query: {stats.sql}"]
+    for name, value in stats.as_dict().items():
+        if name == "sql":
+            continue
+        if isinstance(value, float):
+            name = name.removesuffix("_seconds") + " time"
+            lines.append(f"  {name:<16} {value * 1000:12.3f} ms")
+        else:
+            lines.append(f"  {name:<16} {value:12,}")
+    return "\n".join(lines)
@@ -1,3 +1,4 @@
+import sys
 from argparse import ArgumentParser
 from pathlib import Path
 
@@ -8,14 +9,106 @@ def get_args():
     parser = ArgumentParser()
     parser.add_argument("database_file_path", type=Path)
     parser.add_argument("command", type=str)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="split full table scans across this many processes",
+    )
+    parser.add_argument(
+        "--read-ahead",
+        type=int,
+        default=0,
+        metavar="PAGES",
+        help="read full table scans in bulk, this many leaf pages at a time",
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=("csv", "jsonl", "tsv"),
+        help="stream the query's rows out in this format instead of printing them",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="file to write with --format; defaults to stdout",
+    )
+    parser.add_argument(
+        "--no-header",
+        dest="header",
+        action="store_false",
+        help="leave out the column names row of --format csv/tsv",
+    )
+    parser.add_argument(
+        "--analyze",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        help="report what the query cost (pages read, rows decoded, timings)"
+        " on stderr, like EXPLAIN ANALYZE",
+    )
+    parser.add_argument(
+        "--sidecar",
+        action="store_true",
+        help="start from the schema, page lists and statistics saved beside"
+        " the database, saving them first when missing or out of date",
+    )
     return parser.parse_args()
 
 
-def main(*, database_file_path: Path, command: str):
-    with SqliteParser(database_file_path) as parser:
-        parser.handle_command(command)
+def main(
+    *,
+    database_file_path: Path,
+    command: str,
+    workers: int = 1,
+    read_ahead: int = 0,
+    output_format: str | None = None,
+    output: Path | None = None,
+    header: bool = True,
+    analyze: str | None = None,
+    sidecar: bool = False,
+):
+    stats_path = None
+    if sidecar:
+        from app.sidecar import sidecar_path
+
+        stats_path = sidecar_path(database_file_path)
+    with SqliteParser(
+        database_file_path,
+        workers=workers,
+        read_ahead=read_ahead,
+        sidecar_path=stats_path,
+    ) as parser:
+        if sidecar and parser.sidecar is None:
+            parser.save_sidecar()
+        if analyze is not None:
+            from app.instrument import JsonSink, format_stats
+
+            if analyze == "json":
+                parser.instrument(JsonSink(sys.stderr))
+            else:
+                parser.instrument(
+                    lambda stats: print(format_stats(stats), file=sys.stderr)
+                )
+        if output_format is None:
+            parser.handle_command(command)
+            return
+        from app.export import open_output
+
+        with open_output(output) as stream:
+            parser.export(command, stream, output_format, header=header)
 
 
 if __name__ == "__main__":
     namespace = get_args()
-    main(database_file_path=namespace.database_file_path, command=namespace.command)
+    main(
+        database_file_path=namespace.database_file_path,
+        command=namespace.command,
+        workers=namespace.workers,
+        read_ahead=namespace.read_ahead,
+        output_format=namespace.output_format,
+        output=namespace.output,
+        header=namespace.header,
+        analyze=namespace.analyze,
+        sidecar=namespace.sidecar,
+    )
@@ -1,3 +1,5 @@
 from .headers import *
 from .cells import *
 from .records import *
+from .pages import *
+from .columns import *
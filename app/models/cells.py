@@ -1,11 +1,36 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 
 __all__ = ["Cell"]
 
-from app.utils import extract_columns
+from app.utils import (
+    extract_column_defaults,
+    extract_column_modifiers,
+    extract_columns,
+    extract_rowid_column,
+    is_partial_index,
+)
 
+ROWID_NAMES = ("rowid", "oid", "_rowid_")
 
-@dataclass
+
+@lru_cache(maxsize=1024)
+def parse_schema_sql(sql: str) -> tuple[tuple[str, ...], str | None]:
+    # Every parser opened on a file decodes the same CREATE statements.
+    return tuple(extract_columns(sql)), extract_rowid_column(sql)
+
+
+@lru_cache(maxsize=1024)
+def parse_column_modifiers(sql: str) -> tuple[tuple[str, str | None], ...]:
+    return tuple(extract_column_modifiers(sql))
+
+
+@lru_cache(maxsize=1024)
+def parse_column_defaults(sql: str) -> tuple:
+    return tuple(extract_column_defaults(sql))
+
+
+@dataclass(slots=True)
 class Cell:
     record_size: int
     row_id: int
@@ -14,18 +39,98 @@ class Cell:
     name: str
     tbl_name: str
     root_page: int
-    sql: bytes
-    columns: list[str] = field(init=False)
+    sql: str | None
+    # Parsed from sql on first use: listing tables never needs it.
+    _layout: tuple | None = field(init=False, default=None, repr=False, compare=False)
+
+    @property
+    def layout(self) -> tuple[list[str], str | None, dict[str, int]]:
+        if self._layout is None:
+            columns, rowid_column = self.extract_columns_simple()
+            # The first column of a name wins, as in a linear search.
+            column_indexes = {}
+            for i, column in enumerate(columns):
+                column_indexes.setdefault(column, i)
+            self._layout = columns, rowid_column, column_indexes
+        return self._layout
+
+    @property
+    def columns(self) -> list[str]:
+        return self.layout[0]
 
-    def __post_init__(self):
-        self.columns = self.extract_columns_simple()
+    @property
+    def rowid_column(self) -> str | None:
+        return self.layout[1]
+
+    @property
+    def column_indexes(self) -> dict[str, int]:
+        return self.layout[2]
 
     def extract_columns_simple(self):
-        sql = self.sql.decode("utf-8")
-        return extract_columns(sql)
+        if self.sql is None:
+            # Automatic indexes and sqlite_sequence entries carry no SQL.
+            return [], None
+        columns, rowid_column = parse_schema_sql(self.sql)
+        return list(columns), rowid_column
+
+    @property
+    def column_defaults(self) -> tuple:
+        """The DEFAULT value of each column, None for those without one."""
+        if self.sql is None:
+            return (None,) * len(self.columns)
+        return parse_column_defaults(self.sql)
+
+    def complete(self, values: tuple) -> tuple:
+        """values, with the columns ALTER TABLE added since at their defaults."""
+        if len(values) >= len(self.columns):
+            return values
+        return values + self.column_defaults[len(values) :]
+
+    @property
+    def column_modifiers(self) -> tuple[tuple[str, str | None], ...]:
+        """(sort order, collation) per column, as written in the CREATE statement."""
+        return () if self.sql is None else parse_column_modifiers(self.sql)
+
+    def is_binary_ascending(self, table_cell: "Cell") -> bool:
+        """Whether every column of this index sorts ascending by BINARY."""
+        # An index column without COLLATE takes the table column's.
+        table_collations = {
+            column: collation
+            for column, (_, collation) in zip(
+                table_cell.columns, table_cell.column_modifiers
+            )
+        }
+        for column, (order, collation) in zip(self.columns, self.column_modifiers):
+            collation = collation or table_collations.get(column) or "BINARY"
+            if order != "ASC" or collation != "BINARY":
+                return False
+        return True
 
     def get_column_index(self, column_name):
-        for i, column in enumerate(self.columns):
-            if column == column_name:
-                return i
-        raise ValueError(f"Column {column_name} not found in table {self.tbl_name}")
+        try:
+            return self.column_indexes[column_name]
+        except KeyError:
+            raise ValueError(
+                f"Column {column_name} not found in table {self.tbl_name}"
+            ) from None
+
+    @property
+    def is_partial(self) -> bool:
+        return self.sql is not None and is_partial_index(self.sql)
+
+    def covering_view(self, index_cell: "Cell") -> "Cell":
+        """The entries of one of this table's indexes, seen as its rows.
+
+        Its columns are the indexed ones and its rowid alias is the table's,
+        so getters and predicates built for it read index entries directly.
+        """
+        view = replace(index_cell)
+        columns = list(index_cell.columns)
+        column_indexes = {}
+        for i, column in enumerate(columns):
+            column_indexes.setdefault(column, i)
+        view._layout = columns, self.rowid_column, column_indexes
+        return view
+
+    def is_rowid(self, column_name) -> bool:
+        return column_name.lower() in (*ROWID_NAMES, self.rowid_column)
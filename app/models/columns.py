@@ -0,0 +1,195 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from itertools import accumulate, repeat, zip_longest
+from types import NoneType
+from typing import Any
+
+__all__ = ["Column", "ColumnBatch"]
+
+NULL = "null"
+INT64 = "int64"
+FLOAT64 = "float64"
+TEXT = "text"
+BLOB = "blob"
+OBJECT = "object"
+
+
+class Column:
+    """One column of a ColumnBatch, laid out like an Apache Arrow array.
+
+    Integers and reals live in an int64 or float64 array, TEXT and BLOB in
+    one bytearray with an array of end offsets into it. NULLs take a zero
+    or empty slot and are recorded in the validity bitmap.
+
+    SQLite does not enforce column types, so the kind follows the values:
+    integers widen to float64 when mixed with reals, and any other mix
+    falls back to a plain list of Python values.
+    """
+
+    __slots__ = ("data", "kind", "length", "nulls", "offsets", "values")
+
+    def __init__(self):
+        self.kind = NULL
+        self.values = None
+        self.offsets = None
+        self.data = None
+        self.nulls = []
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("column index out of range")
+        if self.kind == NULL or self.is_null(i):
+            return None
+        if self.kind in (TEXT, BLOB):
+            return self.decode(self.offsets[i], self.offsets[i + 1])
+        return self.values[i]
+
+    def __iter__(self):
+        if self.kind == NULL:
+            return repeat(None, self.length)
+        if self.kind in (TEXT, BLOB):
+            values = map(self.decode, self.offsets, self.offsets[1:])
+        else:
+            values = iter(self.values)
+        if not self.nulls:
+            return values
+        nulls = set(self.nulls)
+        return (None if i in nulls else value for i, value in enumerate(values))
+
+    def decode(self, start: int, end: int):
+        data = self.data[start:end]
+        return data.decode("utf-8") if self.kind == TEXT else bytes(data)
+
+    def is_null(self, i: int) -> bool:
+        # NULL positions are collected in order, so the list is sorted.
+        j = bisect_left(self.nulls, i)
+        return j < len(self.nulls) and self.nulls[j] == i
+
+    @property
+    def null_count(self) -> int:
+        return len(self.nulls)
+
+    @property
+    def validity(self) -> bytearray | None:
+        """One bit per value, set when it is not NULL, least significant first.
+
+        None when the column holds no NULL at all.
+        """
+        if not self.nulls:
+            return None
+        full, rest = divmod(self.length, 8)
+        bitmap = bytearray(b"\xff" * full)
+        if rest:
+            # Padding bits past the last value stay clear, as Arrow requires.
+            bitmap.append((1 << rest) - 1)
+        for i in self.nulls:
+            bitmap[i >> 3] &= ~(1 << (i & 7))
+        return bitmap
+
+    @classmethod
+    def from_values(cls, values: Sequence[Any]) -> "Column":
+        """Build a column from Python values in one pass per buffer."""
+        column = cls()
+        column.length = len(values)
+        if None in values:
+            column.nulls = [i for i, value in enumerate(values) if value is None]
+        kinds = set(map(type, values))
+        kinds.discard(NoneType)
+        if not kinds:
+            return column
+        if kinds <= {int, float}:
+            if column.nulls:
+                values = [0 if value is None else value for value in values]
+            column.kind = INT64 if kinds == {int} else FLOAT64
+            column.values = array("q" if column.kind == INT64 else "d", values)
+        elif kinds == {str} or kinds == {bytes}:
+            column.kind = TEXT if kinds == {str} else BLOB
+            if kinds == {str}:
+                encoded = [b"" if value is None else value.encode() for value in values]
+            elif column.nulls:
+                encoded = [b"" if value is None else value for value in values]
+            else:
+                encoded = values
+            column.data = bytearray(b"".join(encoded))
+            column.offsets = array("q", accumulate(map(len, encoded), initial=0))
+        else:
+            column.kind = OBJECT
+            column.values = list(values)
+        return column
+
+    def to_pylist(self) -> list[Any]:
+        return list(self)
+
+    def to_numpy(self):
+        """The column as a NumPy array; needs numpy to be installed.
+
+        int64 and float64 columns share their buffer with the array instead
+        of copying it, and come back as a masked array when they hold NULLs.
+        TEXT, BLOB and mixed columns are copied into an object array.
+        """
+        try:
+            import numpy as np
+        except ImportError as error:
+            raise ImportError("Column.to_numpy() requires numpy") from error
+
+        if self.kind not in (INT64, FLOAT64):
+            values = np.empty(self.length, dtype=object)
+            values[:] = self.to_pylist()
+            return values
+        values = np.frombuffer(self.values, dtype=self.values.typecode)
+        if not self.nulls:
+            return values
+        mask = np.zeros(self.length, dtype=bool)
+        mask[self.nulls] = True
+        return np.ma.masked_array(values, mask=mask)
+
+
+class ColumnBatch:
+    """Rows of one scan stored column-major, one Column per selected column."""
+
+    __slots__ = ("columns", "names")
+
+    def __init__(self, names, columns: list[Column]):
+        self.names = tuple(names)
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __iter__(self):
+        return zip(*self.columns)
+
+    @classmethod
+    def from_rows(cls, names, row_ids, rows, indexes) -> "ColumnBatch":
+        """Transpose row tuples into columns; an index of None picks the rowid."""
+        # Rows written before an ALTER TABLE ADD COLUMN are shorter.
+        width = max((i for i in indexes if i is not None), default=-1) + 1
+        transposed = list(zip_longest(*rows, fillvalue=None))
+        transposed += [(None,) * len(rows)] * (width - len(transposed))
+        return cls(
+            names,
+            [
+                Column.from_values(row_ids if i is None else transposed[i])
+                for i in indexes
+            ],
+        )
+
+    def column(self, name: str) -> Column:
+        return self.columns[self.names.index(name)]
+
+    def to_pydict(self) -> dict[str, list[Any]]:
+        return {
+            name: column.to_pylist() for name, column in zip(self.names, self.columns)
+        }
+
+    def to_numpy(self) -> dict[str, Any]:
+        return {
+            name: column.to_numpy() for name, column in zip(self.names, self.columns)
+        }
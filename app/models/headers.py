@@ -1,4 +1,5 @@
 from dataclasses import dataclass, fields
+from struct import Struct
 
 __all__ = ["DbHeader", "LeafPageHeader"]
 
@@ -6,10 +7,14 @@ __all__ = ["DbHeader", "LeafPageHeader"]
 class ParseHeaderMixin:
     @classmethod
     def _parse_field_type(cls, buffer, _type, size):
+        return cls._parse_field_data(buffer.read(size), _type)
+
+    @classmethod
+    def _parse_field_data(cls, data, _type):
         if _type is int:
-            return int.from_bytes(buffer.read(size), "big")
+            return int.from_bytes(data, "big")
         elif _type is str:
-            return buffer.read(size).decode("utf-8")
+            return bytes(data).decode("utf-8")
         else:
             raise ValueError(f"Unsupported field type: {_type}")
 
@@ -21,8 +26,18 @@ class ParseHeaderMixin:
             results.append(cls._parse_field_type(buffer, field.type, field_size))
         return cls(*results)  # noqa
 
+    @classmethod
+    def from_buffer(cls, buffer, offset: int = 0):
+        results = []
+        for field in fields(cls):
+            field_size = cls._FIELD_SIZE[field.name]
+            data = buffer[offset : offset + field_size]
+            results.append(cls._parse_field_data(data, field.type))
+            offset += field_size
+        return cls(*results)
 
-@dataclass
+
+@dataclass(slots=True)
 class DbHeader(ParseHeaderMixin):
     magic_header_str: str
     page_size: int
@@ -73,9 +88,16 @@ class DbHeader(ParseHeaderMixin):
         "version_valid_for": 4,
         "sqlite_version_number": 4,
     }
+    # file_change_counter sits at offset 24 and schema_cookie at offset 40.
+    _VERSION = Struct(">24xI12xI")
+
+    @classmethod
+    def read_version(cls, buffer) -> tuple[int, int]:
+        """(file_change_counter, schema_cookie), without parsing the rest."""
+        return cls._VERSION.unpack_from(buffer)
 
 
-@dataclass
+@dataclass(slots=True)
 class LeafPageHeader(ParseHeaderMixin):
     page_type: int
     first_free_block: int
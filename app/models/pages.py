@@ -0,0 +1,57 @@
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from app.models.headers import LeafPageHeader
+
+__all__ = ["Page"]
+
+INTERIOR_INDEX_PAGE = 2
+INTERIOR_TABLE_PAGE = 5
+LEAF_INDEX_PAGE = 10
+LEAF_TABLE_PAGE = 13
+
+
+@dataclass(slots=True)
+class Page:
+    page_number: int
+    buffer: memoryview
+    header: LeafPageHeader
+    cell_offsets: tuple[int, ...]
+    right_most_pointer: int | None = None
+
+    @classmethod
+    def from_buffer(cls, page_number: int, buffer: memoryview):
+        # Page 1 starts with the 100-byte database header.
+        header_offset = 100 if page_number == 1 else 0
+        header = LeafPageHeader.from_buffer(buffer, header_offset)
+        pointer_array_offset = header_offset + 8
+        right_most_pointer = None
+        if header.page_type in (INTERIOR_INDEX_PAGE, INTERIOR_TABLE_PAGE):
+            right_most_pointer = int.from_bytes(
+                buffer[pointer_array_offset : pointer_array_offset + 4], "big"
+            )
+            pointer_array_offset += 4
+        cell_offsets = struct.unpack_from(
+            f">{header.cell_count}H", buffer, pointer_array_offset
+        )
+        return cls(page_number, buffer, header, cell_offsets, right_most_pointer)
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.header.page_type in (LEAF_INDEX_PAGE, LEAF_TABLE_PAGE)
+
+    @property
+    def is_table(self) -> bool:
+        return self.header.page_type in (INTERIOR_TABLE_PAGE, LEAF_TABLE_PAGE)
+
+    def child_page(self, i: int) -> int:
+        """Page number of the i-th child of an interior page."""
+        if i == len(self.cell_offsets):
+            return self.right_most_pointer
+        offset = self.cell_offsets[i]
+        return int.from_bytes(self.buffer[offset : offset + 4], "big")
+
+    def child_pages(self, start: int = 0) -> Iterator[int]:
+        for i in range(start, len(self.cell_offsets) + 1):
+            yield self.child_page(i)
@@ -1,12 +1,90 @@
+from array import array
 from dataclasses import dataclass, field
 
-__all__ = ["Record"]
+__all__ = ["LazyRecord", "Record", "RecordBatch"]
 
 from typing import Any
 
+from app.decoder import decode_payload, decode_value, serial_type_size
+from app.overflow import BlobReader, OverflowPayload
 
-@dataclass
+
+@dataclass(slots=True)
 class Record:
     record_size: int
     row_id: int
-    values: list[Any] = field(default_factory=list)
+    header_size: int = 0
+    values: tuple[Any, ...] = ()
+
+    def __getitem__(self, i):
+        return self.get(i)
+
+    def get(self, i, default=None):
+        # Columns added by ALTER TABLE are missing from older rows.
+        return self.values[i] if i < len(self.values) else default
+
+
+@dataclass(slots=True)
+class LazyRecord:
+    """A record whose columns are only decoded when they are asked for."""
+
+    record_size: int
+    row_id: int
+    header_size: int
+    buffer: Any = field(repr=False)
+    body_offset: int
+    serial_types: tuple[int, ...]
+    offsets: tuple[int, ...]
+    stream_blobs: bool = False
+
+    def __getitem__(self, i):
+        return self.get(i)
+
+    def get(self, i, default=None):
+        if i >= len(self.serial_types):
+            return default
+        offset = self.body_offset + self.offsets[i]
+        serial_type = self.serial_types[i]
+        if not isinstance(self.buffer, OverflowPayload):
+            return decode_value(self.buffer, offset, serial_type)[0]
+
+        size = serial_type_size(serial_type)
+        is_blob = serial_type >= 12 and serial_type % 2 == 0
+        if self.stream_blobs and is_blob and offset + size > len(self.buffer.local):
+            return BlobReader(self.buffer, offset, size)
+        return decode_value(self.buffer[offset : offset + size], 0, serial_type)[0]
+
+    @property
+    def values(self) -> tuple[Any, ...]:
+        if isinstance(self.buffer, OverflowPayload):
+            return tuple(self[i] for i in range(len(self.serial_types)))
+        return decode_payload(self.buffer, self.body_offset - self.header_size)[1]
+
+
+class RecordBatch:
+    """Rows of one scan stored column-major: a rowid array and one list per column.
+
+    Avoids a Python object per row; rows are only rebuilt on iteration.
+    """
+
+    __slots__ = ("columns", "defaults", "row_ids")
+
+    def __init__(self, column_count: int, defaults: tuple = ()):
+        self.row_ids = array("q")
+        self.columns = [[] for _ in range(column_count)]
+        # What the columns missing from rows older than an ALTER TABLE hold.
+        self.defaults = defaults or (None,) * column_count
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def __iter__(self):
+        return zip(self.row_ids, *self.columns)
+
+    def append(self, record):
+        self.row_ids.append(record.row_id)
+        for i, column in enumerate(self.columns):
+            column.append(record.get(i, self.defaults[i]))
+
+    def column(self, i: int) -> list[Any]:
+        return self.columns[i]
@@ -0,0 +1,273 @@
+import heapq
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+__all__ = [
+    "AGGREGATES",
+    "Avg",
+    "Count",
+    "Descending",
+    "First",
+    "Max",
+    "Min",
+    "Sum",
+    "group_rows",
+    "hash_join",
+    "join_key",
+    "nested_loop_join",
+    "order_rows",
+]
+
+from app.utils import sort_key
+
+
+class Count:
+    """count(column): the number of non-NULL values."""
+
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def step(self, value):
+        if value is not None:
+            self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class Sum:
+    __slots__ = ("total",)
+
+    def __init__(self):
+        self.total = None
+
+    def step(self, value):
+        if value is None:
+            return
+        if not isinstance(value, int | float):
+            # Like SQLite, text and blobs count as their numeric prefix or 0.
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = 0.0
+        self.total = value if self.total is None else self.total + value
+
+    def result(self):
+        return self.total
+
+
+class Avg(Sum):
+    __slots__ = ("count",)
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def step(self, value):
+        if value is not None:
+            super().step(value)
+            self.count += 1
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+
+class Min:
+    __slots__ = ("key", "value")
+
+    def __init__(self):
+        self.value = self.key = None
+
+    def better(self, key) -> bool:
+        return key < self.key
+
+    def step(self, value):
+        if value is None:
+            return
+        key = sort_key(value)
+        if self.key is None or self.better(key):
+            self.value, self.key = value, key
+
+    def result(self):
+        return self.value
+
+
+class Max(Min):
+    __slots__ = ()
+
+    def better(self, key) -> bool:
+        return key > self.key
+
+
+class First:
+    """A bare column in an aggregate query takes the value of some row."""
+
+    __slots__ = ("seen", "value")
+
+    def __init__(self):
+        self.value = None
+        self.seen = False
+
+    def step(self, value):
+        if not self.seen:
+            self.value, self.seen = value, True
+
+    def result(self):
+        return self.value
+
+
+AGGREGATES = {"count": Count, "sum": Sum, "avg": Avg, "min": Min, "max": Max}
+
+
+def group_rows(
+    records: Iterable,
+    key_getters: list[Callable],
+    aggregates: list[tuple[type, Callable]],
+) -> list[tuple]:
+    """Hash aggregation in one pass; memory grows with the number of groups.
+
+    aggregates pairs each output column's accumulator class with the getter
+    of its argument. Groups come out ordered by their key, as in SQLite.
+    """
+    groups = {}
+    for record in records:
+        key = tuple(get(record) for get in key_getters)
+        accumulators = groups.get(key)
+        if accumulators is None:
+            accumulators = groups[key] = [factory() for factory, _ in aggregates]
+        for accumulator, (_, get) in zip(accumulators, aggregates):
+            accumulator.step(get(record))
+    if not key_getters and not groups:
+        # An aggregate over no rows still returns one row: count 0, sum NULL.
+        groups[()] = [factory() for factory, _ in aggregates]
+    return [
+        tuple(accumulator.result() for accumulator in accumulators)
+        for _, accumulators in sorted(
+            groups.items(), key=lambda item: tuple(map(sort_key, item[0]))
+        )
+    ]
+
+
+class Descending:
+    """Inverts the order of a sort key, for ORDER BY ... DESC."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def order_rows(
+    rows: Iterable, terms: list[tuple[Callable, bool]], limit: int | None = None
+) -> list[Any]:
+    """Sort rows by (getter, descending) terms, keeping only the first limit.
+
+    With a limit only that many rows are held, in a heap, while the input
+    streams past.
+    """
+
+    def key(row):
+        return tuple(
+            Descending(sort_key(get(row))) if descending else sort_key(get(row))
+            for get, descending in terms
+        )
+
+    if limit is None:
+        return sorted(rows, key=key)
+    return heapq.nsmallest(limit, rows, key=key)
+
+
+def join_key(getters: list[Callable]) -> Callable[[Any], tuple | None]:
+    """The key a row joins on: the sort keys of its join columns.
+
+    Sort keys make 1 and 1.0 equal and 1 and '1' not, like = in SQL. A key
+    with a NULL in it is None, since NULL equals nothing.
+    """
+
+    def key(row):
+        values = [get(row) for get in getters]
+        if any(value is None for value in values):
+            return None
+        return tuple(map(sort_key, values))
+
+    return key
+
+
+def hash_join(
+    left: Iterable[tuple],
+    right: Iterable,
+    left_key: Callable,
+    right_key: Callable,
+    *,
+    outer=False,
+    build_left=False,
+) -> Iterator[tuple]:
+    """Equi-join tuples of records with the records of one more table.
+
+    Yields each matching left tuple extended with the right record. Only
+    the build side, right unless build_left, is held in a hash table; the
+    other side streams past it. With outer, a left tuple without a match
+    is yielded once with None for the record, as LEFT JOIN does, which
+    needs the right side to be the build side.
+    """
+    if outer and build_left:
+        raise ValueError("A LEFT JOIN builds its hash table on the right side")
+    if build_left:
+        table = build_hash_table(left, left_key)
+        for record in right:
+            key = right_key(record)
+            if key is not None:
+                for row in table.get(key, ()):
+                    yield (*row, record)
+        return
+    table = build_hash_table(right, right_key)
+    for row in left:
+        key = left_key(row)
+        matches = () if key is None else table.get(key, ())
+        for record in matches:
+            yield (*row, record)
+        if outer and not matches:
+            yield (*row, None)
+
+
+def build_hash_table(rows: Iterable, key: Callable) -> dict[tuple, list]:
+    table = {}
+    for row in rows:
+        row_key = key(row)
+        if row_key is not None:
+            table.setdefault(row_key, []).append(row)
+    return table
+
+
+def nested_loop_join(
+    left: Iterable[tuple],
+    lookup: Callable[[Any], Iterable],
+    left_value: Callable,
+    matches: Callable[[tuple, Any], bool] | None = None,
+    *,
+    outer=False,
+) -> Iterator[tuple]:
+    """Join each left tuple with the records lookup(value) finds for it.
+
+    With lookup seeking a B-tree, by rowid or through an index, this is an
+    index nested-loop join: nothing is held but the current tuple. matches
+    rechecks each candidate against the rest of the join condition.
+    """
+    for row in left:
+        value = left_value(row)
+        matched = False
+        if value is not None:
+            for record in lookup(value):
+                if matches is None or matches(row, record):
+                    matched = True
+                    yield (*row, record)
+        if outer and not matched:
+            yield (*row, None)
@@ -0,0 +1,221 @@
+import mmap
+import os
+from collections.abc import Iterable
+from os import PathLike
+
+__all__ = [
+    "FilePageSource",
+    "MmapPageSource",
+    "PageSource",
+    "PreadPageSource",
+    "coalesce_pages",
+]
+
+DB_HEADER_SIZE = 100
+
+
+def coalesce_pages(
+    page_numbers: Iterable[int], *, max_gap: int = 0, max_run: int | None = None
+) -> list[tuple[int, int]]:
+    """Merge page numbers into sorted (first page, page count) runs.
+
+    Pages up to max_gap apart join the same run, since reading a few unused
+    pages costs less than another seek; no run grows past max_run pages.
+    """
+    runs = []
+    for page_number in sorted(set(page_numbers)):
+        if runs:
+            first, count = runs[-1]
+            end = first + count
+            if page_number - end <= max_gap and (
+                max_run is None or page_number - first < max_run
+            ):
+                runs[-1] = (first, page_number - first + 1)
+                continue
+        runs.append((page_number, 1))
+    return runs
+
+
+def fadvise_will_need(fd: int, offset: int, length: int):
+    # posix_fadvise is missing on macOS and Windows, where the hint is skipped.
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+
+
+class PageSource:
+    """Hands out the raw bytes of database pages, addressed by 1-based page number."""
+
+    def __init__(self, page_size: int, file_size: int):
+        self.page_size = page_size
+        self.file_size = file_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @classmethod
+    def read_page_size(cls, header: bytes) -> int:
+        page_size = int.from_bytes(header[16:18], "big")
+        # The value 1 represents a page size of 65536.
+        return 65536 if page_size == 1 else page_size
+
+    @property
+    def page_count(self) -> int:
+        return self.file_size // self.page_size
+
+    def page_offset(self, page_number: int) -> int:
+        if not 1 <= page_number <= self.page_count:
+            raise ValueError(f"Page {page_number} out of range 1..{self.page_count}")
+        return self.page_size * (page_number - 1)
+
+    def run_bounds(self, first: int, count: int) -> tuple[int, int]:
+        """File offset and length of the pages first .. first + count - 1."""
+        self.page_offset(first + count - 1)
+        return self.page_offset(first), self.page_size * count
+
+    def get_page(self, page_number: int) -> memoryview:
+        raise NotImplementedError
+
+    def read_run(self, first: int, count: int) -> memoryview:
+        """The pages first .. first + count - 1 as one contiguous buffer."""
+        return memoryview(b"".join(self.get_page(first + i) for i in range(count)))
+
+    def will_need(self, first: int, count: int):
+        """Hint that a run of pages is about to be read; a no-op by default."""
+
+    def read_header(self) -> bytes:
+        """A fresh copy of the 100-byte database header, bypassing any caching."""
+        return bytes(self.get_page(1)[:DB_HEADER_SIZE])
+
+    def refresh(self):
+        """Pick up the size of a file another writer has changed.
+
+        Called when the header says the file changed; a no-op by default.
+        """
+
+    def close(self):
+        pass
+
+
+class FilePageSource(PageSource):
+    """Reads every page with a single seek + read of the whole page."""
+
+    def __init__(self, db_path: PathLike):
+        # Held open for the life of the source; close() closes it.
+        self.file_object = open(db_path, "rb")  # noqa: SIM115
+        header = self.file_object.read(DB_HEADER_SIZE)
+        file_size = self.file_object.seek(0, 2)
+        super().__init__(self.read_page_size(header), file_size)
+
+    def get_page(self, page_number: int) -> memoryview:
+        self.file_object.seek(self.page_offset(page_number))
+        return memoryview(self.file_object.read(self.page_size))
+
+    def read_run(self, first: int, count: int) -> memoryview:
+        offset, length = self.run_bounds(first, count)
+        self.file_object.seek(offset)
+        return memoryview(self.file_object.read(length))
+
+    def will_need(self, first: int, count: int):
+        fadvise_will_need(self.file_object.fileno(), *self.run_bounds(first, count))
+
+    def read_header(self) -> bytes:
+        self.file_object.seek(0)
+        return self.file_object.read(DB_HEADER_SIZE)
+
+    def refresh(self):
+        self.page_size = self.read_page_size(self.read_header())
+        self.file_size = self.file_object.seek(0, 2)
+
+    def close(self):
+        self.file_object.close()
+
+
+class MmapPageSource(PageSource):
+    """Maps the whole file and hands out zero-copy views of its pages."""
+
+    def __init__(self, db_path: PathLike):
+        self.db_path = db_path
+        self._map()
+        super().__init__(
+            self.read_page_size(self._mmap[:DB_HEADER_SIZE]), len(self._mmap)
+        )
+
+    def _map(self):
+        with open(self.db_path, "rb") as file_object:
+            self._mmap = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+    def get_page(self, page_number: int) -> memoryview:
+        start = self.page_offset(page_number)
+        return self._view[start : start + self.page_size]
+
+    def read_run(self, first: int, count: int) -> memoryview:
+        offset, length = self.run_bounds(first, count)
+        return self._view[offset : offset + length]
+
+    def will_need(self, first: int, count: int):
+        if not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        offset, length = self.run_bounds(first, count)
+        # madvise wants a page-aligned start; widen the range to match.
+        aligned = offset - offset % mmap.PAGESIZE
+        self._mmap.madvise(mmap.MADV_WILLNEED, aligned, offset + length - aligned)
+
+    def read_header(self) -> bytes:
+        return self._mmap[:DB_HEADER_SIZE]
+
+    def refresh(self):
+        # A mapping never grows with its file, so a resized file is mapped
+        # anew.
+        if os.stat(self.db_path).st_size != len(self._mmap):
+            self.close()
+            self._map()
+        self.page_size = self.read_page_size(self._mmap[:DB_HEADER_SIZE])
+        self.file_size = len(self._mmap)
+
+    def close(self):
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Page views handed out to callers are still alive; the mapping is
+            # released once the last of them is garbage collected.
+            pass
+
+
+class PreadPageSource(PageSource):
+    """Reads pages with os.pread, which keeps no file position.
+
+    One instance can therefore serve reads from several threads at once.
+    """
+
+    def __init__(self, db_path: PathLike):
+        self.fd = os.open(db_path, os.O_RDONLY)
+        header = os.pread(self.fd, DB_HEADER_SIZE, 0)
+        super().__init__(self.read_page_size(header), os.fstat(self.fd).st_size)
+
+    def get_page(self, page_number: int) -> memoryview:
+        offset = self.page_offset(page_number)
+        return memoryview(os.pread(self.fd, self.page_size, offset))
+
+    def read_run(self, first: int, count: int) -> memoryview:
+        offset, length = self.run_bounds(first, count)
+        return memoryview(os.pread(self.fd, length, offset))
+
+    def will_need(self, first: int, count: int):
+        fadvise_will_need(self.fd, *self.run_bounds(first, count))
+
+    def read_header(self) -> bytes:
+        return os.pread(self.fd, DB_HEADER_SIZE, 0)
+
+    def refresh(self):
+        self.page_size = self.read_page_size(self.read_header())
+        self.file_size = os.fstat(self.fd).st_size
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -0,0 +1,119 @@
+import os
+from collections.abc import Iterator
+from itertools import islice
+from os import PathLike
+
+__all__ = ["ParallelScan"]
+
+from app.cursor import TableCursor
+
+# Leaf pages per task: large enough to amortise pickling the results, small
+# enough that every worker gets several tasks on a mid-sized table.
+DEFAULT_CHUNK_SIZE = 256
+
+
+# The parser of a worker process, opened once by its executor's initializer
+# and reused for every chunk the worker is given; it lives as long as the
+# process does.
+_worker_parser = None
+
+
+def open_worker_parser(db_path: PathLike):
+    """Executor initializer: open the file, and map it, once per worker."""
+    global _worker_parser
+    # app.parser imports this module.
+    from app.parser import SqliteParser
+
+    _worker_parser = SqliteParser(db_path)
+
+
+def scan_chunk(table_name, page_numbers, columns, where):
+    """Worker: the matching rows of some leaf pages, projected onto columns."""
+    parser = _worker_parser
+    cell = parser.get_cell(table_name)
+    records = TableCursor(parser, cell.root_page, lazy=True).scan_pages(page_numbers)
+    getters = [parser.column_getter(cell, column) for column in columns]
+    return [
+        tuple(get(record) for get in getters)
+        for record in parser.filter_records(cell, records, where)
+    ]
+
+
+def count_chunk(table_name, page_numbers, where) -> int:
+    """Worker: the number of matching rows on some leaf pages."""
+    parser = _worker_parser
+    if where is None:
+        return sum(
+            parser.get_page(page_number).header.cell_count
+            for page_number in page_numbers
+        )
+    cell = parser.get_cell(table_name)
+    records = TableCursor(parser, cell.root_page, lazy=True).scan_pages(page_numbers)
+    return sum(1 for _ in parser.filter_records(cell, records, where))
+
+
+class ParallelScan:
+    """Splits a full table scan across processes, one slice of leaf pages each.
+
+    Every worker opens its own parser, and so its own mmap of the file, when
+    it starts and keeps it for all its chunks; only page numbers go out and
+    decoded rows come back.
+    """
+
+    def __init__(
+        self, parser, workers: int | None = None, chunk_size=DEFAULT_CHUNK_SIZE
+    ):
+        self.parser = parser
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    def chunks(self, table_name) -> list[list[int]]:
+        cell = self.parser.get_cell(table_name)
+        page_numbers = TableCursor(self.parser, cell.root_page).leaf_page_numbers()
+        return [
+            page_numbers[i : i + self.chunk_size]
+            for i in range(0, len(page_numbers), self.chunk_size)
+        ]
+
+    def executor(self):
+        # multiprocessing is slow to import and only needed here.
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(
+            self.workers,
+            initializer=open_worker_parser,
+            initargs=(self.parser.db_path,),
+        )
+
+    def iter_columns(
+        self, *columns, table_name, where=None, limit=None, ordered=True
+    ) -> Iterator[tuple]:
+        """Like SqliteParser.iter_columns, decoding leaf pages in parallel.
+
+        Rows come back in rowid order unless ordered is false, in which case
+        each chunk is yielded as soon as its worker finishes.
+        """
+        from concurrent.futures import as_completed
+
+        with self.executor() as executor:
+            futures = [
+                executor.submit(scan_chunk, table_name, chunk, columns, where)
+                for chunk in self.chunks(table_name)
+            ]
+            # Leaf pages are chunked in rowid order, so collecting the chunks
+            # in submission order keeps the rows in rowid order.
+            done = futures if ordered else as_completed(futures)
+            rows = (row for future in done for row in future.result())
+            try:
+                yield from islice(rows, limit)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def count(self, table_name, where=None) -> int:
+        with self.executor() as executor:
+            futures = [
+                executor.submit(count_chunk, table_name, chunk, where)
+                for chunk in self.chunks(table_name)
+            ]
+            return sum(future.result() for future in futures)
@@ -1,241 +1,310 @@
-import io
-import os
-import struct
-from functools import cached_property
-from itertools import pairwise
+import re
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, nullcontext
+from functools import cached_property, partial
+from itertools import islice
+from operator import attrgetter, itemgetter, methodcaller
 from os import PathLike
+from typing import TYPE_CHECKING, Any
 
 __all__ = ["SqliteParser"]
 
-from app.models import DbHeader, LeafPageHeader, Cell, Record
+EXPLAIN_PATTERN = re.compile(r"\s*EXPLAIN(\s+QUERY\s+PLAN)?\s+", re.IGNORECASE)
+
+if TYPE_CHECKING:
+    from app.costs import AccessPath, TreeStats
+    from app.instrument import Instrumentation, QueryStats
+    from app.plans import QueryPlan
+    from app.sidecar import Sidecar
+
+from app.models import (
+    DbHeader,
+    Cell,
+    ColumnBatch,
+    LazyRecord,
+    Record,
+    RecordBatch,
+    Page,
+)
+from app.cache import CacheStats, PageCache, PlanCache
+from app.cursor import IndexCursor, TableCursor
+from app.decoder import decode_payload, decode_value, header_layout, read_varint
 from app.models.tables import SchemaTable
-from app.utils import parse_command
+from app.parallel import ParallelScan
+from app.overflow import OverflowPayload, PayloadLimits
+from app.pager import PageSource, MmapPageSource
+from app.utils import Range, is_finite_number
 
 
 class SqliteParser:
-    def __init__(self, db_path: PathLike):
-        self.file_object = db_path.open("rb")  # noqa
+    def __init__(
+        self,
+        db_path: PathLike,
+        page_source: PageSource | None = None,
+        page_cache: PageCache | None = None,
+        *,
+        stream_blobs=False,
+        workers: int = 1,
+        read_ahead: int = 0,
+        schema_table: SchemaTable | None = None,
+        instrumentation: "Instrumentation | None" = None,
+        sidecar_path: PathLike | None = None,
+    ):
+        self.db_path = db_path
+        # Like the page cache, a page source handed in may be shared, so
+        # it is only closed on exit when owned.
+        self.owns_page_source = page_source is None
+        self.page_source = page_source or MmapPageSource(db_path)
+        # A cache handed in by the caller may be shared with other parsers
+        # over the same file, so it is only cleared on exit when owned.
+        self.owns_page_cache = page_cache is None
+        self.page_cache = PageCache() if page_cache is None else page_cache
+        self.page_cache.pin(1)
+        self.plan_cache = PlanCache()
+        # B-tree shape estimates for the planner, keyed by root page.
+        self.tree_stats_cache = {}
+        # Return BLOBs spilling onto overflow pages as BlobReader streams.
+        self.stream_blobs = stream_blobs
+        # Full scans are split across this many processes when above one.
+        self.workers = workers
+        # Full scans fetch leaf pages this many at a time in bulk when set.
+        self.read_ahead = read_ahead
+        # Saved schema, page lists and statistics to start from, if current.
+        self.sidecar_path = sidecar_path
         self.db_header = None
         self.page_header = None
         self.cells = []
+        if schema_table is not None:
+            # Parsed once and shared by the parsers of a ReaderPool.
+            self.schema_table = schema_table
+        # Per-query counters and timings; off unless asked for.
+        self.instrumentation = None
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+            instrumentation.install(self)
 
     def __enter__(self):
-        self.file_object.__enter__()
         return self
 
     def __exit__(self, *args):
-        return self.file_object.__exit__(*args)
+        if self.owns_page_cache:
+            self.page_cache.clear()
+        if self.owns_page_source:
+            self.page_source.close()
 
-    @classmethod
-    def get_varint(cls, buffer):
-        result = 0
-        while True:
-            value = int.from_bytes(buffer.read(1), "big")
-            result = (result << 7) | (value & 0x7F)
-            if (value & 0x80) == 0:
-                break
-        return result
+    @property
+    def cache_stats(self) -> CacheStats:
+        return self.page_cache.stats
+
+    def check_schema_version(self):
+        """Drop everything derived from the file once another writer changed it."""
+        # Read past the page cache: a cached page 1 would never change.
+        version = DbHeader.read_version(self.page_source.read_header())
+        if version == self.plan_cache.version:
+            return
+        # The file may have grown or shrunk since the page source opened it.
+        self.page_source.refresh()
+        if self.plan_cache.version is not None:
+            if "schema_table" in self.__dict__:
+                for cell in self.schema_table.cells:
+                    self.page_cache.unpin(cell.root_page)
+            self.page_cache.clear()
+            self.__dict__.pop("schema_table", None)
+            self.__dict__.pop("payload_limits", None)
+            self.__dict__.pop("sidecar", None)
+            self.tree_stats_cache.clear()
+        self.plan_cache.reset(version)
+
+    get_varint = staticmethod(read_varint)
+    decode_value_by_serial_type = staticmethod(decode_value)
 
     def handle_command(self, command: str):
         match command:
+            # Dot commands are measured like queries when instrumented.
             case ".dbinfo":
-                return self.db_info(verbose=True)
+                with self.measure(command):
+                    return self.db_info(verbose=True)
             case ".tables":
-                return self.tables(verbose=True)
+                with self.measure(command):
+                    return self.tables(verbose=True)
+            case _ if EXPLAIN_PATTERN.match(command):
+                with self.measure(command):
+                    return self.explain(command, verbose=True)
             case _:
                 return self.sql(command)
 
     @classmethod
-    def decode_value_by_serial_type(cls, buffer, serial_type: int):
-        """Decode a value from buffer based on its serial type."""
-        match serial_type:
-            case 0:
-                return None  # NULL
-            case 1:
-                return struct.unpack(">b", buffer.read(1))[0]  # 8-bit signed int
-            case 2:
-                return struct.unpack(">h", buffer.read(2))[0]  # 16-bit signed int
-            case 3:
-                # 24-bit signed integer
-                data = buffer.read(3)
-                value = int.from_bytes(data, "big", signed=True)
-                return value
-            case 4:
-                return struct.unpack(">i", buffer.read(4))[0]  # 32-bit signed int
-            case 5:
-                # 48-bit signed integer
-                data = buffer.read(6)
-                value = int.from_bytes(data, "big", signed=True)
-                return value
-            case 6:
-                return struct.unpack(">q", buffer.read(8))[0]  # 64-bit signed int
-            case 7:
-                return struct.unpack(">d", buffer.read(8))[0]  # 64-bit float
-            case 8:
-                return 0  # Integer constant 0
-            case 9:
-                return 1  # Integer constant 1
-            case _ if serial_type >= 12 and serial_type % 2 == 0:
-                # BLOB
-                length = (serial_type - 12) // 2
-                return buffer.read(length)
-            case _ if serial_type >= 13 and serial_type % 2 != 0:
-                # TEXT
-                length = (serial_type - 13) // 2
-                return buffer.read(length).decode("utf-8")
-            case _:
-                raise ValueError(f"Invalid serial type code: {serial_type}")
-
-    @classmethod
-    def get_serial_type_code(cls, n: int) -> int | str:
-        match n:
-            case 0:
-                return "NULL"
-            case 1:
-                return 1
-            case 2:
-                return 2
-            case 3:
-                return 3
-            case 4:
-                return 4
-            case 5:
-                return 6
-            case 6:
-                return 8
-            case 7:
-                return 8
-            case 8:
-                return 0
-            case 9:
-                return 0
-            case 10 | 11:
-                return "VARIABLE"
-            case _ if n >= 12 and n % 2 == 0:
-                return (n - 12) // 2
-            case _ if n >= 13 and n % 2 != 0:
-                return (n - 13) // 2
-            case _:
-                raise ValueError(f"Invalid serial type code: {n}")
-
-    def decode_cell(self, buffer):
-        record_size = self.get_varint(buffer)
-        row_id = self.get_varint(buffer)
-        record_header_size = self.get_varint(buffer)
-        st_schema_type = self.get_varint(buffer)
-        st_schema_name = self.get_varint(buffer)
-        st_schema_tbl_name = self.get_varint(buffer)
-        st_schema_root_page = self.get_varint(buffer)
-        st_schema_sql = self.get_varint(buffer)
-        type_ = buffer.read(self.get_serial_type_code(st_schema_type))
-        name = buffer.read(self.get_serial_type_code(st_schema_name))
-        tbl_name = buffer.read(self.get_serial_type_code(st_schema_tbl_name)).decode(
-            "utf-8"
-        )
-        root_page = int.from_bytes(
-            buffer.read(self.get_serial_type_code(st_schema_root_page))
-        )
-        sql = buffer.read(self.get_serial_type_code(st_schema_sql))
-        cell = Cell(
-            record_size=record_size,
-            row_id=row_id,
-            header_size=record_header_size,
+    def cell_from_record(cls, record: Record) -> Cell:
+        type_, name, tbl_name, root_page, sql = record.values
+        return Cell(
+            record_size=record.record_size,
+            row_id=record.row_id,
+            header_size=record.header_size,
             type=type_,
             name=name,
             tbl_name=tbl_name,
             root_page=root_page,
             sql=sql,
         )
-        return cell
+
+    def get_page(self, page_number: int) -> Page:
+        page = self.page_cache.get(page_number)
+        if page is None:
+            buffer = self.page_source.get_page(page_number)
+            page = Page.from_buffer(page_number, buffer)
+            self.page_cache.put(page_number, page, len(buffer))
+        return page
 
     @cached_property
     def schema_table(self):
-        db_header = DbHeader.from_bytes(self.file_object)
-        page_header = LeafPageHeader.from_bytes(self.file_object)
-        page_size = db_header.page_size
-        cell_count = page_header.cell_count
+        page = self.get_page(1)
+        db_header = DbHeader.from_buffer(page.buffer)
+        if self.sidecar is not None:
+            cells = self.sidecar.cells
+        else:
+            # With hundreds of tables the schema spills from page 1 into a
+            # B-tree.
+            cells = [self.cell_from_record(record) for record in TableCursor(self, 1)]
+        for cell in cells:
+            if cell.root_page:
+                self.page_cache.pin(cell.root_page)
+        return SchemaTable(db_header, page.header, cells)
+
+    @cached_property
+    def sidecar(self) -> "Sidecar | None":
+        """The saved statistics at sidecar_path, if they match the file."""
+        if self.sidecar_path is None:
+            return None
+        from app.sidecar import load_sidecar
+
+        version = DbHeader.read_version(self.page_source.read_header())
+        return load_sidecar(self.sidecar_path, version)
+
+    def save_sidecar(self, path: PathLike | None = None) -> "Sidecar":
+        """Walk the whole file and save what a sidecar holds.
+
+        path defaults to sidecar_path, or else to the file beside the
+        database. Saved to sidecar_path, it is used from then on.
+        """
+        from app.sidecar import build_sidecar, sidecar_path
 
-        unpacked_offsets = struct.unpack(
-            f">{cell_count}H", self.file_object.read(cell_count * 2)
+        sidecar = build_sidecar(self)
+        path = path or self.sidecar_path or sidecar_path(self.db_path)
+        sidecar.save(path)
+        if self.sidecar_path is not None and path == self.sidecar_path:
+            self.sidecar = sidecar
+        return sidecar
+
+    def known_leaf_pages(self, root_page: int) -> list[int] | None:
+        """The leaf pages of a B-tree from the sidecar, None when not known."""
+        if self.sidecar is None or root_page not in self.sidecar.trees:
+            return None
+        return self.sidecar.trees[root_page].leaf_pages
+
+    def column_range(self, root_page: int, column: str) -> list | None:
+        """[min, max] of a table's column from the sidecar, None when not known."""
+        if self.sidecar is None:
+            return None
+        return self.sidecar.column_range(root_page, column)
+
+    def decode_payload(self, buffer, offset: int) -> tuple[int, tuple]:
+        return decode_payload(buffer, offset)
+
+    @cached_property
+    def payload_limits(self) -> PayloadLimits:
+        return PayloadLimits.from_db_header(
+            DbHeader.from_buffer(self.get_page(1).buffer)
         )
-        offsets = list(sorted((page_size, *unpacked_offsets)))
-
-        cells = []
-        for start, stop in pairwise(offsets):
-            self.file_object.seek(start, os.SEEK_SET)
-            cell = self.file_object.read(stop - start)
-            cells.append(self.decode_cell(io.BytesIO(cell)))
-        return SchemaTable(db_header, page_header, cells)
-
-    def decode_record(self, buffer: io.BytesIO) -> Record:
-        record_size = self.get_varint(buffer)
-        row_id = self.get_varint(buffer)
-
-        header_start = buffer.tell()
-        # Read header size
-        header_size = self.get_varint(buffer)
-
-        # Read serial type codes
-        serial_types = []
-        while buffer.tell() < header_start + header_size:
-            serial_types.append(self.get_varint(buffer))
-
-        # Now read the actual data
-        values = []
-        for serial_type in serial_types:
-            value = self.decode_value_by_serial_type(buffer, serial_type)
-            values.append(value)
-
-        return Record(record_size=record_size, row_id=row_id, values=values)
-
-    def read_page(self, page_number: int, page_size: int = 4096):
-        self.file_object.seek(page_size * (page_number - 1), os.SEEK_SET)
-        page_header = LeafPageHeader.from_bytes(self.file_object)
-        offsets = [
-            int.from_bytes(self.file_object.read(2), "big")
-            for _ in range(page_header.cell_count)
-        ]
 
-        records = []
-        for offset in sorted(offsets):
-            self.file_object.seek(offset + (page_size * (page_number - 1)), os.SEEK_SET)
-            record = self.decode_record(self.file_object)
-            records.append(record)
-        return records
-
-    def get_records(self, db_header: DbHeader, root_cell: Cell) -> list[Record]:
-        page_size = db_header.page_size
-        page_header = LeafPageHeader.from_bytes(self.file_object)
-        if page_header.page_type == 5:  # interior page
-            _right_most_pointer = int.from_bytes(self.file_object.read(4), "big")
-        cell_count = page_header.cell_count
-
-        offsets = [
-            int.from_bytes(self.file_object.read(2), "big") for _ in range(cell_count)
-        ]
-        if page_header.page_type == 5:
-            interior_page_cells = []
-            for offset in offsets:
-                self.file_object.seek(offset + page_size, os.SEEK_SET)
-                page_number = int.from_bytes(self.file_object.read(4), "big")
-                row_id = self.get_varint(self.file_object)
-                interior_page_cells.append((page_number, row_id))
-
-            records = []
-            for page_number, row_id in interior_page_cells:
-                records.extend(self.read_page(page_number))
-            return records
-        else:
-            records = self.read_page(root_cell.root_page)
-            return records
+    def overflow_payload(
+        self, buffer, offset: int, payload_size: int, *, index=False
+    ) -> OverflowPayload | None:
+        """The payload at buffer[offset] if it spills onto overflow pages."""
+        local_size = self.payload_limits.local_size(payload_size, index=index)
+        if local_size == payload_size:
+            return None
+        pointer = offset + local_size
+        return OverflowPayload(
+            self.page_source,
+            buffer[offset:pointer],
+            int.from_bytes(buffer[pointer : pointer + 4], "big"),
+            payload_size,
+            self.payload_limits.usable_size,
+        )
+
+    def decode_record(self, buffer, offset: int) -> Record:
+        record_size, offset = self.get_varint(buffer, offset)
+        row_id, offset = self.get_varint(buffer, offset)
+        overflow = self.overflow_payload(buffer, offset, record_size)
+        if overflow is not None:
+            buffer, offset = overflow[:], 0
+        header_size, values = self.decode_payload(buffer, offset)
+        return Record(
+            record_size=record_size,
+            row_id=row_id,
+            header_size=header_size,
+            values=values,
+        )
+
+    def decode_lazy_record(self, buffer, offset: int) -> LazyRecord:
+        record_size, offset = self.get_varint(buffer, offset)
+        row_id, offset = self.get_varint(buffer, offset)
+        overflow = self.overflow_payload(buffer, offset, record_size)
+        if overflow is not None:
+            # Columns are read straight from the overflow chain on access.
+            buffer, offset = overflow, 0
+        header_size, _ = self.get_varint(buffer, offset)
+        body_offset = offset + header_size
+        serial_types, offsets = header_layout(bytes(buffer[offset:body_offset]))
+        return LazyRecord(
+            record_size=record_size,
+            row_id=row_id,
+            header_size=header_size,
+            buffer=buffer,
+            body_offset=body_offset,
+            serial_types=serial_types,
+            offsets=offsets,
+            stream_blobs=self.stream_blobs,
+        )
+
+    def decode_index_record(self, buffer, offset: int) -> Record:
+        # Index entries carry the indexed columns followed by the table rowid.
+        record_size, offset = self.get_varint(buffer, offset)
+        overflow = self.overflow_payload(buffer, offset, record_size, index=True)
+        if overflow is not None:
+            buffer, offset = overflow[:], 0
+        header_size, values = self.decode_payload(buffer, offset)
+        return Record(
+            record_size=record_size,
+            row_id=values[-1],
+            header_size=header_size,
+            values=values[:-1],
+        )
+
+    def read_page(self, page_number: int) -> list[Record]:
+        page = self.get_page(page_number)
+        return [self.decode_record(page.buffer, offset) for offset in page.cell_offsets]
+
+    def get_records(
+        self, db_header: DbHeader, root_cell: Cell, *, lazy=False
+    ) -> Iterator[Record | LazyRecord]:
+        return iter(
+            TableCursor(
+                self, root_cell.root_page, lazy=lazy, read_ahead=self.read_ahead
+            )
+        )
 
     def db_info(self, verbose=False):
-        self.db_header = db_header = DbHeader.from_bytes(self.file_object)
-        self.page_header = page_header = LeafPageHeader.from_bytes(self.file_object)
+        page = self.get_page(1)
+        self.db_header = db_header = DbHeader.from_buffer(page.buffer)
+        self.page_header = page.header
+        # Counting schema entries needs no CREATE statement to be parsed.
+        table_count = TableCursor(self, 1).count()
         if verbose:
             print("database page size: ", db_header.page_size)
-            print("number of tables: ", page_header.cell_count)
-        return db_header.page_size, page_header.cell_count
+            print("number of tables: ", table_count)
+        return db_header.page_size, table_count
 
     def tables(self, verbose=False):
         schema_table = self.schema_table
@@ -248,59 +317,339 @@ class SqliteParser:
             print(" ".join(tables))
         return tables
 
-    def count_rows(self, table_name, *, verbose=False):
-        schema_table = self.schema_table
-        [cell] = [c for c in schema_table.cells if c.tbl_name == table_name]
-        records = self.get_records(schema_table.db_header, cell)
+    def count_rows(self, table_name, where=None, *, verbose=False):
+        from app.query import referenced_columns
+
+        cell = self.get_cell(table_name)
+        path = self.choose_access_path(cell, where, referenced_columns(where))
+        if where is None and self.known_leaf_pages(cell.root_page) is not None:
+            count = self.sidecar.trees[cell.root_page].rows
+        elif where is None and path.covering:
+            # Every row has one entry in the index, which is the smaller tree.
+            count = IndexCursor(self, path.index_cell.root_page).count()
+        elif self.workers > 1 and path.kind == "scan":
+            count = ParallelScan(self, self.workers).count(table_name, where)
+        elif where is None:
+            # Counting only needs the cell counts of the leaf pages.
+            count = TableCursor(
+                self, cell.root_page, read_ahead=self.read_ahead
+            ).count()
+        else:
+            records = self.follow_access_path(cell, path)()
+            row_cell = self.row_cell(cell, path)
+            count = sum(1 for _ in self.filter_records(row_cell, records, where))
         if verbose:
-            print(len(records))
-        return len(records)
+            print(count)
+        return count
 
     def get_cell(self, table_name):
-        schema_table = self.schema_table
-        [cell] = [c for c in schema_table.cells if c.tbl_name == table_name]
-        return cell
+        # Table names are matched without regard to case, as SQLite does.
+        name = table_name.lower()
+        for cell in self.schema_table.cells:
+            if cell.type == "table" and cell.tbl_name.lower() == name:
+                return cell
+        raise ValueError(f"no such table: {table_name}")
 
-    @classmethod
-    def filter_records(cls, *records: Record, **filters):
-        if filters:
-            filtered_records = []
-            for filter_key, filter_value in filters.items():
-                for record in records:
-                    if filter_value in set(record.values):
-                        filtered_records.append(record)
-            return filtered_records
+    def get_index_cells(self, table_name) -> list[Cell]:
+        """The indexes of a table that the index cursor can search.
+
+        They must hold an entry for every row and keep their keys in
+        ascending BINARY order, the order sort_key gives and IndexCursor
+        bisects by.
+        """
+        table_cell = self.get_cell(table_name)
+        return [
+            cell
+            for cell in self.schema_table.cells
+            if cell.type == "index"
+            and cell.tbl_name.lower() == table_cell.tbl_name.lower()
+            and not cell.is_partial
+            and cell.is_binary_ascending(table_cell)
+        ]
+
+    def get_index_cell(self, table_name, column) -> Cell | None:
+        for cell in self.get_index_cells(table_name):
+            if cell.columns[:1] == [column]:
+                return cell
+        return None
+
+    def index_lookup(self, table_cell: Cell, index_cell: Cell, *key):
+        table = TableCursor(self, table_cell.root_page, lazy=True)
+        for entry in IndexCursor(self, index_cell.root_page).seek(*key):
+            record = table.seek(entry.row_id)
+            if record is not None:
+                yield record
+
+    def index_entries(self, index_cell: Cell, *key) -> Iterator[Record]:
+        """Entries of an index matching key, or all of them without one."""
+        cursor = IndexCursor(self, index_cell.root_page)
+        return cursor.seek(*key) if key else cursor.scan()
+
+    def seek_row(self, table_name, row_id: int) -> Record | None:
+        cell = self.get_cell(table_name)
+        return TableCursor(self, cell.root_page).seek(row_id)
+
+    def scan_rows(self, table_name, start=None, stop=None) -> Iterator[Record]:
+        cell = self.get_cell(table_name)
+        return TableCursor(self, cell.root_page).scan(start, stop)
+
+    def rowid_lookup(self, table_cell: Cell, value) -> Iterator[LazyRecord]:
+        cursor = TableCursor(self, table_cell.root_page, lazy=True)
+        if isinstance(value, Range) and not value.is_finite():
+            # Text or infinite bounds: no seek, every rowid is compared.
+            yield from (record for record in cursor.scan() if record.row_id in value)
+        elif isinstance(value, Range):
+            yield from cursor.scan(*value.row_id_bounds())
+        elif is_finite_number(value) and value == int(value):
+            record = cursor.seek(int(value))
+            if record is not None:
+                yield record
+
+    def tree_stats(self, root_page: int, *, table=True) -> "TreeStats":
+        """The estimated shape of a B-tree, worked out once per file version."""
+        stats = self.tree_stats_cache.get(root_page)
+        if stats is None:
+            from app.costs import tree_stats
+
+            if self.sidecar is not None and root_page in self.sidecar.trees:
+                stats = self.sidecar.trees[root_page].tree_stats()
+            else:
+                stats = tree_stats(self, root_page, table=table)
+            self.tree_stats_cache[root_page] = stats
+        return stats
+
+    def choose_access_path(
+        self, table_cell: Cell, where, columns: set[str] | None = None
+    ) -> "AccessPath":
+        """The cheapest way to find the rows that may match where.
+
+        columns are those the query reads; when given, an index holding all
+        of them can answer it without the table.
+        """
+        from app.costs import candidate_paths
+        from app.query import index_conditions
+
+        paths = candidate_paths(self, table_cell, index_conditions(where), columns)
+        # min() keeps the first of equal costs, and seeks come before the scan.
+        return min(paths, key=attrgetter("cost"))
+
+    def follow_access_path(
+        self, table_cell: Cell, path: "AccessPath"
+    ) -> Callable[[], Iterator[LazyRecord]]:
+        match path.kind:
+            case "rowid":
+                return partial(self.rowid_lookup, table_cell, path.value)
+            case "index" if path.covering:
+                return partial(self.index_entries, path.index_cell, path.value)
+            case "index":
+                return partial(
+                    self.index_lookup, table_cell, path.index_cell, path.value
+                )
+            case "index scan":
+                return partial(self.index_entries, path.index_cell)
+        return partial(
+            self.get_records, self.schema_table.db_header, table_cell, lazy=True
+        )
+
+    def row_cell(self, table_cell: Cell, path: "AccessPath") -> Cell:
+        """The cell describing the records path yields: the table's or an index's."""
+        if path.covering:
+            return table_cell.covering_view(path.index_cell)
+        return table_cell
+
+    def access_path(
+        self, table_cell: Cell, where
+    ) -> Callable[[], Iterator[LazyRecord]]:
+        """How to find the rows that may match where: by rowid, index or scan."""
+        return self.follow_access_path(
+            table_cell, self.choose_access_path(table_cell, where)
+        )
+
+    def search_records(self, table_cell: Cell, where) -> Iterator[LazyRecord]:
+        return self.access_path(table_cell, where)()
+
+    def column_getter(self, cell: Cell, column) -> Callable[[Record], Any]:
+        if cell.is_rowid(column):
+            return attrgetter("row_id")
+        index = cell.get_column_index(column)
+        default = cell.column_defaults[index]
+        if default is None:
+            return itemgetter(index)
+        return methodcaller("get", index, default)
+
+    def compile_where(self, cell: Cell, where) -> Callable[[Record], bool] | None:
+        if where is None:
+            return None
+        from app.query import compile_predicate
+
+        # On lazy records the predicate only decodes the columns it reads.
+        return compile_predicate(where, partial(self.column_getter, cell))
+
+    def filter_records(
+        self, cell: Cell, records: Iterable[Record], where
+    ) -> Iterator[Record]:
+        predicate = self.compile_where(cell, where)
+        return iter(records) if predicate is None else filter(predicate, records)
+
+    def iter_batches(self, table_name, batch_size=4096) -> Iterator[RecordBatch]:
+        cell = self.get_cell(table_name)
+        batch = RecordBatch(len(cell.columns), cell.column_defaults)
+        for record in TableCursor(self, cell.root_page, read_ahead=self.read_ahead):
+            batch.append(record)
+            if len(batch) == batch_size:
+                yield batch
+                batch = RecordBatch(len(cell.columns), cell.column_defaults)
+        if batch:
+            yield batch
+
+    def iter_column_batches(
+        self, *columns, table_name, where=None, batch_size=65536
+    ) -> Iterator[ColumnBatch]:
+        """Yield the selected columns of the matching rows in column-major batches.
+
+        Each batch is transposed and packed into typed buffers in bulk, so
+        the only per-row object is the decoded record itself.
+        """
+        cell = self.get_cell(table_name)
+        indexes = [
+            None if cell.is_rowid(column) else cell.get_column_index(column)
+            for column in columns
+        ]
+        if where is None:
+            # Without a predicate eager decoding beats lazy records.
+            records = TableCursor(self, cell.root_page, read_ahead=self.read_ahead)
         else:
-            return records
+            records = self.filter_records(cell, self.search_records(cell, where), where)
+        records = iter(records)
+        while batch := list(islice(records, batch_size)):
+            yield ColumnBatch.from_rows(
+                columns,
+                [record.row_id for record in batch],
+                [cell.complete(record.values) for record in batch],
+                indexes,
+            )
+
+    def iter_columns(
+        self, *columns, table_name, where=None, limit=None
+    ) -> Iterator[tuple]:
+        from app.query import referenced_columns
 
-    def fetch_columns(self, *columns, table_name, where, verbose=False):
-        schema_table = self.schema_table
         cell = self.get_cell(table_name)
-        records = self.get_records(schema_table.db_header, cell)
-        records = self.filter_records(*records, **where)
+        path = self.choose_access_path(
+            cell, where, {*columns, *referenced_columns(where)}
+        )
+        if self.workers > 1 and path.kind == "scan":
+            yield from ParallelScan(self, self.workers).iter_columns(
+                *columns, table_name=table_name, where=where, limit=limit
+            )
+            return
+        records = self.follow_access_path(cell, path)()
+        # Covered columns are read straight from the index entries.
+        cell = self.row_cell(cell, path)
+        getters = [self.column_getter(cell, column) for column in columns]
+        records = self.filter_records(cell, records, where)
+        for record in islice(records, limit):
+            yield tuple(get(record) for get in getters)
+
+    def fetch_columns(
+        self, *columns, table_name, where=None, limit=None, verbose=False
+    ):
         results = []
-        for record in records:
-            entry = []
-            for column in columns:
-                if column == "id":
-                    entry.append(record.row_id)
-                else:
-                    idx = cell.get_column_index(column)
-                    entry.append(record.values[idx])
-            results.append(tuple(entry))
-        if verbose:
-            for result in results:
+        for result in self.iter_columns(
+            *columns, table_name=table_name, where=where, limit=limit
+        ):
+            if verbose:
                 print("|".join(map(str, result)))
+            results.append(result)
         return results
 
+    def prepare(self, sql: str) -> "QueryPlan":
+        """The cached plan for sql, planned on first use."""
+        # The query engine is only imported once there is a query to run.
+        from app.plans import plan_query
+        from app.query import parse_command
+
+        self.check_schema_version()
+        plan = self.plan_cache.get(sql)
+        if plan is None:
+            plan = plan_query(self, parse_command(sql))
+            self.plan_cache.put(sql, plan)
+        return plan
+
+    def explain(self, sql: str, verbose=False) -> list[str]:
+        """The access path and steps sql would run with, without running it.
+
+        sql may carry a leading EXPLAIN or EXPLAIN QUERY PLAN.
+        """
+        plan = self.prepare(EXPLAIN_PATTERN.sub("", sql, count=1))
+        steps = plan.explain()
+        if verbose:
+            print("\n".join(steps))
+        return steps
+
+    def instrument(self, *sinks) -> "Instrumentation":
+        """Turn on per-query instrumentation, reporting to sinks as well."""
+        from app.instrument import Instrumentation
+
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+            self.instrumentation.install(self)
+            # Plans compiled so far hold predicates without the counters.
+            self.plan_cache.reset(self.plan_cache.version)
+        self.instrumentation.sinks.extend(sinks)
+        return self.instrumentation
+
+    def measure(self, sql: str) -> AbstractContextManager["QueryStats | None"]:
+        """Collect stats for the query run in the block, when instrumented."""
+        if self.instrumentation is None:
+            return nullcontext()
+        return self.instrumentation.query(sql, self.page_cache)
+
+    def run_query(self, sql: str) -> tuple["QueryPlan", Any]:
+        """Plan and start sql: the count for count(*), otherwise a row iterator."""
+        if self.instrumentation is not None:
+            return self.instrumentation.run(self, sql)
+        plan = self.prepare(sql)
+        return plan, plan.run()
+
+    def analyze(self, sql: str) -> "QueryStats":
+        """Run sql to the end, discarding the rows, and return what it cost."""
+        self.instrument()
+        with self.measure(sql) as stats:
+            plan, result = self.run_query(sql)
+            if not plan.command.is_count():
+                deque(result, maxlen=0)
+        return stats
+
+    def execute(self, sql: str):
+        """The rows of sql as a list, or the count for count(*), without printing."""
+        with self.measure(sql):
+            plan, result = self.run_query(sql)
+            return result if plan.command.is_count() else list(result)
+
+    def export(self, sql: str, stream, output_format="csv", *, header=True) -> int:
+        """Stream the rows of sql to stream as CSV, TSV or JSON Lines.
+
+        Returns the number of rows written.
+        """
+        from app.export import write_rows
+        from app.plans import column_names
+
+        with self.measure(sql):
+            plan, rows = self.run_query(sql)
+            if plan.command.is_count():
+                rows = [(rows,)]
+            names = column_names(self, plan.command)
+            return write_rows(stream, rows, names, output_format, header=header)
+
     def sql(self, command):
-        command = parse_command(command)
-        if command.function == "count":
-            return self.count_rows(command.table_name, verbose=True)
-        else:
-            return self.fetch_columns(
-                *command.columns,
-                table_name=command.table_name,
-                where=command.where,
-                verbose=True,
-            )
+        with self.measure(command):
+            plan, result = self.run_query(command)
+            if plan.command.is_count():
+                print(result)
+                return result
+            results = []
+            for row in result:
+                print("|".join(map(str, row)))
+                results.append(row)
+            return results
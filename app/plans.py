@@ -0,0 +1,573 @@
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+from typing import Any
+
+__all__ = ["JoinStep", "QueryPlan", "TableScan", "column_names", "plan_query"]
+
+from app.costs import AccessPath, lookup_paths
+from app.models import Cell
+from app.operators import (
+    AGGREGATES,
+    Count,
+    First,
+    group_rows,
+    hash_join,
+    join_key,
+    nested_loop_join,
+    order_rows,
+)
+from app.query import (
+    And,
+    Column,
+    Comparison,
+    FunctionCall,
+    Literal,
+    ParsedCommand,
+    Star,
+    compile_predicate,
+    conjuncts,
+    referenced_columns,
+    rename_columns,
+)
+
+
+@dataclass(slots=True)
+class TableScan:
+    """A plain projection over a full table scan, broken into its parts.
+
+    Callers that read the leaf pages themselves, like the async parser, use
+    these instead of QueryPlan.run().
+    """
+
+    cell: Cell
+    predicate: Callable | None
+    getters: list[Callable]
+    limit: int | None
+
+
+@dataclass(slots=True)
+class JoinStep:
+    """How one joined table is read and matched with the rows before it.
+
+    strategy is "hash" or "index". For a hash join access is how the
+    table is read and build the name of the side the hash table holds;
+    for an index nested-loop join access is the seek done per left row.
+    """
+
+    name: str
+    strategy: str
+    access: AccessPath
+    left: bool = False
+    build: str | None = None
+
+    def explain(self) -> str:
+        join = "LEFT JOIN" if self.left else "JOIN"
+        if self.strategy == "hash":
+            join = f"HASH {join} {self.name} (BUILD {self.build})"
+        else:
+            join = f"INDEX {join} {self.name}"
+        return f"{join}: {self.access.describe(self.name)}"
+
+
+@dataclass(slots=True)
+class QueryPlan:
+    """A parsed query with its access path, predicate and getters resolved.
+
+    run() executes it and returns the rows, or the count for count(*).
+    """
+
+    command: ParsedCommand
+    run: Callable[[], Any]
+    scan: TableScan | None = None
+    access: AccessPath | None = None
+    # Whether the scan is split across worker processes.
+    parallel: bool = False
+    joins: list[JoinStep] = field(default_factory=list)
+
+    def explain(self) -> list[str]:
+        """How the query runs, one step per line, like EXPLAIN QUERY PLAN."""
+        steps = [self.access.describe(self.command.table_name)]
+        if self.parallel:
+            steps[0] += " IN PARALLEL"
+        steps.extend(join.explain() for join in self.joins)
+        if self.command.group_by:
+            steps.append("USE HASH TABLE FOR GROUP BY")
+        if self.command.order_by:
+            if self.command.limit is None:
+                steps.append("USE SORTER FOR ORDER BY")
+            else:
+                steps.append(f"USE TOP-{self.command.limit} HEAP FOR ORDER BY")
+        return steps
+
+
+def result_columns(cell: Cell, command: ParsedCommand) -> list[str]:
+    columns = []
+    for column in command.columns:
+        match column:
+            case Star():
+                columns.extend(cell.columns)
+            case Column(name):
+                columns.append(name)
+            case _:
+                raise ValueError(f"Unsupported result column: {column}")
+    return columns
+
+
+def column_names(parser, command: ParsedCommand) -> list[str]:
+    """Labels for the result columns, the way sqlite3 heads them."""
+    scope = JoinScope(parser, command)
+    names = []
+    for column in command.columns:
+        match column:
+            case Star(table):
+                tables = (
+                    range(len(scope.cells)) if table is None else [scope.find(table)]
+                )
+                for i in tables:
+                    names.extend(scope.cells[i].columns)
+            case Column(name):
+                # A qualified column is headed by its own name.
+                names.append(name.rpartition(".")[2])
+            case _:
+                names.append(expression_label(column))
+    return names
+
+
+def expression_label(expression) -> str:
+    match expression:
+        case Star():
+            return "*"
+        case Column(name):
+            return name
+        case FunctionCall(name, args):
+            return f"{name}({', '.join(map(expression_label, args))})"
+        case Literal(value):
+            return repr(value)
+        case _:
+            raise ValueError(f"Unsupported result column: {expression}")
+
+
+def plan_query(parser, command: ParsedCommand) -> QueryPlan:
+    """Resolve everything about command that does not depend on the data."""
+    if command.joins or command.alias:
+        return plan_join(parser, command)
+    cell = parser.get_cell(command.table_name)
+    access = parser.choose_access_path(
+        cell, command.where, command.referenced_columns()
+    )
+    full_scan = access.kind == "scan"
+    if command.is_count() and command.where is None:
+        # count_rows takes a sidecar's count or a covering index when it can;
+        # only a scan of the table itself is split across processes.
+        return QueryPlan(
+            command,
+            partial(parser.count_rows, command.table_name),
+            access=access,
+            parallel=parser.workers > 1
+            and full_scan
+            and parser.known_leaf_pages(cell.root_page) is None,
+        )
+    if (
+        parser.workers > 1
+        and not command.is_aggregate()
+        and not command.order_by
+        and full_scan
+    ):
+        return QueryPlan(
+            command,
+            partial(
+                parser.iter_columns,
+                *result_columns(cell, command),
+                table_name=command.table_name,
+                where=command.where,
+                limit=command.limit,
+            ),
+            access=access,
+            parallel=True,
+        )
+
+    search = parser.follow_access_path(cell, access)
+    # With a covering index the records are index entries, and every column
+    # is resolved against the index's layout instead of the table's.
+    cell = parser.row_cell(cell, access)
+    predicate = parser.compile_where(cell, command.where)
+
+    def records():
+        return search() if predicate is None else filter(predicate, search())
+
+    resolve = partial(parser.column_getter, cell)
+    if command.is_count() or command.is_aggregate():
+        return QueryPlan(command, plan_rows(command, records, resolve), access=access)
+    getters = [resolve(column) for column in result_columns(cell, command)]
+    scan = None
+    if full_scan and not command.order_by:
+        scan = TableScan(cell, predicate, getters, command.limit)
+    return QueryPlan(
+        command, plan_rows(command, records, resolve, getters), scan, access
+    )
+
+
+def plan_rows(
+    command: ParsedCommand,
+    records: Callable[[], Iterable],
+    resolve: Callable[[str], Callable],
+    getters: list[Callable] | None = None,
+) -> Callable[[], Any]:
+    """What is left of a query once its rows are found: count, aggregate,
+    order and project them.
+
+    records() yields the rows and resolve(column) returns a getter for a
+    column of one; getters are those of the result columns.
+    """
+    if command.is_count():
+        return lambda: sum(1 for _ in records())
+    if command.is_aggregate():
+        return plan_aggregate(command, records, resolve)
+
+    limit = command.limit
+    if not command.order_by:
+
+        def run():
+            for record in islice(records(), limit):
+                yield tuple(get(record) for get in getters)
+
+        return run
+
+    terms = []
+    for term in command.order_by:
+        match term.expression:
+            case Literal(int(position)) if 0 < position <= len(getters):
+                get = getters[position - 1]
+            case Column(name):
+                get = resolve(name)
+            case _:
+                raise ValueError(f"Unsupported ORDER BY term: {term.expression}")
+        terms.append((get, term.descending))
+
+    def run():
+        # Only the records that make the cut are held, so ORDER BY ... LIMIT k
+        # keeps k rows in memory.
+        ordered = order_rows(records(), terms, limit)
+        return [tuple(get(record) for get in getters) for record in ordered]
+
+    return run
+
+
+def plan_aggregate(
+    command: ParsedCommand, records, resolve
+) -> Callable[[], list[tuple]]:
+    aggregates = []
+    for column in command.columns:
+        match column:
+            case FunctionCall("count", (Star(),)):
+                aggregates.append((Count, lambda record: 1))
+            case FunctionCall(name, (Column(argument),)) if name in AGGREGATES:
+                aggregates.append((AGGREGATES[name], resolve(argument)))
+            case Column(name):
+                aggregates.append((First, resolve(name)))
+            case _:
+                raise ValueError(f"Unsupported result column: {column}")
+    key_getters = [resolve(column.name) for column in command.group_by]
+    terms = []
+    for term in command.order_by:
+        match term.expression:
+            case Literal(int(position)) if 0 < position <= len(command.columns):
+                i = position - 1
+            case expression if expression in command.columns:
+                i = command.columns.index(expression)
+            case _:
+                raise ValueError(
+                    f"ORDER BY term is not a result column: {term.expression}"
+                )
+        terms.append((itemgetter(i), term.descending))
+
+    def run():
+        rows = group_rows(records(), key_getters, aggregates)
+        if not terms:
+            return rows[: command.limit]
+        return order_rows(rows, terms, command.limit)
+
+    return run
+
+
+class JoinScope:
+    """The tables a query reads, in join order, and what its column names mean.
+
+    A column is named "table.column", where table is the alias or the
+    table name, or by its bare name when only one of the tables has it.
+    """
+
+    def __init__(self, parser, command: ParsedCommand):
+        tables = [(command.table_name, command.alias)]
+        tables += [(join.table_name, join.alias) for join in command.joins]
+        self.cells = [parser.get_cell(table_name) for table_name, _ in tables]
+        self.table_names = [table_name.lower() for table_name, _ in tables]
+        self.aliases = [
+            alias or name for (_, alias), name in zip(tables, self.table_names)
+        ]
+
+    def find(self, table: str) -> int:
+        """Position of the table with this alias, or else this name."""
+        for names in (self.aliases, self.table_names):
+            if table in names:
+                return names.index(table)
+        raise ValueError(f"No such table: {table}")
+
+    def has_column(self, i: int, column: str) -> bool:
+        cell = self.cells[i]
+        return cell.is_rowid(column) or column in cell.column_indexes
+
+    def locate(self, name: str) -> tuple[int, str]:
+        """The position of the table a column name refers to, and its bare name."""
+        table, _, column = name.rpartition(".")
+        if table:
+            i = self.find(table)
+            if not self.has_column(i, column):
+                raise ValueError(f"No such column: {name}")
+            return i, column
+        found = [i for i in range(len(self.cells)) if self.has_column(i, column)]
+        if len(found) > 1:
+            raise ValueError(f"Ambiguous column name: {name}")
+        if not found:
+            raise ValueError(f"No such column: {name}")
+        return found[0], column
+
+    def result_columns(self, command: ParsedCommand) -> list[str]:
+        columns = []
+        for column in command.columns:
+            match column:
+                case Star(table):
+                    tables = (
+                        range(len(self.cells)) if table is None else [self.find(table)]
+                    )
+                    for i in tables:
+                        columns.extend(
+                            f"{self.aliases[i]}.{name}"
+                            for name in self.cells[i].columns
+                        )
+                case Column(name):
+                    columns.append(name)
+                case _:
+                    raise ValueError(f"Unsupported result column: {column}")
+        return columns
+
+    def needed_columns(self, command: ParsedCommand) -> list[set[str] | None]:
+        """The columns the query reads from each table, None for whole rows."""
+        needed = [set() for _ in self.cells]
+        expressions = [
+            command.columns,
+            command.where,
+            command.group_by,
+            [term.expression for term in command.order_by],
+            [join.on for join in command.joins],
+        ]
+        for name in referenced_columns(expressions):
+            i, column = self.locate(name)
+            if needed[i] is not None:
+                needed[i].add(column)
+        for column in command.columns:
+            match column:
+                case Star(None):
+                    needed = [None] * len(self.cells)
+                case Star(table):
+                    needed[self.find(table)] = None
+        return needed
+
+
+def plan_join(parser, command: ParsedCommand) -> QueryPlan:
+    """Plan a query over joined tables as a pipeline of joins.
+
+    Rows are tuples with one record per table, None for the missing side
+    of a LEFT JOIN. The first table is read by its cheapest access path and
+    streams through one join per other table. Each join either seeks that
+    table by rowid or index for every row, an index nested-loop join, or
+    reads it once into a hash table, whichever is estimated to read fewer
+    pages. WHERE terms on a single table are applied to that table's rows
+    before the join, except on the right side of a LEFT JOIN where they
+    have to see the NULLs the join adds.
+    """
+    scope = JoinScope(parser, command)
+    needed = scope.needed_columns(command)
+    outer = [False] + [join.left for join in command.joins]
+    filters = [[] for _ in scope.cells]
+    residual = []
+    for term in conjuncts(command.where):
+        tables = {scope.locate(name)[0] for name in referenced_columns(term)}
+        if len(tables) == 1 and not outer[i := tables.pop()]:
+            filters[i].append(bare_columns(scope, term))
+        else:
+            residual.append(term)
+
+    row_cells = [None] * len(scope.cells)
+
+    def resolve(name: str) -> Callable:
+        i, column = scope.locate(name)
+        get = parser.column_getter(row_cells[i], column)
+        return lambda row: None if row[i] is None else get(row[i])
+
+    cell = scope.cells[0]
+    access = parser.choose_access_path(cell, conjunction(filters[0]), needed[0])
+    row_cells[0] = parser.row_cell(cell, access)
+    first = table_records(parser, row_cells[0], access, cell, conjunction(filters[0]))
+    rows = access.rows
+    stages = []
+    steps = []
+    for i, join in enumerate(command.joins, 1):
+        keys = join_keys(scope, i, join.on, filters[i])
+        stage, step, rows = plan_join_step(
+            parser,
+            scope,
+            i,
+            join,
+            keys,
+            filters[i],
+            needed[i],
+            rows,
+            row_cells,
+            resolve,
+        )
+        stages.append(stage)
+        steps.append(step)
+    predicate = None
+    if residual:
+        predicate = compile_predicate(conjunction(residual), resolve)
+
+    def records():
+        joined = ((record,) for record in first())
+        for stage in stages:
+            joined = stage(joined)
+        return joined if predicate is None else filter(predicate, joined)
+
+    getters = None
+    if not command.is_count() and not command.is_aggregate():
+        getters = [resolve(column) for column in scope.result_columns(command)]
+    run = plan_rows(command, records, resolve, getters)
+    return QueryPlan(command, run, access=access, joins=steps)
+
+
+def plan_join_step(
+    parser, scope, i, join, keys, filters, needed, left_rows, row_cells, resolve
+):
+    """The stage joining table i onto the rows before it, its JoinStep, and
+    the estimated number of rows coming out of it."""
+    cell = scope.cells[i]
+    name = scope.aliases[i]
+    where = conjunction(filters)
+    access = parser.choose_access_path(cell, where, needed)
+    hash_cost = access.cost
+    lookups = [
+        (path, key) for key in keys for path in lookup_paths(parser, cell, key[1])
+    ]
+    # Seeks win ties, as in choose_access_path.
+    lookup = min(lookups, key=lambda item: item[0].cost, default=None)
+    if lookup is not None and left_rows * lookup[0].cost <= hash_cost:
+        path, (left_name, _) = lookup
+        row_cells[i] = cell
+        predicate = parser.compile_where(cell, where)
+        rest = [key for key in keys if key is not lookup[1]]
+        left_key = join_key([resolve(left) for left, _ in rest])
+        right_key = join_key([parser.column_getter(cell, right) for _, right in rest])
+
+        def matches(row, record):
+            if predicate is not None and not predicate(record):
+                return False
+            if not rest:
+                return True
+            key = left_key(row)
+            return key is not None and key == right_key(record)
+
+        if path.index_cell is None:
+            seek = partial(parser.rowid_lookup, cell)
+        else:
+            seek = partial(parser.index_lookup, cell, path.index_cell)
+        stage = partial(
+            nested_loop_join,
+            lookup=seek,
+            left_value=resolve(left_name),
+            matches=matches if rest or predicate is not None else None,
+            outer=join.left,
+        )
+        rows = left_rows * path.rows if path.index_cell is not None else left_rows
+        return stage, JoinStep(name, "index", path, join.left), rows
+
+    row_cells[i] = parser.row_cell(cell, access)
+    right = table_records(parser, row_cells[i], access, cell, where)
+    left_key = join_key([resolve(left) for left, _ in keys])
+    right_key = join_key(
+        [parser.column_getter(row_cells[i], right) for _, right in keys]
+    )
+    # A LEFT JOIN has to see every left row, so it can only build on the right.
+    build_left = not join.left and left_rows < access.rows
+    build = ", ".join(scope.aliases[:i]) if build_left else name
+
+    def stage(joined):
+        return hash_join(
+            joined,
+            right(),
+            left_key,
+            right_key,
+            outer=join.left,
+            build_left=build_left,
+        )
+
+    step = JoinStep(name, "hash", access, join.left, build)
+    return stage, step, max(left_rows, access.rows)
+
+
+def join_keys(scope: JoinScope, i: int, on, filters: list) -> list[tuple[str, str]]:
+    """Split a JOIN's ON clause into the column pairs it equates.
+
+    Each pair is a column of an earlier table, as named in the query, and
+    a bare column of table i. Terms on table i alone are added to filters.
+    """
+    keys = []
+    for term in conjuncts(on):
+        tables = {scope.locate(name)[0] for name in referenced_columns(term)}
+        if tables == {i}:
+            filters.append(bare_columns(scope, term))
+            continue
+        match term:
+            case Comparison("=" | "==", Column(first), Column(second)):
+                located = {name: scope.locate(name) for name in (first, second)}
+                for left, right in ((first, second), (second, first)):
+                    (left_table, _), (right_table, column) = (
+                        located[left],
+                        located[right],
+                    )
+                    if right_table == i and left_table < i:
+                        keys.append((left, column))
+                        break
+                else:
+                    raise ValueError(f"Unsupported JOIN condition: {term}")
+                continue
+        raise ValueError(f"Unsupported JOIN condition: {term}")
+    if not keys:
+        raise ValueError(
+            f"JOIN {scope.aliases[i]} needs an equality with an earlier table"
+        )
+    return keys
+
+
+def table_records(parser, row_cell: Cell, access: AccessPath, cell: Cell, where):
+    """A function returning the records of one joined table that pass where."""
+    search = parser.follow_access_path(cell, access)
+    predicate = parser.compile_where(row_cell, where)
+
+    def records():
+        return search() if predicate is None else filter(predicate, search())
+
+    return records
+
+
+def bare_columns(scope: JoinScope, expression):
+    """expression with its columns named as in their own table."""
+    return rename_columns(expression, lambda name: scope.locate(name)[1])
+
+
+def conjunction(terms: list):
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else And(tuple(terms))
@@ -0,0 +1,92 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from os import PathLike
+
+__all__ = ["ReaderPool"]
+
+from app.cache import DEFAULT_CACHE_SIZE, PageCache
+from app.models import DbHeader
+from app.pager import PreadPageSource
+from app.parser import SqliteParser
+
+DEFAULT_MAX_READERS = 8
+
+
+class ReaderPool:
+    """Parsers over one file for concurrent queries from many threads.
+
+    The readers share a single pread-based page source, a locked page cache
+    and the parsed schema, so checking one out costs nothing once the pool
+    is warm. Each reader, with its plans and cursors, serves one thread at a
+    time.
+    """
+
+    def __init__(
+        self,
+        db_path: PathLike,
+        *,
+        max_readers: int = DEFAULT_MAX_READERS,
+        page_cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self.db_path = db_path
+        self.page_source = PreadPageSource(db_path)
+        self.page_cache = PageCache(page_cache_size)
+        self.schema_table = None
+        self.version = None
+        self._idle: list[SqliteParser] = []
+        self._slots = threading.BoundedSemaphore(max_readers)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._idle.clear()
+            self.page_cache.clear()
+        self.page_source.close()
+
+    def _checkout(self) -> SqliteParser:
+        version = DbHeader.read_version(self.page_source.read_header())
+        with self._lock:
+            if version != self.version:
+                # Another writer changed the file: start over from disk.
+                self._idle.clear()
+                self.page_cache.clear()
+                self.page_source.refresh()
+                self.schema_table = None
+                self.version = version
+            if self._idle:
+                return self._idle.pop()
+            parser = SqliteParser(
+                self.db_path,
+                page_source=self.page_source,
+                page_cache=self.page_cache,
+                schema_table=self.schema_table,
+            )
+            if self.schema_table is None:
+                self.schema_table = parser.schema_table
+            return parser
+
+    def _checkin(self, parser: SqliteParser):
+        with self._lock:
+            if parser.schema_table is self.schema_table:
+                self._idle.append(parser)
+
+    @contextmanager
+    def reader(self) -> Iterator[SqliteParser]:
+        """Check out a parser for the calling thread, waiting if all are busy."""
+        with self._slots:
+            parser = self._checkout()
+            try:
+                yield parser
+            finally:
+                self._checkin(parser)
+
+    def execute(self, sql: str):
+        with self.reader() as parser:
+            return parser.execute(sql)
@@ -0,0 +1,698 @@
+import operator
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field, fields, is_dataclass, replace
+from typing import Any, NamedTuple
+
+from app.utils import Range, sort_key
+
+__all__ = [
+    "And",
+    "Between",
+    "Column",
+    "Comparison",
+    "FunctionCall",
+    "InList",
+    "IsNull",
+    "Join",
+    "Like",
+    "Literal",
+    "Not",
+    "Or",
+    "OrderTerm",
+    "ParsedCommand",
+    "Star",
+    "compile_predicate",
+    "conjuncts",
+    "index_conditions",
+    "parse_command",
+    "parse_expression",
+    "referenced_columns",
+    "rename_columns",
+    "tokenize",
+]
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+        |(?P<blob>[xX]'[0-9a-fA-F]*')
+        |(?P<string>'(?:[^']|'')*')
+        |(?P<quoted>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])
+        |(?P<word>[A-Za-z_][A-Za-z_0-9$]*)
+        |(?P<op><=|>=|<>|!=|==|[=<>(),*;.-])
+    )""",
+    re.VERBOSE,
+)
+KEYWORDS = {
+    "AND",
+    "AS",
+    "ASC",
+    "BETWEEN",
+    "BY",
+    "DESC",
+    "FROM",
+    "GROUP",
+    "IN",
+    "INNER",
+    "IS",
+    "JOIN",
+    "LEFT",
+    "LIKE",
+    "LIMIT",
+    "NOT",
+    "NULL",
+    "ON",
+    "OR",
+    "ORDER",
+    "OUTER",
+    "SELECT",
+    "WHERE",
+}
+
+
+class Token(NamedTuple):
+    kind: str
+    value: Any
+
+
+def tokenize(text: str) -> list[Token]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected character at {position}: {text[position:]}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match[kind]
+        match kind:
+            case "number":
+                value = float(value) if any(c in value for c in ".eE") else int(value)
+            case "blob":
+                value = bytes.fromhex(value[2:-1])
+            case "string":
+                value = value[1:-1].replace("''", "'")
+            case "quoted":
+                kind, value = "identifier", value[1:-1].replace('""', '"')
+            case "word" if value.upper() in KEYWORDS:
+                kind, value = "keyword", value.upper()
+            case "word":
+                kind = "identifier"
+        tokens.append(Token(kind, value))
+    return tokens
+
+
+@dataclass(frozen=True)
+class Column:
+    # "table.column" when qualified, as only joins need.
+    name: str
+
+
+@dataclass(frozen=True)
+class Literal:
+    value: Any
+
+
+@dataclass(frozen=True)
+class Star:
+    # The table or alias of table.*, None for all the tables.
+    table: str | None = None
+
+
+@dataclass(frozen=True)
+class FunctionCall:
+    name: str
+    args: tuple = ()
+
+
+@dataclass(frozen=True)
+class Comparison:
+    op: str
+    left: Any
+    right: Any
+
+
+@dataclass(frozen=True)
+class Between:
+    operand: Any
+    low: Any
+    high: Any
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class InList:
+    operand: Any
+    values: tuple
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class Like:
+    operand: Any
+    pattern: str
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class IsNull:
+    operand: Any
+    negated: bool = False
+
+
+@dataclass(frozen=True)
+class And:
+    terms: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    terms: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    term: Any
+
+
+@dataclass(frozen=True)
+class OrderTerm:
+    expression: Any
+    descending: bool = False
+
+
+@dataclass(frozen=True)
+class Join:
+    """JOIN table_name [alias] ON on; left for LEFT [OUTER] JOIN."""
+
+    table_name: str
+    on: Any
+    alias: str | None = None
+    left: bool = False
+
+
+@dataclass
+class ParsedCommand:
+    table_name: str = field(default="")
+    columns: list = field(default_factory=list)
+    alias: str | None = None
+    joins: list[Join] = field(default_factory=list)
+    where: Any = None
+    group_by: list[Column] = field(default_factory=list)
+    order_by: list[OrderTerm] = field(default_factory=list)
+    limit: int | None = None
+
+    def is_count(self) -> bool:
+        return (
+            self.columns == [FunctionCall("count", (Star(),))]
+            and not self.group_by
+            and not self.order_by
+        )
+
+    def referenced_columns(self) -> set[str] | None:
+        """Every column the query reads, or None when it needs whole rows."""
+        if any(isinstance(column, Star) for column in self.columns):
+            return None
+        order_by = [term.expression for term in self.order_by]
+        on = [join.on for join in self.joins]
+        return referenced_columns(
+            (self.columns, self.where, self.group_by, order_by, on)
+        )
+
+    def is_aggregate(self) -> bool:
+        return bool(self.group_by) or any(
+            isinstance(column, FunctionCall) for column in self.columns
+        )
+
+
+class QueryParser:
+    """Recursive-descent parser for the SELECT subset the engine runs."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self, kind=None, value=None) -> Token | None:
+        if self.position == len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if kind is not None and token.kind != kind:
+            return None
+        if value is not None and token.value != value:
+            return None
+        return token
+
+    def accept(self, kind=None, value=None) -> Token | None:
+        token = self.peek(kind, value)
+        if token is not None:
+            self.position += 1
+        return token
+
+    def expect(self, kind, value=None) -> Token:
+        token = self.accept(kind, value)
+        if token is None:
+            found = self.peek()
+            raise ValueError(
+                f"Expected {value or kind}, found {found.value if found else 'end of input'}"
+            )
+        return token
+
+    def keyword(self, value) -> Token | None:
+        return self.accept("keyword", value)
+
+    def finish(self):
+        self.accept("op", ";")
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.peek().value!r}")
+
+    def select(self) -> ParsedCommand:
+        self.expect("keyword", "SELECT")
+        command = ParsedCommand(columns=[self.result_column()])
+        while self.accept("op", ","):
+            command.columns.append(self.result_column())
+        self.expect("keyword", "FROM")
+        command.table_name = self.expect("identifier").value
+        command.alias = self.alias()
+        while join := self.join():
+            command.joins.append(join)
+        if self.keyword("WHERE"):
+            command.where = self.expression()
+        if self.keyword("GROUP"):
+            self.expect("keyword", "BY")
+            command.group_by = [self.column()]
+            while self.accept("op", ","):
+                command.group_by.append(self.column())
+        if self.keyword("ORDER"):
+            self.expect("keyword", "BY")
+            command.order_by = [self.order_term()]
+            while self.accept("op", ","):
+                command.order_by.append(self.order_term())
+        if self.keyword("LIMIT"):
+            command.limit = self.expect("number").value
+        self.finish()
+        return command
+
+    def alias(self) -> str | None:
+        if self.keyword("AS"):
+            return self.expect("identifier").value.lower()
+        if token := self.accept("identifier"):
+            return token.value.lower()
+        return None
+
+    def join(self) -> Join | None:
+        left = bool(self.keyword("LEFT"))
+        if left:
+            self.keyword("OUTER")
+        elif not self.keyword("INNER") and not self.peek("keyword", "JOIN"):
+            return None
+        self.expect("keyword", "JOIN")
+        table_name = self.expect("identifier").value
+        alias = self.alias()
+        self.expect("keyword", "ON")
+        return Join(table_name, self.expression(), alias, left)
+
+    def column(self) -> Column:
+        name = self.expect("identifier").value.lower()
+        if self.accept("op", "."):
+            name += "." + self.expect("identifier").value.lower()
+        return Column(name)
+
+    def result_column(self):
+        if self.accept("op", "*"):
+            return Star()
+        name = self.expect("identifier").value.lower()
+        if self.accept("op", "."):
+            if self.accept("op", "*"):
+                return Star(name)
+            return Column(f"{name}.{self.expect('identifier').value.lower()}")
+        if not self.accept("op", "("):
+            return Column(name)
+        args = ()
+        if self.accept("op", "*"):
+            args = (Star(),)
+        elif not self.peek("op", ")"):
+            args = (self.operand(),)
+        self.expect("op", ")")
+        return FunctionCall(name, args)
+
+    def order_term(self) -> OrderTerm:
+        if token := self.accept("number"):
+            # ORDER BY 2 refers to the second result column.
+            expression = Literal(token.value)
+        else:
+            expression = self.result_column()
+        if self.keyword("DESC"):
+            return OrderTerm(expression, descending=True)
+        self.keyword("ASC")
+        return OrderTerm(expression)
+
+    def expression(self):
+        terms = [self.conjunction()]
+        while self.keyword("OR"):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else Or(tuple(terms))
+
+    def conjunction(self):
+        terms = [self.negation()]
+        while self.keyword("AND"):
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else And(tuple(terms))
+
+    def negation(self):
+        if self.keyword("NOT"):
+            return Not(self.negation())
+        return self.predicate()
+
+    def predicate(self):
+        if self.accept("op", "("):
+            expression = self.expression()
+            self.expect("op", ")")
+            return expression
+        operand = self.operand()
+        if token := self.accept("op"):
+            if token.value not in COMPARISONS:
+                raise ValueError(f"Unexpected {token.value!r}")
+            return Comparison(token.value, operand, self.operand())
+        if self.keyword("IS"):
+            negated = bool(self.keyword("NOT"))
+            self.expect("keyword", "NULL")
+            return IsNull(operand, negated)
+        negated = bool(self.keyword("NOT"))
+        if self.keyword("BETWEEN"):
+            low = self.operand()
+            self.expect("keyword", "AND")
+            return Between(operand, low, self.operand(), negated)
+        if self.keyword("IN"):
+            self.expect("op", "(")
+            values = [self.literal()]
+            while self.accept("op", ","):
+                values.append(self.literal())
+            self.expect("op", ")")
+            return InList(operand, tuple(values), negated)
+        if self.keyword("LIKE"):
+            return Like(operand, self.expect("string").value, negated)
+        raise ValueError(f"Expected a predicate after {operand}")
+
+    def operand(self):
+        if self.peek("identifier"):
+            return self.column()
+        return self.literal()
+
+    def literal(self) -> Literal:
+        if self.keyword("NULL"):
+            return Literal(None)
+        if self.accept("op", "-"):
+            return Literal(-self.expect("number").value)
+        for kind in ("number", "string", "blob"):
+            if token := self.accept(kind):
+                return Literal(token.value)
+        found = self.peek()
+        raise ValueError(
+            f"Expected a value, found {found.value if found else 'end of input'}"
+        )
+
+
+def parse_command(command: str) -> ParsedCommand:
+    return QueryParser(command).select()
+
+
+def parse_expression(text: str):
+    parser = QueryParser(text)
+    expression = parser.expression()
+    parser.finish()
+    return expression
+
+
+# Ordering comparisons work on sort keys, so that values of different
+# storage classes compare the way SQLite compares them.
+COMPARISONS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<>": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+def referenced_columns(expression) -> set[str]:
+    """Names of the columns an expression, or a sequence of them, reads."""
+    match expression:
+        case Column(name):
+            return {name}
+        case tuple() | list():
+            return set().union(*map(referenced_columns, expression))
+        case _ if is_dataclass(expression):
+            return referenced_columns(
+                [getattr(expression, field.name) for field in fields(expression)]
+            )
+    return set()
+
+
+def rename_columns(expression, rename: Callable[[str], str]):
+    """A copy of expression with every column name passed through rename."""
+    match expression:
+        case Column(name):
+            return Column(rename(name))
+        case tuple() | list():
+            return type(expression)(rename_columns(item, rename) for item in expression)
+        case _ if is_dataclass(expression):
+            return replace(
+                expression,
+                **{
+                    field.name: rename_columns(getattr(expression, field.name), rename)
+                    for field in fields(expression)
+                },
+            )
+    return expression
+
+
+def conjuncts(expression) -> tuple:
+    """The top-level AND terms of expression."""
+    if expression is None:
+        return ()
+    return expression.terms if isinstance(expression, And) else (expression,)
+
+
+def compile_predicate(expression, resolve) -> Callable[[Any], bool]:
+    """Compile a WHERE expression into a function of one record.
+
+    resolve(column_name) returns a getter for that column, so only the
+    columns the expression references are ever read from a record.
+    Comparisons with NULL are unknown and unknown rows do not match.
+    """
+    if expression is None:
+        return lambda record: True
+    predicate = _compile(expression, resolve)
+    return lambda record: predicate(record) is True
+
+
+def _compile(expression, resolve):
+    # Each closure returns True, False or None for SQL's unknown.
+    match expression:
+        case Comparison():
+            return _compile_comparison(expression, resolve)
+        case Between(operand, low, high, negated):
+            return _compile_not(
+                _compile(
+                    And(
+                        (
+                            Comparison(">=", operand, low),
+                            Comparison("<=", operand, high),
+                        )
+                    ),
+                    resolve,
+                ),
+                negated,
+            )
+        case InList(operand, values, negated):
+            return _compile_not(_compile_in(operand, values, resolve), negated)
+        case Like(operand, pattern, negated):
+            return _compile_not(_compile_like(operand, pattern, resolve), negated)
+        case IsNull(operand, negated):
+            get = _compile_operand(operand, resolve)
+            return _compile_not(lambda record: get(record) is None, negated)
+        case And(terms):
+            return _compile_and([_compile(term, resolve) for term in terms])
+        case Or(terms):
+            return _compile_or([_compile(term, resolve) for term in terms])
+        case Not(term):
+            return _compile_not(_compile(term, resolve), True)
+        case Column() | Literal():
+            get = _compile_operand(expression, resolve)
+            return lambda record: _truth(get(record))
+    raise ValueError(f"Unsupported expression: {expression}")
+
+
+def _truth(value):
+    return None if value is None else bool(value)
+
+
+def _compile_operand(operand, resolve):
+    if isinstance(operand, Column):
+        return resolve(operand.name)
+    value = operand.value
+    return lambda record: value
+
+
+def _compile_comparison(expression: Comparison, resolve):
+    op, left, right = expression.op, expression.left, expression.right
+    if isinstance(left, Literal) and isinstance(right, Column):
+        op, left, right = FLIPPED.get(op, op), right, left
+    compare = COMPARISONS[op]
+    get = _compile_operand(left, resolve)
+    if isinstance(right, Literal):
+        if right.value is None:
+            return lambda record: None
+        if compare in (operator.eq, operator.ne):
+            # Values of different storage classes are never equal, which is
+            # what == already does for the Python types a record holds.
+            value = right.value
+
+            def predicate(record):
+                left_value = get(record)
+                return None if left_value is None else compare(left_value, value)
+
+            return predicate
+
+        key = sort_key(right.value)
+
+        def predicate(record):
+            left_value = get(record)
+            return None if left_value is None else compare(sort_key(left_value), key)
+
+        return predicate
+
+    get_right = _compile_operand(right, resolve)
+
+    def predicate(record):
+        left_value, right_value = get(record), get_right(record)
+        if left_value is None or right_value is None:
+            return None
+        return compare(sort_key(left_value), sort_key(right_value))
+
+    return predicate
+
+
+def _compile_in(operand, values, resolve):
+    get = _compile_operand(operand, resolve)
+    keys = {sort_key(value.value) for value in values if value.value is not None}
+    has_null = any(value.value is None for value in values)
+
+    def predicate(record):
+        value = get(record)
+        if value is None:
+            return None
+        if sort_key(value) in keys:
+            return True
+        return None if has_null else False
+
+    return predicate
+
+
+def like_pattern(pattern: str) -> re.Pattern:
+    """Translate a LIKE pattern, which is case-insensitive for ASCII."""
+    parts = [
+        ".*" if char == "%" else "." if char == "_" else re.escape(char)
+        for char in pattern
+    ]
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def _compile_like(operand, pattern, resolve):
+    get = _compile_operand(operand, resolve)
+    fullmatch = like_pattern(pattern).fullmatch
+
+    def predicate(record):
+        value = get(record)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        return fullmatch(str(value)) is not None
+
+    return predicate
+
+
+def _compile_and(terms):
+    def predicate(record):
+        result = True
+        for term in terms:
+            value = term(record)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    return predicate
+
+
+def _compile_or(terms):
+    def predicate(record):
+        result = False
+        for term in terms:
+            value = term(record)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    return predicate
+
+
+def _compile_not(term, negated):
+    if not negated:
+        return term
+
+    def predicate(record):
+        value = term(record)
+        return None if value is None else not value
+
+    return predicate
+
+
+def index_conditions(expression) -> dict[str, Any]:
+    """Constraints a B-tree search can use, from the top-level AND terms.
+
+    Maps a column to a value it must equal or a Range it must lie in. The
+    conditions only narrow the search; the whole expression is still
+    checked against every row the search returns.
+    """
+    conditions = {}
+    for term in conjuncts(expression):
+        match term:
+            case Comparison(op, Column(name), Literal(value)) | Comparison(
+                op, Literal(value), Column(name)
+            ) if value is not None and op not in ("!=", "<>"):
+                if isinstance(term.left, Literal):
+                    op = FLIPPED.get(op, op)
+                condition = _comparison_condition(op, value)
+            case Between(Column(name), Literal(low), Literal(high), False) if (
+                low is not None and high is not None
+            ):
+                condition = Range(low, high)
+            case _:
+                continue
+        # Further terms on the same column are left to the residual check.
+        conditions.setdefault(name, condition)
+    return conditions
+
+
+def _comparison_condition(op, value):
+    match op:
+        case "=" | "==":
+            return value
+        case "<":
+            return Range(high=value, high_inclusive=False)
+        case "<=":
+            return Range(high=value)
+        case ">":
+            return Range(low=value, low_inclusive=False)
+        case ">=":
+            return Range(low=value)
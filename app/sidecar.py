@@ -0,0 +1,209 @@
+"""Statistics and page maps for a database file, saved next to it.
+
+Without them every process starts by walking B-trees: the schema table
+for the schema, each table's interior pages for its leaf page list, every
+leaf for a row count. A sidecar file keeps all of that, along with each
+column's minimum and maximum, as JSON. It describes one version of the
+database, the (file_change_counter, schema_cookie) pair, and is ignored
+once the file has changed.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from os import PathLike
+from pathlib import Path
+from typing import Any
+
+from app.costs import TreeStats
+from app.cursor import TableCursor
+from app.models import Cell, DbHeader
+from app.utils import sort_key
+
+__all__ = ["Sidecar", "TreeSummary", "build_sidecar", "load_sidecar", "sidecar_path"]
+
+FORMAT_VERSION = 1
+SUFFIX = "-stats.json"
+
+
+def sidecar_path(db_path: PathLike) -> Path:
+    """Where the sidecar of a database goes by default: beside it."""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.name + SUFFIX)
+
+
+@dataclass
+class TreeSummary:
+    """What walking one B-tree found.
+
+    rows counts the rows of a table or the entries of an index. columns
+    maps a table's columns to their [min, max] over non-NULL values, in
+    SQLite's ordering; BLOB bounds are left out, JSON having no bytes.
+    """
+
+    depth: int
+    rows: int
+    leaf_pages: list[int]
+    min_row_id: int | None = None
+    max_row_id: int | None = None
+    columns: dict[str, list] = field(default_factory=dict)
+
+    def tree_stats(self) -> TreeStats:
+        return TreeStats(
+            self.depth,
+            len(self.leaf_pages),
+            self.rows,
+            self.min_row_id,
+            self.max_row_id,
+        )
+
+
+@dataclass
+class Sidecar:
+    """The schema and a TreeSummary per root page, for one database version."""
+
+    version: tuple[int, int]
+    cells: list[Cell]
+    trees: dict[int, TreeSummary]
+
+    def column_range(self, root_page: int, column: str) -> list | None:
+        tree = self.trees.get(root_page)
+        return None if tree is None else tree.columns.get(column)
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "format": FORMAT_VERSION,
+            "version": list(self.version),
+            "cells": [
+                [
+                    cell.record_size,
+                    cell.row_id,
+                    cell.header_size,
+                    cell.type,
+                    cell.name,
+                    cell.tbl_name,
+                    cell.root_page,
+                    cell.sql,
+                ]
+                for cell in self.cells
+            ],
+            "trees": {
+                str(root_page): vars(tree) for root_page, tree in self.trees.items()
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Sidecar":
+        return cls(
+            tuple(data["version"]),
+            [Cell(*values) for values in data["cells"]],
+            {
+                int(root_page): TreeSummary(**tree)
+                for root_page, tree in data["trees"].items()
+            },
+        )
+
+    def save(self, path: PathLike):
+        # Written aside and renamed, so readers never see half a file.
+        path = Path(path)
+        temporary = path.with_name(path.name + ".tmp")
+        temporary.write_text(json.dumps(self.to_json()))
+        os.replace(temporary, path)
+
+
+def load_sidecar(path: PathLike, version: tuple[int, int]) -> Sidecar | None:
+    """The sidecar at path if it describes this version of the database.
+
+    A missing, unreadable or stale file gives None, never an error: the
+    B-trees themselves can always answer instead.
+    """
+    try:
+        data = json.loads(Path(path).read_text())
+        if data["format"] != FORMAT_VERSION or tuple(data["version"]) != version:
+            return None
+        return Sidecar.from_json(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def build_sidecar(parser) -> Sidecar:
+    """Walk every B-tree in the file and summarize it."""
+    version = DbHeader.read_version(parser.page_source.read_header())
+    cells = parser.schema_table.cells
+    trees = {}
+    for cell in cells:
+        if not cell.root_page:
+            # Views and virtual tables have no B-tree.
+            continue
+        if cell.type == "table":
+            if not parser.get_page(cell.root_page).is_table:
+                # WITHOUT ROWID tables are not read.
+                continue
+            trees[cell.root_page] = summarize_table(parser, cell)
+        elif cell.type == "index":
+            trees[cell.root_page] = summarize_index(parser, cell.root_page)
+    return Sidecar(version, cells, trees)
+
+
+def tree_depth(parser, root_page: int) -> int:
+    page = parser.get_page(root_page)
+    depth = 1
+    while not page.is_leaf:
+        page = parser.get_page(page.child_page(0))
+        depth += 1
+    return depth
+
+
+def summarize_table(parser, cell: Cell) -> TreeSummary:
+    cursor = TableCursor(parser, cell.root_page)
+    leaf_pages = cursor.leaf_page_numbers()
+    columns = cell.columns
+    lows, highs = [None] * len(columns), [None] * len(columns)
+    rows = 0
+    min_row_id = max_row_id = None
+    for record in cursor.scan_pages(leaf_pages):
+        rows += 1
+        if min_row_id is None:
+            min_row_id = record.row_id
+        max_row_id = record.row_id
+        for i, value in enumerate(cell.complete(record.values)[: len(columns)]):
+            if value is None:
+                continue
+            key = sort_key(value)
+            if lows[i] is None or key < lows[i][0]:
+                lows[i] = key, value
+            if highs[i] is None or key > highs[i][0]:
+                highs[i] = key, value
+    ranges = {}
+    for column, low, high in zip(columns, lows, highs):
+        if cell.is_rowid(column) and rows:
+            # The rowid alias is stored as NULL in the record.
+            ranges[column] = [min_row_id, max_row_id]
+        elif low is not None and not any(
+            isinstance(bound[1], bytes | bytearray) for bound in (low, high)
+        ):
+            ranges[column] = [low[1], high[1]]
+    return TreeSummary(
+        tree_depth(parser, cell.root_page),
+        rows,
+        leaf_pages,
+        min_row_id,
+        max_row_id,
+        ranges,
+    )
+
+
+def summarize_index(parser, root_page: int) -> TreeSummary:
+    # Interior cells of an index B-tree hold entries too, so every page is
+    # counted, but only leaves go in the page list.
+    rows = 0
+    leaf_pages = []
+    stack = [root_page]
+    while stack:
+        page = parser.get_page(stack.pop())
+        rows += page.header.cell_count
+        if page.is_leaf:
+            leaf_pages.append(page.page_number)
+        else:
+            stack.extend(reversed(list(page.child_pages())))
+    return TreeSummary(tree_depth(parser, root_page), rows, leaf_pages)
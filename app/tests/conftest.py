@@ -24,3 +24,98 @@ def db_file():
         # Clean up the file after the test
         temp_file.close()
         pathlib.Path(temp_file.name).unlink(missing_ok=True)
+
+
+@pytest.fixture(scope="session")
+def deep_db_file(tmp_path_factory):
+    # A small page size forces a table B-tree that is several levels deep.
+    path = tmp_path_factory.mktemp("db") / "deep.db"
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA page_size = 512")
+        cursor.execute(
+            "CREATE TABLE fruits (id integer primary key autoincrement, name text, color text)"
+        )
+        cursor.executemany(
+            "INSERT INTO fruits (name, color) VALUES (?, ?)",
+            [(f"fruit {i}", ("red", "green", "yellow")[i % 3]) for i in range(5000)],
+        )
+        conn.commit()
+    return path
+
+
+@pytest.fixture(scope="session")
+def indexed_db_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("db") / "indexed.db"
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA page_size = 512")
+        cursor.execute(
+            "CREATE TABLE companies (id integer primary key autoincrement, name text, country text)"
+        )
+        cursor.execute("CREATE INDEX idx_companies_country on companies (country)")
+        countries = ("eritrea", "germany", "india", "peru")
+        cursor.executemany(
+            "INSERT INTO companies (name, country) VALUES (?, ?)",
+            [
+                (f"company {i}", "micronesia" if i % 500 == 0 else countries[i % 4])
+                for i in range(3000)
+            ],
+        )
+        conn.commit()
+    return path
+
+
+@pytest.fixture(scope="session")
+def overflow_db_file(tmp_path_factory):
+    # Payload sizes around and far beyond what fits on a 4096 byte page.
+    path = tmp_path_factory.mktemp("db") / "overflow.db"
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "CREATE TABLE documents (id integer primary key, title text, content text, attachment blob)"
+        )
+        cursor.execute("CREATE INDEX idx_documents_content on documents (content)")
+        cursor.executemany(
+            "INSERT INTO documents (title, content, attachment) VALUES (?, ?, ?)",
+            [
+                (f"doc {size}", chr(97 + i) * size, bytes(range(256)) * (size // 256))
+                for i, size in enumerate((10, 1000, 4050, 4100, 20_000, 150_000))
+            ],
+        )
+        conn.commit()
+    return path
+
+
+@pytest.fixture(scope="session")
+def joins_db_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("db") / "joins.db"
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA page_size = 512")
+        cursor.execute(
+            "CREATE TABLE customers (id integer primary key, name text, country text)"
+        )
+        cursor.execute(
+            "CREATE TABLE orders (id integer primary key, customer_id int, amount real, status text)"
+        )
+        cursor.execute("CREATE INDEX idx_orders_customer on orders (customer_id)")
+        countries = ("peru", "chad", None)
+        cursor.executemany(
+            "INSERT INTO customers (name, country) VALUES (?, ?)",
+            [(f"customer {i}", countries[i % 3]) for i in range(300)],
+        )
+        # Some orders belong to no customer, and some customers have none.
+        cursor.executemany(
+            "INSERT INTO orders (customer_id, amount, status) VALUES (?, ?, ?)",
+            [
+                (
+                    None if i % 50 == 0 else i * 7 % 340,
+                    i % 97 + 0.5,
+                    "paid" if i % 3 else "new",
+                )
+                for i in range(3000)
+            ],
+        )
+        conn.commit()
+    return path
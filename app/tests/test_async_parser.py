@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+
+import app.async_parser
+from app.async_parser import AsyncSqliteParser
+from app.parser import SqliteParser
+
+QUERIES = [
+    "SELECT id, name FROM fruits WHERE color = 'green'",
+    "SELECT name FROM fruits LIMIT 3",
+    "SELECT count(*) FROM fruits",
+    "SELECT color, count(*) FROM fruits GROUP BY color",
+    "SELECT name FROM fruits WHERE id BETWEEN 10 AND 12",
+]
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_async_sql_matches_sync(deep_db_file, query):
+    async def main():
+        async with AsyncSqliteParser(deep_db_file, prefetch=4) as parser:
+            return await parser.sql(query)
+
+    with SqliteParser(deep_db_file) as parser:
+        assert run(main()) == parser.sql(query)
+
+
+def test_concurrent_queries(deep_db_file):
+    async def main():
+        async with AsyncSqliteParser(deep_db_file, workers=2) as parser:
+            return await asyncio.gather(*(parser.sql(query) for query in QUERIES * 3))
+
+    with SqliteParser(deep_db_file) as parser:
+        expected = [parser.sql(query) for query in QUERIES * 3]
+    assert run(main()) == expected
+
+
+def test_rows_stream_and_stop_early(deep_db_file):
+    async def main():
+        async with AsyncSqliteParser(deep_db_file, prefetch=2) as parser:
+            rows = []
+            async for row in parser.rows("SELECT id FROM fruits"):
+                rows.append(row)
+                if len(rows) == 5:
+                    break
+            return rows, await parser.tables(), await parser.db_info()
+
+    rows, tables, db_info = run(main())
+    assert rows == [(1,), (2,), (3,), (4,), (5,)]
+    assert tables == ["fruits"]
+    assert db_info == (512, 2)
+
+
+def test_decoding_runs_on_the_pool_under_the_lock(deep_db_file):
+    calls = []
+
+    async def main():
+        async with AsyncSqliteParser(deep_db_file) as parser:
+            decode = parser.parser.decode_lazy_record
+
+            def checked(buffer, offset):
+                calls.append(
+                    parser._lock.locked()
+                    and threading.current_thread() is not threading.main_thread()
+                )
+                return decode(buffer, offset)
+
+            parser.parser.decode_lazy_record = checked
+            return [row async for row in parser.rows("SELECT id FROM fruits")]
+
+    assert len(run(main())) == 5000
+    assert calls and all(calls)
+
+
+def test_other_plans_stream_in_batches(deep_db_file, monkeypatch):
+    monkeypatch.setattr(app.async_parser, "BATCH_SIZE", 10)
+
+    async def main():
+        async with AsyncSqliteParser(deep_db_file) as parser:
+            rows = parser.rows("SELECT id FROM fruits WHERE id > 100")
+            first = [await anext(rows) for _ in range(3)]
+            await rows.aclose()
+            return first, parser.parser.page_cache.stats.misses
+
+    first, misses = run(main())
+    assert first == [(101,), (102,), (103,)]
+    # Only the pages for the first batch were read.
+    assert misses < 10
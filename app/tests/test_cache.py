@@ -0,0 +1,66 @@
+import pathlib
+
+from app.cache import PageCache
+from app.pager import FilePageSource
+from app.parser import SqliteParser
+
+
+def test_lru_eviction():
+    cache = PageCache(max_bytes=300)
+    for key in range(3):
+        cache.put(key, f"page {key}", 100)
+    assert cache.get(0) == "page 0"
+
+    cache.put(3, "page 3", 100)
+    assert 1 not in cache
+    assert [key in cache for key in (0, 2, 3)] == [True, True, True]
+    assert cache.size == 300
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 0, 1)
+
+
+def test_pinned_pages_are_not_evicted():
+    cache = PageCache(max_bytes=200)
+    cache.pin(1)
+    cache.put(1, "page 1", 100)
+    for key in range(2, 6):
+        cache.put(key, f"page {key}", 100)
+    assert 1 in cache
+    assert len(cache) == 2
+
+    cache.unpin(1)
+    cache.put(6, "page 6", 100)
+    cache.put(7, "page 7", 100)
+    assert 1 not in cache
+
+
+def test_miss_then_hit():
+    cache = PageCache()
+    assert cache.get("missing") is None
+    cache.put("page", b"data", 4)
+    assert cache.get("page") == b"data"
+    assert cache.stats.hit_ratio == 0.5
+
+
+def test_repeated_queries_hit_the_cache(deep_db_file, monkeypatch):
+    path = pathlib.Path(deep_db_file)
+    source = FilePageSource(path)
+    with SqliteParser(path, page_source=source) as parser:
+        parser.sql("SELECT count(*) FROM fruits")
+
+        reads = []
+        get_page = source.get_page
+        monkeypatch.setattr(
+            source, "get_page", lambda n: reads.append(n) or get_page(n)
+        )
+        parser.handle_command(".dbinfo")
+        parser.sql("SELECT count(*) FROM fruits")
+        assert reads == []
+        assert parser.cache_stats.hits > 0
+
+
+def test_cache_budget_is_respected(deep_db_file):
+    path = pathlib.Path(deep_db_file)
+    with SqliteParser(path, page_cache=PageCache(max_bytes=10 * 512)) as parser:
+        assert parser.sql("SELECT count(*) FROM fruits") == 5000
+        assert parser.page_cache.size <= 10 * 512
+        assert parser.cache_stats.evictions > 0
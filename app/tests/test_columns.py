@@ -0,0 +1,120 @@
+import sqlite3
+from array import array
+
+import pytest
+
+from app.models import Column
+from app.parser import SqliteParser
+from app.query import parse_expression
+
+
+def test_int_column_with_nulls():
+    column = Column.from_values((None, 1, None, 3))
+    assert column.kind == "int64"
+    assert column.values == array("q", [0, 1, 0, 3])
+    assert column.null_count == 2
+    assert column.validity == bytearray([0b1010])
+    assert column.to_pylist() == [None, 1, None, 3]
+    assert column[-1] == 3 and column[2] is None
+
+
+def test_ints_and_reals_make_a_float_column():
+    column = Column.from_values((1, 2.5, 3))
+    assert column.kind == "float64"
+    assert column.values == array("d", [1.0, 2.5, 3.0])
+    assert column.validity is None
+
+
+def test_text_column_layout():
+    column = Column.from_values(("ab", None, "", "ünï"))
+    assert column.kind == "text"
+    assert column.offsets == array("q", [0, 2, 2, 2, 7])
+    assert column.data == bytearray("abünï".encode())
+    assert column.to_pylist() == ["ab", None, "", "ünï"]
+
+
+def test_mixed_column_falls_back_to_objects():
+    column = Column.from_values((1, None, "two", b"3"))
+    assert column.kind == "object"
+    assert column.to_pylist() == [1, None, "two", b"3"]
+
+
+def test_all_null_column():
+    column = Column.from_values((None, None))
+    assert column.kind == "null"
+    assert column.to_pylist() == [None, None]
+    assert column.validity == bytearray([0])
+
+
+@pytest.fixture(scope="module")
+def mixed_db_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("columns") / "mixed.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE items (id integer primary key, n int, x real, t text, b blob)"
+        )
+        conn.executemany(
+            "INSERT INTO items (n, x, t, b) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    None if i % 7 == 0 else i * 1_000_003,
+                    i / 4,
+                    None if i % 5 == 0 else f"item {i}" * (i % 3),
+                    bytes([i % 256]) * (i % 4),
+                )
+                for i in range(1, 2001)
+            ),
+        )
+    return path
+
+
+def test_batches_match_fetch_columns(mixed_db_file):
+    columns = ("id", "n", "x", "t", "b")
+    with SqliteParser(mixed_db_file) as parser:
+        expected = list(parser.iter_columns(*columns, table_name="items"))
+        batches = list(
+            parser.iter_column_batches(*columns, table_name="items", batch_size=750)
+        )
+    assert [len(batch) for batch in batches] == [750, 750, 500]
+    assert [row for batch in batches for row in batch] == expected
+    kinds = [column.kind for column in batches[0].columns]
+    assert kinds == ["int64", "int64", "float64", "text", "blob"]
+
+
+def test_batches_with_where(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        [batch] = parser.iter_column_batches(
+            "id", "name", table_name="fruits", where=None, batch_size=10_000
+        )
+        assert len(batch) == 5000
+        where = parse_expression("color = 'green' AND id < 10")
+        [batch] = parser.iter_column_batches(
+            "id", "name", table_name="fruits", where=where
+        )
+        assert batch.to_pydict() == {
+            "id": [2, 5, 8],
+            "name": ["fruit 1", "fruit 4", "fruit 7"],
+        }
+
+
+def test_batches_fill_added_columns_with_their_default(tmp_path):
+    path = tmp_path / "added.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (a int)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+        conn.execute("ALTER TABLE t ADD COLUMN e int DEFAULT 5")
+        conn.execute("INSERT INTO t VALUES (3, 7)")
+    with SqliteParser(path) as parser:
+        [batch] = parser.iter_column_batches("a", "e", table_name="t")
+    assert batch.to_pydict() == {"a": [1, 2, 3], "e": [5, 5, 7]}
+
+
+def test_to_numpy_shares_buffers(mixed_db_file):
+    np = pytest.importorskip("numpy")
+    with SqliteParser(mixed_db_file) as parser:
+        [batch] = parser.iter_column_batches("id", "n", "t", table_name="items")
+    arrays = batch.to_numpy()
+    assert arrays["id"].dtype == np.int64
+    assert np.shares_memory(arrays["id"], np.frombuffer(batch.column("id").values))
+    assert arrays["n"].mask.sum() == batch.column("n").null_count
+    assert arrays["t"][1] == "item 2item 2"
@@ -0,0 +1,73 @@
+import struct
+
+import pytest
+
+from app.decoder import (
+    decode_payload,
+    decode_value,
+    decode_values,
+    read_record_header,
+    read_varint,
+)
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"\x7f", (127, 1)),
+        (b"\x81\x00", (128, 2)),
+        (b"\x87\x68", (1000, 2)),
+        (b"\xff\xff\xff\xff\xff\xff\xff\xff\xff", (2**64 - 1, 9)),
+    ],
+)
+def test_read_varint(data, expected):
+    assert read_varint(memoryview(data), 0) == expected
+
+
+@pytest.mark.parametrize(
+    "serial_type, data, expected",
+    [
+        (0, b"", None),
+        (1, b"\xff", -1),
+        (2, struct.pack(">h", -300), -300),
+        (3, (-70000).to_bytes(3, "big", signed=True), -70000),
+        (4, struct.pack(">i", 2**31 - 1), 2**31 - 1),
+        (5, (2**40).to_bytes(6, "big", signed=True), 2**40),
+        (6, struct.pack(">q", -(2**60)), -(2**60)),
+        (7, struct.pack(">d", 8.2), 8.2),
+        (8, b"", 0),
+        (9, b"", 1),
+        (16, b"\x00\x01", b"\x00\x01"),
+        (19, b"abc", "abc"),
+    ],
+)
+def test_decode_value(serial_type, data, expected):
+    assert decode_value(data, 0, serial_type) == (expected, len(data))
+
+
+def test_invalid_serial_type():
+    with pytest.raises(ValueError):
+        decode_value(b"", 0, 10)
+
+
+def test_decode_payload_matches_generic_decoding():
+    # NULL, int8, 24-bit int, float, TEXT(3), BLOB(2), 1, and a two-byte
+    # varint serial type for a 100 character TEXT.
+    long_text = "x" * 100
+    serial_types = bytes([0, 1, 3, 7, 19, 16, 9, 0x81, 0x55])
+    header = bytes([len(serial_types) + 1]) + serial_types
+    body = (
+        b"\x05"
+        + (12345).to_bytes(3, "big", signed=True)
+        + struct.pack(">d", 1.5)
+        + b"abc"
+        + b"\x01\x02"
+        + long_text.encode()
+    )
+    record = memoryview(header + body)
+
+    serial_types, body_offset = read_record_header(record, 0)
+    assert serial_types == [0, 1, 3, 7, 19, 16, 9, 213]
+    expected = [None, 5, 12345, 1.5, "abc", b"\x01\x02", 1, long_text]
+    assert decode_values(record, body_offset, serial_types) == expected
+    assert decode_payload(record, 0) == (len(header), tuple(expected))
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from app.export import write_rows
+from app.parser import SqliteParser
+
+
+def test_write_csv_quotes_and_hexes_blobs():
+    stream = io.StringIO()
+    rows = [(1, "a,b", None), (2, 'say "hi"', b"\x00\xff")]
+    assert write_rows(stream, rows, ["id", "text", "data"]) == 2
+    assert stream.getvalue() == 'id,text,data\n1,"a,b",\n2,"say ""hi""",00ff\n'
+
+
+def test_write_tsv_without_header():
+    stream = io.StringIO()
+    write_rows(stream, [(1, "x"), (2, "y")], ["id", "v"], "tsv", header=False)
+    assert stream.getvalue() == "1\tx\n2\ty\n"
+
+
+def test_write_jsonl():
+    stream = io.StringIO()
+    write_rows(stream, [(1, "ünï", 2.5, None)], ["id", "name", "x", "y"], "jsonl")
+    assert stream.getvalue() == '{"id": 1, "name": "ünï", "x": 2.5, "y": null}\n'
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        write_rows(io.StringIO(), [], [], "xml")
+
+
+def test_export_streams_every_row(deep_db_file):
+    stream = io.StringIO()
+    with SqliteParser(deep_db_file) as parser:
+        count = parser.export("SELECT id, name, color FROM fruits", stream)
+    assert count == 5000
+    rows = list(csv.reader(io.StringIO(stream.getvalue())))
+    assert rows[0] == ["id", "name", "color"]
+    assert rows[1:3] == [["1", "fruit 0", "red"], ["2", "fruit 1", "green"]]
+    assert len(rows) == 5001
+
+
+def test_export_aggregate_names(deep_db_file):
+    stream = io.StringIO()
+    with SqliteParser(deep_db_file) as parser:
+        parser.export(
+            "SELECT color, count(*) FROM fruits GROUP BY color", stream, "jsonl"
+        )
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0] == {"color": "green", "count(*)": 1667}
+
+
+def test_cli_export_to_file(tmp_path):
+    path = tmp_path / "cli.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id integer primary key, value text)")
+        conn.executemany("INSERT INTO t (value) VALUES (?)", [("a",), ("b",)])
+    output = tmp_path / "out.tsv"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "app.main",
+            str(path),
+            "SELECT id, value FROM t",
+            "--format",
+            "tsv",
+            "--output",
+            str(output),
+        ],
+        check=True,
+    )
+    assert output.read_text() == "id\tvalue\n1\ta\n2\tb\n"
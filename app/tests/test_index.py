@@ -0,0 +1,173 @@
+import sqlite3
+
+import pytest
+
+from app.cursor import IndexCursor, TableCursor
+from app.parser import SqliteParser
+from app.utils import sort_key
+
+
+def test_sort_key_orders_like_sqlite():
+    values = [b"blob", "text", 2.5, None, 1]
+    assert sorted(values, key=sort_key) == [None, 1, 2.5, "text", b"blob"]
+
+
+@pytest.mark.parametrize("country", ["eritrea", "micronesia", "peru"])
+def test_index_lookup(indexed_db_file, country):
+    with sqlite3.connect(indexed_db_file) as conn:
+        expected = conn.execute(
+            "SELECT id, name FROM companies WHERE country = ? ORDER BY id", (country,)
+        ).fetchall()
+
+    with SqliteParser(indexed_db_file) as parser:
+        result = parser.sql(
+            f"SELECT id, name FROM companies WHERE country = '{country}'"
+        )
+    assert result == expected
+
+
+def test_index_seek_missing_key(indexed_db_file):
+    with SqliteParser(indexed_db_file) as parser:
+        index_cell = parser.get_index_cell("companies", "country")
+        assert list(IndexCursor(parser, index_cell.root_page).seek("atlantis")) == []
+
+
+def test_index_lookup_reads_fewer_pages(indexed_db_file, monkeypatch):
+    sql = "SELECT id FROM companies WHERE country = 'micronesia'"
+    with SqliteParser(indexed_db_file) as parser:
+        # Planning reads the B-tree edges once for its cost estimates.
+        parser.prepare(sql)
+        pages_read = []
+        get_page = parser.get_page
+        monkeypatch.setattr(
+            parser, "get_page", lambda n: pages_read.append(n) or get_page(n)
+        )
+        result = parser.sql(sql)
+        assert len(result) == 6
+        assert len(pages_read) < parser.page_source.page_count // 10
+
+
+def count_pages(parser, monkeypatch) -> set[int]:
+    pages_read = set()
+    get_page = parser.get_page
+    monkeypatch.setattr(parser, "get_page", lambda n: pages_read.add(n) or get_page(n))
+    return pages_read
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id, country FROM companies WHERE country = 'micronesia'",
+        "SELECT country, count(*) FROM companies GROUP BY country",
+        "SELECT id FROM companies WHERE country > 'india' ORDER BY id DESC LIMIT 5",
+        "SELECT count(*) FROM companies WHERE country = 'peru'",
+    ],
+)
+def test_covering_index_queries(indexed_db_file, sql, monkeypatch):
+    with sqlite3.connect(indexed_db_file) as conn:
+        expected = conn.execute(sql).fetchall()
+
+    with SqliteParser(indexed_db_file) as parser:
+        plan = parser.prepare(sql)
+        assert plan.access.covering
+        table_leaves = {
+            page.page_number
+            for page in TableCursor(
+                parser, parser.get_cell("companies").root_page
+            ).leaf_pages()
+        }
+        pages_read = count_pages(parser, monkeypatch)
+        result = parser.execute(sql)
+    if isinstance(result, int):
+        result = [(result,)]
+    assert sorted(result) == sorted(expected)
+    assert not pages_read & table_leaves
+
+
+def test_count_over_covering_index(indexed_db_file, monkeypatch):
+    with SqliteParser(indexed_db_file) as parser:
+        index_cell = parser.get_index_cell("companies", "country")
+        assert IndexCursor(parser, index_cell.root_page).count() == 3000
+        assert parser.explain("SELECT count(*) FROM companies") == [
+            (
+                "SCAN companies USING COVERING INDEX idx_companies_country"
+                " (~3591 rows, ~102 pages)"
+            )
+        ]
+        pages_read = count_pages(parser, monkeypatch)
+        assert parser.execute("SELECT count(*) FROM companies") == 3000
+        assert len(pages_read) < parser.page_source.page_count // 2
+
+
+def test_covering_index_scan_in_key_order(indexed_db_file):
+    with SqliteParser(indexed_db_file) as parser:
+        assert parser.explain("SELECT id, country FROM companies") == [
+            (
+                "SCAN companies USING COVERING INDEX idx_companies_country"
+                " (~3591 rows, ~102 pages)"
+            )
+        ]
+        rows = parser.fetch_columns("country", "id", table_name="companies")
+    assert len(rows) == 3000
+    assert rows == sorted(rows)
+
+
+def test_partial_index_is_not_used(tmp_path):
+    path = tmp_path / "partial.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id integer primary key, kind text)")
+        conn.execute("CREATE INDEX idx_t_kind ON t (kind) WHERE kind <> 'a'")
+        conn.executemany("INSERT INTO t (kind) VALUES (?)", [("a",), ("b",)] * 50)
+    with SqliteParser(path) as parser:
+        assert parser.get_index_cells("t") == []
+        assert parser.execute("SELECT count(*) FROM t") == 100
+        assert parser.execute("SELECT kind FROM t WHERE kind = 'a'") == [("a",)] * 50
+
+
+def test_descending_index_is_not_searched(tmp_path):
+    path = tmp_path / "descending.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id integer primary key, a int, b text)")
+        conn.execute("CREATE INDEX ia ON t (a DESC)")
+        conn.executemany(
+            "INSERT INTO t (a, b) VALUES (?, ?)",
+            [(i % 50, f"b{i}") for i in range(3000)],
+        )
+    queries = [
+        "SELECT id FROM t WHERE a = 7",
+        "SELECT count(*) FROM t WHERE a = 7",
+        "SELECT a, id FROM t",
+    ]
+    with sqlite3.connect(path) as conn:
+        expected = [conn.execute(sql).fetchall() for sql in queries]
+
+    with SqliteParser(path) as parser:
+        assert parser.get_index_cells("t") == []
+        results = [parser.execute(sql) for sql in queries]
+    assert sorted(results[0]) == sorted(expected[0])
+    assert [(results[1],)] == expected[1]
+    assert sorted(results[2]) == sorted(expected[2])
+
+
+def test_nocase_index_is_not_searched(tmp_path):
+    path = tmp_path / "nocase.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE t (id integer primary key, b text, c text COLLATE NOCASE)"
+        )
+        conn.execute("CREATE INDEX ib ON t (b COLLATE NOCASE)")
+        # Takes its collation from the column.
+        conn.execute("CREATE INDEX ic ON t (c)")
+        conn.execute("CREATE INDEX ibb ON t (b COLLATE BINARY, id)")
+        words = ("foo", "Foo", "FOO")
+        conn.executemany(
+            "INSERT INTO t (b, c) VALUES (?, ?)",
+            [(words[i % 3], words[i % 3]) for i in range(3000)],
+        )
+
+    with SqliteParser(path) as parser:
+        assert [cell.name for cell in parser.get_index_cells("t")] == ["ibb"]
+        assert parser.execute("SELECT count(*) FROM t WHERE b = 'foo'") == 1000
+        assert parser.execute("SELECT count(*) FROM t WHERE b = 'Foo'") == 1000
+        assert len(parser.execute("SELECT id FROM t WHERE b = 'FOO'")) == 1000
+        assert len(parser.execute("SELECT id FROM t WHERE c = 'foo'")) == 1000
@@ -0,0 +1,61 @@
+import io
+import json
+import logging
+
+from app.instrument import Instrumentation, JsonSink, LoggingSink, format_stats
+from app.main import main
+from app.pager import MmapPageSource
+from app.parser import SqliteParser
+
+
+def test_disabled_by_default(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        assert parser.instrumentation is None
+        assert type(parser.page_source) is MmapPageSource
+        assert "decode_record" not in vars(parser)
+
+
+def test_counts_a_filtered_scan(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        parser.get_cell("fruits")
+        stats = parser.analyze("SELECT name FROM fruits WHERE color = 'red'")
+    assert stats.rows_returned == 1667
+    assert stats.rows_filtered == 5000 - 1667
+    assert stats.records_decoded == 5000
+    assert stats.varints_parsed >= 2 * 5000
+    assert stats.pages_read == stats.cache_misses > 0
+    assert stats.bytes_read == stats.pages_read * 512
+    assert stats.total_seconds >= stats.plan_seconds + stats.execute_seconds
+
+
+def test_sinks_get_every_query(deep_db_file, caplog):
+    collected = []
+    stream = io.StringIO()
+    instrumentation = Instrumentation(collected.append, JsonSink(stream))
+    with SqliteParser(deep_db_file, instrumentation=instrumentation) as parser:
+        parser.instrument(LoggingSink())
+        with caplog.at_level(logging.INFO, logger="app.instrument"):
+            assert parser.execute("SELECT count(*) FROM fruits") == 5000
+            rows = parser.execute("SELECT id FROM fruits WHERE id < 4")
+    assert rows == [(1,), (2,), (3,)]
+    assert [stats.rows_returned for stats in collected] == [1, 3]
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[1]["sql"] == "SELECT id FROM fruits WHERE id < 4"
+    assert len(caplog.records) == 2
+    assert "rows_returned" in format_stats(collected[0])
+
+
+def test_instrument_replans_cached_queries(deep_db_file):
+    sql = "SELECT id FROM fruits WHERE color = 'green' AND id < 10"
+    with SqliteParser(deep_db_file) as parser:
+        parser.execute(sql)
+        stats = parser.analyze(sql)
+    assert stats.rows_filtered == 6
+
+
+def test_cli_analyzes_dot_commands(deep_db_file, capsys):
+    for command in (".dbinfo", ".tables"):
+        main(database_file_path=deep_db_file, command=command, analyze="json")
+    lines = capsys.readouterr().err.splitlines()
+    assert [json.loads(line)["sql"] for line in lines] == [".dbinfo", ".tables"]
+    assert json.loads(lines[1])["pages_read"] > 0
@@ -0,0 +1,135 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from app.parser import SqliteParser
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        (
+            "SELECT c.name, o.amount FROM customers c JOIN orders o"
+            " ON o.customer_id = c.id"
+        ),
+        (
+            "SELECT c.name, o.id FROM customers c LEFT JOIN orders o"
+            " ON o.customer_id = c.id"
+        ),
+        (
+            "SELECT c.name, o.id FROM orders o INNER JOIN customers c"
+            " ON c.id = o.customer_id WHERE c.country = 'peru' AND o.status = 'paid'"
+        ),
+        (
+            "SELECT c.name FROM customers AS c LEFT JOIN orders o"
+            " ON o.customer_id = c.id AND o.status = 'new' WHERE o.id IS NULL"
+        ),
+        (
+            "SELECT country, count(*), sum(amount) FROM customers"
+            " JOIN orders ON customer_id = customers.id GROUP BY country"
+        ),
+        (
+            "SELECT count(*) FROM customers c JOIN orders o ON o.customer_id = c.id"
+            " WHERE c.id < 10"
+        ),
+        (
+            "SELECT * FROM customers c JOIN orders o ON o.customer_id = c.id"
+            " WHERE c.id = 7"
+        ),
+        (
+            "SELECT o.*, c.name FROM orders o LEFT JOIN customers c"
+            " ON c.id = o.customer_id ORDER BY o.amount DESC, o.id LIMIT 5"
+        ),
+        (
+            "SELECT a.id, b.id FROM orders a JOIN orders b"
+            " ON b.customer_id = a.customer_id WHERE a.id < 20"
+        ),
+        "SELECT c.name FROM customers c WHERE c.id < 4",
+    ],
+)
+def test_joins_match_sqlite(joins_db_file, sql):
+    with sqlite3.connect(joins_db_file) as conn:
+        expected = conn.execute(sql).fetchall()
+
+    with SqliteParser(joins_db_file) as parser:
+        result = parser.execute(sql)
+    if isinstance(result, int):
+        result = [(result,)]
+    if "ORDER BY" in sql:
+        assert result == expected
+    else:
+        assert sorted(result, key=repr) == sorted(expected, key=repr)
+
+
+def test_join_strategies(joins_db_file):
+    with SqliteParser(joins_db_file) as parser:
+        # A handful of customers: one index seek each beats reading orders.
+        assert parser.explain(
+            "SELECT o.id FROM customers c JOIN orders o ON o.customer_id = c.id"
+            " WHERE c.id = 7"
+        )[1].startswith("INDEX JOIN o: SEARCH o USING INDEX idx_orders_customer")
+        # Every order: a single pass over the small customers table wins,
+        # and the hash table is built on it.
+        assert parser.explain(
+            "SELECT c.name, o.id FROM orders o JOIN customers c ON c.id = o.customer_id"
+        )[1].startswith("HASH JOIN c (BUILD c): SCAN c")
+        # Joined the other way round the smaller side is on the left.
+        assert parser.explain(
+            "SELECT c.name, o.status FROM customers c JOIN orders o"
+            " ON o.customer_id = c.id"
+        )[1].startswith("HASH JOIN o (BUILD c): SCAN o")
+        # A LEFT JOIN keeps its left side streaming.
+        assert parser.explain(
+            "SELECT c.name, o.status FROM customers c LEFT JOIN orders o"
+            " ON o.customer_id = c.id"
+        )[1].startswith("HASH LEFT JOIN o (BUILD o)")
+        # On the rowid of the inner side a seek is enough.
+        assert parser.explain(
+            "SELECT c.name FROM orders o JOIN customers c ON c.id = o.customer_id"
+            " WHERE o.id < 5"
+        )[1].startswith("INDEX JOIN c: SEARCH c USING INTEGER PRIMARY KEY (rowid=?)")
+
+
+@pytest.mark.parametrize(
+    "sql, message",
+    [
+        (
+            "SELECT id FROM customers c JOIN orders o ON o.customer_id = c.id",
+            "Ambiguous",
+        ),
+        ("SELECT c.id FROM customers c JOIN orders o ON o.amount > c.id", "JOIN"),
+        ("SELECT c.id FROM customers c JOIN orders o ON o.status = 'new'", "JOIN o"),
+        ("SELECT x.id FROM customers c JOIN orders o ON o.customer_id = c.id", "x"),
+    ],
+)
+def test_join_errors(joins_db_file, sql, message):
+    with (
+        SqliteParser(joins_db_file) as parser,
+        pytest.raises(ValueError, match=message),
+    ):
+        parser.execute(sql)
+
+
+def test_export_join_headers(joins_db_file):
+    stream = io.StringIO()
+    with SqliteParser(joins_db_file) as parser:
+        parser.export(
+            "SELECT c.*, o.amount FROM customers c JOIN orders o"
+            " ON o.customer_id = c.id WHERE o.id = 2",
+            stream,
+        )
+    assert stream.getvalue() == "id,name,country,amount\n7,customer 6,peru,1.5\n"
+
+
+def test_export_jsonl_keeps_columns_of_the_same_name(joins_db_file):
+    stream = io.StringIO()
+    with SqliteParser(joins_db_file) as parser:
+        parser.export(
+            "SELECT a.id, b.id, a.id FROM orders a JOIN orders b"
+            " ON b.customer_id = a.customer_id WHERE a.id = 2 AND b.id = 2",
+            stream,
+            "jsonl",
+        )
+    assert json.loads(stream.getvalue()) == {"id": 2, "id:1": 2, "id:2": 2}
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from app.operators import (
+    AGGREGATES,
+    group_rows,
+    hash_join,
+    join_key,
+    nested_loop_join,
+    order_rows,
+)
+from app.parser import SqliteParser
+
+
+@pytest.mark.parametrize(
+    "name, values, expected",
+    [
+        ("count", [1, None, "a"], 2),
+        ("sum", [1, None, 2], 3),
+        ("sum", [1, 2.5], 3.5),
+        ("sum", [None], None),
+        ("avg", [1, None, 2], 1.5),
+        ("avg", [], None),
+        ("min", [3, None, "a", 1.5], 1.5),
+        ("max", [3, None, "a", b"b"], b"b"),
+    ],
+)
+def test_aggregates(name, values, expected):
+    aggregate = AGGREGATES[name]()
+    for value in values:
+        aggregate.step(value)
+    assert aggregate.result() == expected
+
+
+def test_group_rows_without_rows_returns_one_row():
+    aggregates = [(AGGREGATES["count"], None), (AGGREGATES["sum"], None)]
+    assert group_rows([], [], aggregates) == [(0, None)]
+
+
+def test_order_rows_keeps_limit_rows():
+    rows = ((i % 7, i) for i in range(1000))
+    rows = order_rows(
+        rows, [(lambda row: row[0], True), (lambda row: row[1], False)], 3
+    )
+    assert rows == [(6, 6), (6, 13), (6, 20)]
+
+
+def test_hash_join():
+    left = [(1,), (2,), (None,), (2.0,)]
+    right = [(2, "b"), ("2", "text"), (None, "null"), (2, "c")]
+    left_key = join_key([lambda row: row[0]])
+    right_key = join_key([lambda record: record[0]])
+    expected = [
+        (2, (2, "b")),
+        (2, (2, "c")),
+        (2.0, (2, "b")),
+        (2.0, (2, "c")),
+    ]
+    for build_left in (False, True):
+        rows = hash_join(
+            ((value,) for (value,) in left),
+            iter(right),
+            left_key,
+            right_key,
+            build_left=build_left,
+        )
+        assert sorted(rows, key=repr) == [(value, record) for value, record in expected]
+    rows = list(hash_join(left, right, left_key, right_key, outer=True))
+    assert rows.count((1, None)) == rows.count((None, None)) == 1
+    assert len(rows) == 6
+    with pytest.raises(ValueError):
+        list(hash_join(left, right, left_key, right_key, outer=True, build_left=True))
+
+
+def test_nested_loop_join():
+    index = {1: ["a", "b"], 2: ["c"]}
+    left = [(1,), (2,), (3,), (None,)]
+    rows = nested_loop_join(
+        left,
+        lambda value: index.get(value, []),
+        lambda row: row[0],
+        lambda row, record: record != "b",
+        outer=True,
+    )
+    assert list(rows) == [(1, "a"), (2, "c"), (3, None), (None, None)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT color, count(*) FROM fruits GROUP BY color",
+        "SELECT color, count(*), min(name), max(id), sum(id), avg(id) FROM fruits GROUP BY color",
+        "SELECT count(*), sum(id) FROM fruits WHERE id > 4990",
+        "SELECT max(name) FROM fruits WHERE color = 'blue'",
+        "SELECT color, count(*) FROM fruits GROUP BY color ORDER BY count(*) DESC, color LIMIT 2",
+        "SELECT color, sum(id) FROM fruits GROUP BY color ORDER BY 2",
+        "SELECT id, name FROM fruits ORDER BY name DESC LIMIT 5",
+        "SELECT id FROM fruits WHERE color = 'red' ORDER BY color, id DESC LIMIT 3",
+        "SELECT name FROM fruits WHERE id < 20 ORDER BY name",
+    ],
+)
+def test_aggregates_match_sqlite(deep_db_file, query):
+    with sqlite3.connect(deep_db_file) as conn:
+        expected = conn.execute(query).fetchall()
+    with SqliteParser(deep_db_file) as parser:
+        assert parser.sql(query) == expected
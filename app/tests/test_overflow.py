@@ -0,0 +1,73 @@
+import sqlite3
+from dataclasses import dataclass
+
+import pytest
+
+from app.overflow import BlobReader, PayloadLimits
+from app.parser import SqliteParser
+
+
+@dataclass
+class Header:
+    page_size: int = 4096
+    reserved_bytes_per_pages: int = 0
+    max_embedded_payload_fraction: int = 64
+    min_embedded_payload_fraction: int = 32
+
+
+def test_payload_limits():
+    limits = PayloadLimits.from_db_header(Header())
+    assert (limits.table_max_local, limits.index_max_local, limits.min_local) == (
+        4061,
+        1002,
+        489,
+    )
+    assert limits.local_size(4061) == 4061
+    # K = M + (P - M) % (U - 4) is used when it does not exceed X.
+    assert limits.local_size(4062) == 489
+    assert limits.local_size(100_000) == 489 + (100_000 - 489) % 4092
+    assert limits.local_size(1003, index=True) == 489
+
+
+def expected_rows(path, query):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(query).fetchall()
+
+
+def test_overflow_records(overflow_db_file):
+    query = "SELECT id, title, content, attachment FROM documents"
+    with SqliteParser(overflow_db_file) as parser:
+        assert parser.sql(query) == expected_rows(overflow_db_file, query)
+
+
+def test_overflow_index_lookup(overflow_db_file):
+    content = "e" * 20_000
+    with SqliteParser(overflow_db_file) as parser:
+        result = parser.sql(
+            f"SELECT id, title FROM documents WHERE content = '{content}'"
+        )
+    assert result == [(5, "doc 20000")]
+
+
+def test_stream_blobs(overflow_db_file):
+    with SqliteParser(overflow_db_file, stream_blobs=True) as parser:
+        rows = parser.sql("SELECT title, attachment FROM documents")
+        small = dict(rows)["doc 1000"]
+        assert isinstance(small, bytes)
+
+        reader = dict(rows)["doc 150000"]
+        assert isinstance(reader, BlobReader)
+        chunks = list(reader.iter_chunks())
+        assert max(len(chunk) for chunk in chunks) <= 4096
+        assert b"".join(chunks) == bytes(range(256)) * (150_000 // 256)
+
+        reader.seek(1000)
+        assert reader.read(3) == bytes([1000 % 256, 1001 % 256, 1002 % 256])
+
+
+@pytest.mark.parametrize("size", [4100, 20_000])
+def test_count_and_seek_with_overflow(overflow_db_file, size):
+    with SqliteParser(overflow_db_file) as parser:
+        assert parser.sql("SELECT count(*) FROM documents") == 6
+        record = parser.seek_row("documents", {4100: 4, 20_000: 5}[size])
+        assert record.values[1] == f"doc {size}"
@@ -0,0 +1,75 @@
+import pathlib
+
+import pytest
+
+from app.pager import (
+    FilePageSource,
+    MmapPageSource,
+    PreadPageSource,
+    coalesce_pages,
+)
+from app.parser import SqliteParser
+
+
+@pytest.mark.parametrize(
+    "source_cls", [FilePageSource, MmapPageSource, PreadPageSource]
+)
+def test_page_source(db_file, source_cls):
+    path = pathlib.Path(db_file.name)
+    with source_cls(path) as source:
+        assert source.page_size == 4096
+        assert source.page_count == 2
+        assert bytes(source.get_page(1)[:16]) == b"SQLite format 3\x00"
+        assert bytes(source.get_page(2)) == path.read_bytes()[4096:]
+        with pytest.raises(ValueError):
+            source.get_page(3)
+
+
+@pytest.mark.parametrize(
+    "source_cls", [FilePageSource, MmapPageSource, PreadPageSource]
+)
+def test_read_run(deep_db_file, source_cls):
+    with source_cls(deep_db_file) as source:
+        source.will_need(2, 3)
+        run = source.read_run(2, 3)
+        assert bytes(run) == b"".join(bytes(source.get_page(n)) for n in (2, 3, 4))
+        with pytest.raises(ValueError):
+            source.read_run(source.page_count, 2)
+
+
+@pytest.mark.parametrize(
+    "page_numbers, options, expected",
+    [
+        ([], {}, []),
+        ([5, 3, 4, 9], {}, [(3, 3), (9, 1)]),
+        ([5, 3, 4, 9], {"max_gap": 3}, [(3, 7)]),
+        ([1, 2, 3, 4, 5], {"max_run": 2}, [(1, 2), (3, 2), (5, 1)]),
+        ([2, 2, 3], {}, [(2, 2)]),
+    ],
+)
+def test_coalesce_pages(page_numbers, options, expected):
+    assert coalesce_pages(page_numbers, **options) == expected
+
+
+@pytest.mark.parametrize(
+    "source_cls", [FilePageSource, MmapPageSource, PreadPageSource]
+)
+def test_parser_with_page_source(db_file, source_cls):
+    path = pathlib.Path(db_file.name)
+    with SqliteParser(path, page_source=source_cls(path)) as parser:
+        assert parser.sql("SELECT title FROM movie") == [
+            ("Monty Python and the Holy Grail",),
+            ("And Now for Something Completely Different",),
+        ]
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"\x01", (1, 1)),
+        (b"\x81\x00", (128, 2)),
+        (b"\xff\xff\xff\xff\xff\xff\xff\xff\xff", (2**64 - 1, 9)),
+    ],
+)
+def test_get_varint(data, expected):
+    assert SqliteParser.get_varint(memoryview(data), 0) == expected
@@ -0,0 +1,57 @@
+import pytest
+
+import app.parallel
+from app.cursor import TableCursor
+from app.parallel import ParallelScan
+from app.parser import SqliteParser
+from app.query import parse_expression
+
+
+def test_leaf_page_numbers_match_walk(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        cursor = TableCursor(parser, parser.get_cell("fruits").root_page)
+        walked = [page.page_number for page in cursor.leaf_pages()]
+        assert cursor.leaf_page_numbers() == walked
+
+
+@pytest.mark.parametrize(
+    "where",
+    [None, "color = 'green'", "name BETWEEN 'fruit 10' AND 'fruit 11'"],
+)
+def test_parallel_scan_matches_serial_scan(deep_db_file, where):
+    where = where and parse_expression(where)
+    with SqliteParser(deep_db_file) as parser:
+        serial = parser.fetch_columns(
+            "id", "name", "color", table_name="fruits", where=where
+        )
+        scan = ParallelScan(parser, workers=2, chunk_size=16)
+        parallel = list(
+            scan.iter_columns("id", "name", "color", table_name="fruits", where=where)
+        )
+        unordered = list(scan.iter_columns("id", table_name="fruits", ordered=False))
+        assert parallel == serial
+        assert scan.count("fruits", where) == len(serial)
+    assert sorted(unordered) == [(row_id,) for row_id in range(1, 5001)]
+
+
+def test_parser_with_workers(deep_db_file):
+    with SqliteParser(deep_db_file, workers=2) as parser:
+        assert parser.sql("SELECT count(*) FROM fruits") == 5000
+        assert parser.sql("SELECT id FROM fruits WHERE color = 'red' LIMIT 2") == [
+            (1,),
+            (4,),
+        ]
+        # Rowid predicates still go straight to the B-tree.
+        assert parser.sql("SELECT name FROM fruits WHERE id = 7") == [("fruit 6",)]
+
+
+def test_worker_opens_one_parser_for_all_its_chunks(deep_db_file, monkeypatch):
+    monkeypatch.setattr(app.parallel, "_worker_parser", None)
+    app.parallel.open_worker_parser(deep_db_file)
+    with app.parallel._worker_parser as worker_parser:
+        chunks = ParallelScan(worker_parser, chunk_size=4).chunks("fruits")
+        counts = [app.parallel.count_chunk("fruits", chunk, None) for chunk in chunks]
+        rows = app.parallel.scan_chunk("fruits", chunks[-1], ["id"], None)
+        assert sum(counts) == 5000
+        assert rows[-1] == (5000,)
+        assert app.parallel._worker_parser is worker_parser
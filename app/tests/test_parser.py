@@ -1,6 +1,8 @@
 import pathlib
 from operator import itemgetter
 
+import pytest
+
 from app.parser import SqliteParser
 
 
@@ -67,6 +69,18 @@ class TestParser:
             (3913, "Matris Ater Clementia (New Earth)"),
         ]
 
+    def test_table_names_ignore_case(self):
+        path = pathlib.Path("sample.db")
+        parser = SqliteParser(path)
+        expected = parser.sql("select Name from Apples where ID >= 2")
+        assert expected == [("Fuji",), ("Honeycrisp",), ("Golden Delicious",)]
+
+    def test_unknown_table(self):
+        path = pathlib.Path("sample.db")
+        parser = SqliteParser(path)
+        with pytest.raises(ValueError, match="no such table: pears"):
+            parser.sql("SELECT name FROM pears")
+
     # def test_retrieve_data_using_an_index(self):
     #     path = pathlib.Path("companies.db")
     #     parser = SqliteParser(path)
@@ -0,0 +1,139 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import app.query
+from app.cache import PlanCache
+from app.pager import FilePageSource, MmapPageSource, PreadPageSource
+from app.parser import SqliteParser
+from app.plans import QueryPlan
+
+
+def test_repeated_query_reuses_its_plan(deep_db_file, monkeypatch):
+    with SqliteParser(deep_db_file) as parser:
+        query = "SELECT id FROM fruits WHERE color = 'red' AND id < 10"
+        assert parser.sql(query) == [(1,), (4,), (7,)]
+
+        def fail(command):
+            raise AssertionError("query parsed again")
+
+        monkeypatch.setattr(app.query, "parse_command", fail)
+        assert parser.sql(query) == [(1,), (4,), (7,)]
+        assert parser.plan_cache.stats.hits == 1
+
+
+def test_plan_cache_evicts_least_recently_used():
+    cache = PlanCache(max_entries=2)
+    for sql in ("a", "b", "a", "c"):
+        cache.put(sql, QueryPlan(None, lambda: None))
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.stats.evictions == 1
+
+
+def test_plans_and_pages_are_dropped_when_the_file_changes(deep_db_file, tmp_path):
+    path = tmp_path / "copy.db"
+    shutil.copy(deep_db_file, path)
+    query = "SELECT color FROM fruits WHERE id = 1"
+    with SqliteParser(path, page_source=FilePageSource(path)) as parser:
+        assert parser.sql(query) == [("red",)]
+        assert query in parser.plan_cache
+
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE fruits SET color = 'blue' WHERE id = 1")
+
+        assert parser.sql(query) == [("blue",)]
+        assert parser.plan_cache.stats.hits == 0
+
+
+@pytest.mark.parametrize("source", [FilePageSource, MmapPageSource, PreadPageSource])
+def test_pages_added_by_another_writer_are_read(deep_db_file, tmp_path, source):
+    path = tmp_path / "copy.db"
+    shutil.copy(deep_db_file, path)
+    query = "SELECT count(*) FROM fruits"
+    with SqliteParser(path, page_source=source(path)) as parser:
+        assert parser.sql(query) == 5000
+        size = parser.page_source.file_size
+
+        with sqlite3.connect(path) as conn:
+            conn.executemany(
+                "INSERT INTO fruits (name, color) VALUES (?, 'green')",
+                [(f"fruit {i}",) for i in range(2000)],
+            )
+
+        assert parser.sql(query) == 7000
+        assert parser.sql("SELECT name FROM fruits WHERE id = 7000") == [
+            ("fruit 1999",)
+        ]
+        assert parser.page_source.file_size > size
+
+
+def test_column_indexes(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        cell = parser.get_cell("fruits")
+        assert cell.column_indexes == {"id": 0, "name": 1, "color": 2}
+        assert cell.get_column_index("color") == 2
+
+
+def test_tree_stats_estimate(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        stats = parser.tree_stats(parser.get_cell("fruits").root_page)
+    assert stats.depth == 3
+    assert (stats.min_row_id, stats.max_row_id) == (1, 5000)
+    assert 0.7 * 5000 < stats.rows < 1.3 * 5000
+
+
+def test_planner_picks_the_cheapest_path(indexed_db_file, tmp_path):
+    with SqliteParser(indexed_db_file) as parser:
+        cell = parser.get_cell("companies")
+        where = app.query.parse_expression("country = 'peru' AND id > 2990")
+        assert parser.choose_access_path(cell, where).kind == "rowid"
+        where = app.query.parse_expression("country = 'peru' AND id > 10")
+        assert parser.choose_access_path(cell, where).kind == "index"
+        where = app.query.parse_expression("name = 'company 7'")
+        assert parser.choose_access_path(cell, where).kind == "scan"
+
+    # On a one-page table a scan is cheaper than going through the index.
+    path = tmp_path / "tiny.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id integer primary key, kind text)")
+        conn.execute("CREATE INDEX idx_t_kind ON t (kind)")
+        conn.executemany("INSERT INTO t (kind) VALUES (?)", [("a",), ("b",)])
+    with SqliteParser(path) as parser:
+        assert parser.sql("SELECT * FROM t WHERE kind = 'b'") == [(2, "b")]
+        assert parser.explain("SELECT * FROM t WHERE kind = 'b'") == [
+            "SCAN t (~2 rows, ~1 pages)"
+        ]
+
+
+def test_explain(indexed_db_file, capsys):
+    with SqliteParser(indexed_db_file) as parser:
+        parser.handle_command(
+            "explain query plan SELECT name, count(*) FROM companies"
+            " WHERE country = 'peru' GROUP BY country ORDER BY 2 LIMIT 1"
+        )
+        parser.handle_command("EXPLAIN SELECT name FROM companies WHERE id <= 30")
+    assert capsys.readouterr().out.splitlines() == [
+        (
+            "SEARCH companies USING INDEX idx_companies_country (country=?)"
+            " (~10 rows, ~33 pages)"
+        ),
+        "USE HASH TABLE FOR GROUP BY",
+        "USE TOP-1 HEAP FOR ORDER BY",
+        "SEARCH companies USING INTEGER PRIMARY KEY (rowid<=?) (~36 rows, ~4 pages)",
+    ]
+
+
+def test_explain_parallel_count(indexed_db_file, deep_db_file):
+    with SqliteParser(indexed_db_file, workers=2) as parser:
+        # The covering index is counted serially.
+        [step] = parser.explain("SELECT count(*) FROM companies")
+        assert step.startswith("SCAN companies USING COVERING INDEX")
+        assert not step.endswith(" IN PARALLEL")
+    with SqliteParser(deep_db_file, workers=2) as parser:
+        [step] = parser.explain("SELECT count(*) FROM fruits")
+        assert step.endswith(" IN PARALLEL")
+        # A rowid seek is counted serially.
+        [step] = parser.explain("SELECT count(*) FROM fruits WHERE id = 7")
+        assert not step.endswith(" IN PARALLEL")
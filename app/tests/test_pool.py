@@ -0,0 +1,53 @@
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from app.parser import SqliteParser
+from app.pool import ReaderPool
+
+QUERIES = [
+    "SELECT id, name FROM fruits WHERE color = 'green' AND id < 300",
+    "SELECT count(*) FROM fruits",
+    "SELECT name FROM fruits WHERE id = 4242",
+    "SELECT color, max(id) FROM fruits GROUP BY color",
+]
+
+
+def test_threads_share_one_pool(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        expected = [parser.execute(query) for query in QUERIES] * 25
+
+    # A small cache forces evictions while the threads race each other.
+    with ReaderPool(deep_db_file, max_readers=4, page_cache_size=16 * 512) as pool:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(pool.execute, QUERIES * 25))
+        assert results == expected
+        assert len(pool._idle) <= 4
+        schemas = {id(reader.schema_table) for reader in pool._idle}
+        assert schemas == {id(pool.schema_table)}
+
+
+def test_pool_reloads_after_the_file_changes(deep_db_file, tmp_path):
+    path = tmp_path / "copy.db"
+    shutil.copy(deep_db_file, path)
+    query = "SELECT color FROM fruits WHERE id = 1"
+    with ReaderPool(path) as pool:
+        assert pool.execute(query) == [("red",)]
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE fruits SET color = 'blue' WHERE id = 1")
+        assert pool.execute(query) == [("blue",)]
+
+
+def test_pool_reads_pages_added_by_another_writer(deep_db_file, tmp_path):
+    path = tmp_path / "copy.db"
+    shutil.copy(deep_db_file, path)
+    query = "SELECT name FROM fruits WHERE id = 7000"
+    with ReaderPool(path) as pool:
+        assert pool.execute(query) == []
+        with sqlite3.connect(path) as conn:
+            conn.executemany(
+                "INSERT INTO fruits (name, color) VALUES (?, 'green')",
+                [(f"fruit {i}",) for i in range(2000)],
+            )
+        assert pool.execute(query) == [("fruit 1999",)]
+        assert pool.page_source.file_size == path.stat().st_size
@@ -0,0 +1,213 @@
+import sqlite3
+
+import pytest
+
+from app.parser import SqliteParser
+from app.query import (
+    And,
+    Between,
+    Column,
+    Comparison,
+    FunctionCall,
+    InList,
+    IsNull,
+    Join,
+    Like,
+    Literal,
+    Not,
+    Or,
+    ParsedCommand,
+    Star,
+    compile_predicate,
+    index_conditions,
+    parse_command,
+    parse_expression,
+)
+from app.utils import Range
+
+
+@pytest.mark.parametrize(
+    "command, expected",
+    [
+        (
+            "SELECT COUNT(*) FROM movie",
+            ParsedCommand(
+                table_name="movie", columns=[FunctionCall("count", (Star(),))]
+            ),
+        ),
+        (
+            "SELECT title, year FROM movie",
+            ParsedCommand(
+                table_name="movie", columns=[Column("title"), Column("year")]
+            ),
+        ),
+        (
+            "select * from movie limit 1;",
+            ParsedCommand(table_name="movie", columns=[Star()], limit=1),
+        ),
+        (
+            "SELECT title, year FROM movie WHERE year == 1975",
+            ParsedCommand(
+                table_name="movie",
+                columns=[Column("title"), Column("year")],
+                where=Comparison("==", Column("year"), Literal(1975)),
+            ),
+        ),
+        (
+            (
+                "SELECT m.*, r.stars FROM movie AS m LEFT OUTER JOIN reviews r"
+                " ON r.movie_id = m.rowid WHERE r.stars > 3"
+            ),
+            ParsedCommand(
+                table_name="movie",
+                alias="m",
+                columns=[Star("m"), Column("r.stars")],
+                joins=[
+                    Join(
+                        "reviews",
+                        Comparison("=", Column("r.movie_id"), Column("m.rowid")),
+                        "r",
+                        left=True,
+                    )
+                ],
+                where=Comparison(">", Column("r.stars"), Literal(3)),
+            ),
+        ),
+    ],
+)
+def test_parse_command(command, expected):
+    assert parse_command(command) == expected
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        (
+            "a = 1 OR b = 'x' AND NOT c < -2.5",
+            Or(
+                (
+                    Comparison("=", Column("a"), Literal(1)),
+                    And(
+                        (
+                            Comparison("=", Column("b"), Literal("x")),
+                            Not(Comparison("<", Column("c"), Literal(-2.5))),
+                        )
+                    ),
+                )
+            ),
+        ),
+        (
+            "(a = 1 OR b = 2) AND c IS NOT NULL",
+            And(
+                (
+                    Or(
+                        (
+                            Comparison("=", Column("a"), Literal(1)),
+                            Comparison("=", Column("b"), Literal(2)),
+                        )
+                    ),
+                    IsNull(Column("c"), negated=True),
+                )
+            ),
+        ),
+        (
+            "name NOT IN ('it''s', NULL) AND \"Order\" LIKE 'a%'",
+            And(
+                (
+                    InList(Column("name"), (Literal("it's"), Literal(None)), True),
+                    Like(Column("order"), "a%"),
+                )
+            ),
+        ),
+        ("id BETWEEN 1 AND 5", Between(Column("id"), Literal(1), Literal(5))),
+    ],
+)
+def test_parse_expression(where, expected):
+    assert parse_expression(where) == expected
+
+
+@pytest.mark.parametrize("where", ["a =", "a = 1 b", "a ~ 1", "a IN 1"])
+def test_parse_expression_errors(where):
+    with pytest.raises(ValueError):
+        parse_expression(where)
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        ("id = 42", {"id": 42}),
+        ("color = 'Light Green'", {"color": "Light Green"}),
+        ("id BETWEEN 1 AND 5", {"id": Range(1, 5)}),
+        ("5 > id", {"id": Range(high=5, high_inclusive=False)}),
+        ("score >= 7.5 AND id != 3", {"score": Range(low=7.5)}),
+        ("id = 1 OR id = 2", {}),
+    ],
+)
+def test_index_conditions(where, expected):
+    assert index_conditions(parse_expression(where)) == expected
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        ("a = 1", [0]),
+        ("a <> 1", [1, 2]),
+        ("a >= 1.5", [1, 2]),
+        ("b < 'b'", [0]),
+        ("a IS NULL", [3]),
+        ("NOT a = 1", [1, 2]),
+        ("a IN (1, 3)", [0, 2]),
+        ("a NOT IN (1, NULL)", []),
+        ("b LIKE 'B_'", [1]),
+        ("b LIKE '%c%' OR a = 2", [1, 2]),
+        ("a = 1 AND b = 'a'", [0]),
+        ("a NOT BETWEEN 1 AND 2", [2]),
+    ],
+)
+def test_compile_predicate(where, expected):
+    rows = [(1, "a"), (2, "bc"), (3, "c"), (None, "d")]
+    predicate = compile_predicate(
+        parse_expression(where), lambda name: lambda row: row["ab".index(name)]
+    )
+    assert [i for i, row in enumerate(rows) if predicate(row)] == expected
+
+
+@pytest.mark.parametrize(
+    "where",
+    [
+        "color = 'green' AND id < 100",
+        "color = 'red' OR name LIKE 'fruit 42%'",
+        "id IN (1, 2, 4000) OR color = 'blue'",
+        "name > 'fruit 4990' AND NOT color = 'red'",
+        "id BETWEEN 10 AND 20 AND color <> 'green'",
+    ],
+)
+def test_queries_match_sqlite(deep_db_file, where):
+    query = f"SELECT id, name FROM fruits WHERE {where}"
+    with sqlite3.connect(deep_db_file) as conn:
+        expected = conn.execute(f"{query} ORDER BY id").fetchall()
+        count = conn.execute(f"SELECT count(*) FROM fruits WHERE {where}").fetchone()
+    with SqliteParser(deep_db_file) as parser:
+        assert parser.sql(query) == expected
+        assert parser.sql(f"SELECT count(*) FROM fruits WHERE {where}") == count[0]
+
+
+def test_filter_matches_the_named_column_only(deep_db_file):
+    # 'red' is a color; matching it against every column used to return
+    # rows whose name or any other column happened to equal it.
+    with SqliteParser(deep_db_file) as parser:
+        assert parser.sql("SELECT id FROM fruits WHERE name = 'red'") == []
+
+
+def test_predicate_decodes_only_referenced_columns(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        cell = parser.get_cell("fruits")
+        read = set()
+
+        def resolve(name):
+            get = parser.column_getter(cell, name)
+            return lambda record: read.add(name) or get(record)
+
+        predicate = compile_predicate(parse_expression("color = 'red'"), resolve)
+        assert sum(map(predicate, parser.scan_rows("fruits"))) == 1667
+        assert read == {"color"}
@@ -0,0 +1,69 @@
+import sqlite3
+
+import app.models.records
+from app.cursor import TableCursor
+from app.parser import SqliteParser
+
+
+def test_lazy_record_matches_eager_record(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        root_page = parser.get_cell("fruits").root_page
+        eager = list(TableCursor(parser, root_page))
+        lazy = list(TableCursor(parser, root_page, lazy=True))
+        assert [r.values for r in lazy] == [r.values for r in eager]
+        assert [r[2] for r in lazy] == [r[2] for r in eager]
+        assert lazy[0][10] is None
+
+
+def test_count_does_not_decode_records(deep_db_file, monkeypatch):
+    def fail(*args):
+        raise AssertionError("record decoded")
+
+    with SqliteParser(deep_db_file) as parser:
+        parser.get_cell("fruits")
+        monkeypatch.setattr(parser, "decode_record", fail)
+        monkeypatch.setattr(parser, "decode_lazy_record", fail)
+        assert parser.sql("SELECT count(*) FROM fruits") == 5000
+
+
+def test_projection_decodes_only_requested_columns(deep_db_file, monkeypatch):
+    decoded = []
+    decode_value = app.models.records.decode_value
+
+    def counting_decode_value(buffer, offset, serial_type):
+        decoded.append(serial_type)
+        return decode_value(buffer, offset, serial_type)
+
+    monkeypatch.setattr(app.models.records, "decode_value", counting_decode_value)
+    with SqliteParser(deep_db_file) as parser:
+        rows = parser.sql("SELECT id, color FROM fruits")
+    assert len(rows) == len(decoded) == 5000
+
+
+def test_added_columns_take_their_default(tmp_path):
+    path = tmp_path / "altered.db"
+    queries = [
+        "SELECT a, e, f FROM t",
+        "SELECT e, count(*) FROM t GROUP BY e",
+        "SELECT a FROM t WHERE e = 5 AND f = 'z'",
+    ]
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (a int)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(3)])
+        conn.execute("ALTER TABLE t ADD COLUMN e int DEFAULT 5")
+        conn.execute("ALTER TABLE t ADD COLUMN f text DEFAULT 'z'")
+        conn.execute("INSERT INTO t VALUES (3, 7, NULL)")
+        expected = [conn.execute(sql).fetchall() for sql in queries]
+    with SqliteParser(path) as parser:
+        assert [parser.sql(sql) for sql in queries] == expected
+        [batch] = parser.iter_batches("t")
+        assert batch.column(1) == [5, 5, 5, 7]
+
+
+def test_iter_batches_matches_scan(deep_db_file):
+    with SqliteParser(deep_db_file) as parser:
+        root_page = parser.get_cell("fruits").root_page
+        batches = list(parser.iter_batches("fruits", batch_size=1000))
+        rows = [(r.row_id, *r.values) for r in TableCursor(parser, root_page)]
+    assert [len(batch) for batch in batches] == [1000] * 5
+    assert [row for batch in batches for row in batch] == rows
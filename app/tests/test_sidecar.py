@@ -0,0 +1,145 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from app.main import main
+from app.parallel import ParallelScan
+from app.parser import SqliteParser
+from app.sidecar import load_sidecar, sidecar_path
+
+
+@pytest.fixture
+def joins_copy(joins_db_file, tmp_path):
+    path = tmp_path / "joins.db"
+    shutil.copy(joins_db_file, path)
+    return path
+
+
+def count_pages(parser, monkeypatch) -> list[int]:
+    pages_read = []
+    get_page = parser.get_page
+    monkeypatch.setattr(
+        parser, "get_page", lambda n: pages_read.append(n) or get_page(n)
+    )
+    return pages_read
+
+
+def test_sidecar_summaries(joins_copy):
+    with SqliteParser(joins_copy) as parser:
+        sidecar = parser.save_sidecar()
+        customers = parser.get_cell("customers")
+        index = parser.get_index_cell("orders", "customer_id")
+        leaves = parser.known_leaf_pages(customers.root_page)
+    assert leaves is None
+    tree = sidecar.trees[customers.root_page]
+    assert tree.rows == 300
+    assert (tree.min_row_id, tree.max_row_id) == (1, 300)
+    assert tree.columns == {
+        "id": [1, 300],
+        "name": ["customer 0", "customer 99"],
+        "country": ["chad", "peru"],
+    }
+    assert sidecar.trees[index.root_page].rows == 3000
+
+    loaded = load_sidecar(sidecar_path(joins_copy), sidecar.version)
+    assert loaded == sidecar
+    assert load_sidecar(sidecar_path(joins_copy), (0, 0)) is None
+
+
+def test_sidecar_replaces_btree_walks(joins_copy, monkeypatch):
+    queries = [
+        "SELECT count(*) FROM orders",
+        (
+            "SELECT c.name, o.amount FROM customers c JOIN orders o"
+            " ON o.customer_id = c.id WHERE c.country = 'peru'"
+        ),
+        "SELECT id FROM orders WHERE customer_id = 42",
+    ]
+    with SqliteParser(joins_copy) as parser:
+        expected = [parser.execute(sql) for sql in queries]
+        plans = [parser.explain(sql) for sql in queries]
+        parser.save_sidecar()
+
+    path = sidecar_path(joins_copy)
+    with SqliteParser(joins_copy, sidecar_path=path) as parser:
+        pages_read = count_pages(parser, monkeypatch)
+        assert parser.execute(queries[0]) == 3000
+        # Only page 1, for the header: no schema, interior or leaf pages.
+        assert set(pages_read) == {1}
+        assert [parser.execute(sql) for sql in queries] == expected
+        # Exact counts in place of estimates, and the same choices.
+        for plan, planned in zip(plans, map(parser.explain, queries)):
+            assert plan[0].split(" (~")[0] == planned[0].split(" (~")[0]
+
+        chunks = ParallelScan(parser, chunk_size=16).chunks("orders")
+        pages_read.clear()
+        assert chunks == ParallelScan(parser, chunk_size=16).chunks("orders")
+        assert pages_read == []
+
+
+def test_sidecar_bounds_estimates(joins_copy):
+    sql = "SELECT id FROM customers WHERE country = 'zambia'"
+    with SqliteParser(joins_copy) as parser:
+        assert (
+            "(~10 rows"
+            in parser.explain("SELECT amount FROM orders WHERE customer_id = 900")[0]
+        )
+        parser.save_sidecar(sidecar_path(joins_copy))
+    with SqliteParser(joins_copy, sidecar_path=sidecar_path(joins_copy)) as parser:
+        # customer_id never goes past 339.
+        assert (
+            "(~0 rows"
+            in parser.explain("SELECT amount FROM orders WHERE customer_id = 900")[0]
+        )
+        assert parser.execute(sql) == []
+
+
+def test_stale_sidecar_is_ignored(joins_copy, monkeypatch):
+    path = sidecar_path(joins_copy)
+    with SqliteParser(joins_copy, sidecar_path=path) as parser:
+        assert parser.sidecar is None
+        parser.save_sidecar()
+        assert parser.sidecar is not None
+        assert parser.execute("SELECT count(*) FROM customers") == 300
+
+        with sqlite3.connect(joins_copy) as conn:
+            conn.execute("INSERT INTO customers (name) VALUES ('new')")
+        # The next query sees the new file version and drops the sidecar.
+        assert parser.execute("SELECT count(*) FROM customers") == 301
+        assert parser.sidecar is None
+
+    with SqliteParser(joins_copy, sidecar_path=path) as parser:
+        assert parser.sidecar is None
+    path.write_text("{not json")
+    with SqliteParser(joins_copy, sidecar_path=path) as parser:
+        assert parser.sidecar is None
+        assert parser.execute("SELECT count(*) FROM customers") == 301
+
+
+def test_cli_writes_sidecar(joins_copy, capsys):
+    path = sidecar_path(joins_copy)
+    main(
+        database_file_path=joins_copy,
+        command="SELECT count(*) FROM orders",
+        sidecar=True,
+    )
+    assert path.exists()
+    written = path.stat().st_mtime_ns
+    main(
+        database_file_path=joins_copy,
+        command="SELECT count(*) FROM orders",
+        sidecar=True,
+    )
+    assert path.stat().st_mtime_ns == written
+    assert capsys.readouterr().out == "3000\n3000\n"
+
+
+def test_sidecar_skips_without_rowid_tables(joins_copy):
+    with sqlite3.connect(joins_copy) as conn:
+        conn.execute("CREATE TABLE w (k TEXT PRIMARY KEY, v INT) WITHOUT ROWID")
+        conn.execute("INSERT INTO w VALUES ('a', 1)")
+    with SqliteParser(joins_copy) as parser:
+        sidecar = parser.save_sidecar()
+        assert parser.get_cell("w").root_page not in sidecar.trees
+        assert parser.execute("SELECT count(*) FROM customers") == 300
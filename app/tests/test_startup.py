@@ -0,0 +1,28 @@
+import sqlite3
+import subprocess
+import sys
+
+from app.parser import SqliteParser
+
+
+def test_cli_import_is_light():
+    code = "import sys, app.main; print(*sorted(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    modules = set(result.stdout.split())
+    assert not modules & {"sqlparse", "multiprocessing", "app.query"}
+
+
+def test_schema_spanning_several_pages(tmp_path):
+    path = tmp_path / "wide.db"
+    with sqlite3.connect(path) as conn:
+        for i in range(300):
+            conn.execute(f"CREATE TABLE t{i} (id integer primary key, value text)")
+        conn.execute("INSERT INTO t299 (value) VALUES ('last')")
+
+    with SqliteParser(path) as parser:
+        assert not parser.get_page(1).is_leaf
+        assert parser.db_info() == (4096, 300)
+        assert len(parser.tables()) == 300
+        assert parser.sql("SELECT id, value FROM t299") == [(1, "last")]
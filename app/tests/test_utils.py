@@ -1,37 +1,85 @@
 import pytest
 
-from app.utils import ParsedCommand, parse_command
+from app.utils import (
+    Range,
+    extract_column_defaults,
+    extract_columns,
+    extract_rowid_column,
+)
+
+
+@pytest.mark.parametrize(
+    "range_, expected",
+    [
+        (Range(1, 5), (1, 5)),
+        (Range(0.5, 5.5), (1, 5)),
+        (Range(1, 5, low_inclusive=False, high_inclusive=False), (2, 4)),
+        (Range(high=5.5, high_inclusive=False), (None, 5)),
+    ],
+)
+def test_row_id_bounds(range_, expected):
+    assert range_.row_id_bounds() == expected
 
 
 @pytest.mark.parametrize(
-    "command, expected",
+    "sql, columns, rowid_column",
     [
         (
-            "SELECT COUNT(*) FROM movie",
-            ParsedCommand(table_name="movie", function="COUNT", columns=[], where=None),
+            (
+                "CREATE TABLE companies (id integer primary key autoincrement, name text,"
+                ' domain text, year_founded text, "size range" text, country text)'
+            ),
+            ["id", "name", "domain", "year_founded", "size range", "country"],
+            "id",
         ),
+        ("CREATE TABLE sqlite_sequence(name,seq)", ["name", "seq"], None),
+        ("CREATE INDEX idx_country on companies (country)", ["country"], None),
         (
-            "SELECT title, year FROM movie",
-            ParsedCommand(
-                table_name="movie", function=None, columns=["title", "year"], where=None
+            (
+                'CREATE TABLE IF NOT EXISTS "t(1)" ([key] INTEGER NOT NULL,'
+                " year INT DEFAULT (strftime('%Y', 'now')), -- the, year\n"
+                " `body` TEXT CHECK (length(body) > 0), data BLOB,"
+                ' CONSTRAINT pk PRIMARY KEY ("key"), FOREIGN KEY (year) REFERENCES y(id))'
             ),
+            ["key", "year", "body", "data"],
+            "key",
         ),
         (
-            "SELECT title FROM movie",
-            ParsedCommand(
-                table_name="movie", function=None, columns=["title"], where=None
-            ),
+            "CREATE TABLE t (a integer, b, PRIMARY KEY(a)) WITHOUT ROWID",
+            ["a", "b"],
+            None,
         ),
+        ("CREATE TABLE t (a INTEGER PRIMARY KEY DESC, b)", ["a", "b"], None),
+        ("CREATE TABLE t (a INT PRIMARY KEY, b)", ["a", "b"], None),
         (
-            "SELECT title, year FROM movie WHERE year == 1975",
-            ParsedCommand(
-                table_name="movie",
-                function=None,
-                columns=["title", "year"],
-                where="year == 1975",
-            ),
+            "CREATE UNIQUE INDEX i ON t (lower(name), b DESC) WHERE b > 0",
+            ["lower(name)", "b"],
+            None,
         ),
+        ("CREATE VIEW v AS SELECT count(*) FROM t", [], None),
+        ("CREATE TABLE t2 AS SELECT max(a) FROM t", [], None),
     ],
 )
-def test_parse_command(command, expected):
-    assert parse_command(command) == expected
+def test_extract_columns(sql, columns, rowid_column):
+    assert extract_columns(sql) == columns
+    assert extract_rowid_column(sql) == rowid_column
+
+
+def test_extract_column_defaults():
+    sql = (
+        "CREATE TABLE t (a int DEFAULT 5, b DEFAULT - 3 NOT NULL, c DEFAULT 'x''y',"
+        " d DEFAULT (1.5), e DEFAULT (strftime('%Y', 'now')), f DEFAULT X'00ff',"
+        " g DEFAULT NULL, h DEFAULT TRUE, i DEFAULT CURRENT_TIME, j, PRIMARY KEY (a))"
+    )
+    assert extract_column_defaults(sql) == [
+        5,
+        -3,
+        "x'y",
+        1.5,
+        None,
+        b"\x00\xff",
+        None,
+        1,
+        None,
+        None,
+    ]
@@ -1,73 +1,286 @@
+import math
 import re
 import struct
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from collections.abc import Iterator
 from typing import Any
 
-import sqlparse
-from sqlparse.sql import Function, Identifier, IdentifierList, Where, Parenthesis
-from sqlparse.tokens import Keyword
+
+DDL_TOKEN_PATTERN = re.compile(
+    r"""\s+|--[^\n]*|/\*.*?(?:\*/|$)
+    |(?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|'(?:[^']|'')*')
+    |(?P<punct>[(),])
+    |(?P<word>[^\s"'`\[(),]+)""",
+    re.VERBOSE | re.DOTALL,
+)
+NUMBER_PATTERN = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+HEX_PATTERN = re.compile(r"[+-]?0[xX][0-9a-fA-F]+")
+CREATE_MODIFIERS = {"TEMP", "TEMPORARY", "UNIQUE", "VIRTUAL"}
+TABLE_CONSTRAINTS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "FOREIGN"}
+COLUMN_CONSTRAINTS = {
+    "CONSTRAINT",
+    "PRIMARY",
+    "NOT",
+    "NULL",
+    "UNIQUE",
+    "CHECK",
+    "DEFAULT",
+    "COLLATE",
+    "REFERENCES",
+    "GENERATED",
+    "AS",
+}
+SORT_ORDERS = {"ASC", "DESC", "COLLATE"}
+
+
+def sort_key(value):
+    """Order values like SQLite: NULL < INTEGER/REAL < TEXT < BLOB."""
+    match value:
+        case None:
+            return (0, 0)
+        case int() | float():
+            return (1, value)
+        case str():
+            return (2, value)
+        case _:
+            return (3, bytes(value))
+
+
+def is_finite_number(value) -> bool:
+    """Whether value is an integer or a finite float, so a rowid can be sought."""
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
 
 
 @dataclass
-class ParsedCommand:
-    table_name: str = field(default="")
-    columns: list[str] = field(default_factory=list)
-    function: str | None = None
-    where: dict[str, Any] = field(default_factory=dict)
+class Range:
+    low: Any = None
+    high: Any = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+
+    def __contains__(self, value):
+        if value is None:
+            return False
+        if self.low is not None:
+            if sort_key(value) < sort_key(self.low):
+                return False
+            if not self.low_inclusive and value == self.low:
+                return False
+        if self.high is not None:
+            if sort_key(value) > sort_key(self.high):
+                return False
+            if not self.high_inclusive and value == self.high:
+                return False
+        return True
+
+    def is_finite(self) -> bool:
+        """Whether every bound is missing or a finite number, as a seek needs."""
+        return all(
+            bound is None or is_finite_number(bound) for bound in (self.low, self.high)
+        )
+
+    def row_id_bounds(self) -> tuple[int | None, int | None]:
+        """Tightest inclusive integer bounds, for scanning rowids."""
+        start = stop = None
+        if self.low is not None:
+            start = (
+                math.ceil(self.low) if self.low_inclusive else math.floor(self.low) + 1
+            )
+        if self.high is not None:
+            stop = (
+                math.floor(self.high)
+                if self.high_inclusive
+                else math.ceil(self.high) - 1
+            )
+        return start, stop
+
+
+def ddl_tokens(sql_statement: str) -> Iterator[re.Match]:
+    """Tokens of a CREATE statement: quoted names and strings, words, ( , )."""
+    for match in DDL_TOKEN_PATTERN.finditer(sql_statement):
+        if match.lastgroup is not None:
+            yield match
+
+
+def unquote(name: str) -> str:
+    if name[:1] in ('"', "`", "'"):
+        return name[1:-1].replace(name[0] * 2, name[0])
+    if name[:1] == "[":
+        return name[1:-1]
+    return name
+
+
+def column_definitions(sql_statement: str) -> tuple[list[list[re.Match]], list]:
+    """Split the parenthesised list of a CREATE TABLE or INDEX statement.
+
+    Returns one token list per top-level comma-separated definition, and the
+    words that follow the closing parenthesis (WITHOUT ROWID, STRICT, ...).
+    Statements without a column list, like views and CREATE TABLE ... AS
+    SELECT, have no definitions.
+    """
+    tokens = ddl_tokens(sql_statement)
+    words = []
+    for token in tokens:
+        if token["punct"] == "(":
+            break
+        words.append(token[0].upper())
+    else:
+        return [], []
+    kind = next((word for word in words[1:] if word not in CREATE_MODIFIERS), None)
+    if kind not in ("TABLE", "INDEX") or "AS" in words:
+        return [], []
+    definitions = [[]]
+    depth = 0
+    for token in tokens:
+        match token["punct"]:
+            case "(":
+                depth += 1
+            case ")" if depth == 0:
+                break
+            case ")":
+                depth -= 1
+            case "," if depth == 0:
+                definitions.append([])
+                continue
+        definitions[-1].append(token)
+    trailing = [token[0].upper() for token in tokens if token["word"]]
+    return [definition for definition in definitions if definition], trailing
+
+
+def is_table_constraint(definition: list[re.Match]) -> bool:
+    first = definition[0]
+    return first["word"] is not None and first[0].upper() in TABLE_CONSTRAINTS
+
+
+def column_name(sql_statement: str, definition: list[re.Match]) -> str:
+    first = definition[0]
+    if len(definition) > 1 and definition[1]["punct"] == "(":
+        # An expression in an index, like lower(name).
+        return sql_statement[first.start() : definition[-1].end()].lower()
+    return unquote(first[0]).lower()
+
+
+def column_modifiers(definition: list[re.Match]) -> tuple[str, str | None]:
+    """The sort order and COLLATE name a column definition spells out.
+
+    The order is "ASC" unless DESC follows the column; the collation is
+    None when no COLLATE clause is given.
+    """
+    words = [token[0].upper() for token in definition]
+    order = "DESC" if words[-1:] == ["DESC"] else "ASC"
+    collation = None
+    if "COLLATE" in words[:-1]:
+        collation = unquote(definition[words.index("COLLATE") + 1][0]).upper()
+    return order, collation
+
+
+def extract_column_modifiers(sql_statement: str) -> list[tuple[str, str | None]]:
+    """(sort order, collation) of each column extract_columns returns."""
+    definitions, _ = column_definitions(sql_statement)
+    return [
+        column_modifiers(definition)
+        for definition in definitions
+        if not is_table_constraint(definition)
+    ]
+
+
+def ddl_literal(words: list[str]):
+    """The value of a literal spelled by words, or None for anything else."""
+    if len(words) == 2 and words[0] in ("-", "+"):
+        # A sign written apart from its number.
+        words = [words[0] + words[1]]
+    if len(words) == 2 and words[0] in ("X", "x") and words[1][:1] == "'":
+        return bytes.fromhex(words[1][1:-1])
+    if len(words) != 1:
+        return None
+    word = words[0]
+    if word[:1] in ("'", '"'):
+        return unquote(word)
+    if word.upper() in ("TRUE", "FALSE"):
+        return int(word.upper() == "TRUE")
+    if HEX_PATTERN.fullmatch(word):
+        return int(word, 16)
+    if NUMBER_PATTERN.fullmatch(word):
+        return int(word) if word.lstrip("+-").isdigit() else float(word)
+    return None
+
+
+def column_default(definition: list[re.Match]):
+    """The constant DEFAULT value of a column definition, None without one.
+
+    Expressions, like (strftime('%Y', 'now')), and CURRENT_TIME give None:
+    only constants can fill in the columns ALTER TABLE ADD COLUMN adds.
+    """
+    words = [token[0] for token in definition]
+    upper = [word.upper() for word in words]
+    if "DEFAULT" not in upper[1:]:
+        return None
+    words = words[upper.index("DEFAULT", 1) + 1 :]
+    if words[:1] == ["("]:
+        return ddl_literal(words[1 : words.index(")")] if ")" in words else [])
+    length = 2 if words[:1] in (["-"], ["+"]) else 1
+    if words[length - 1 : length] in (["X"], ["x"]):
+        length += 1
+    return ddl_literal(words[:length])
+
+
+def extract_column_defaults(sql_statement: str) -> list:
+    """The DEFAULT value of each column extract_columns returns."""
+    definitions, _ = column_definitions(sql_statement)
+    return [
+        column_default(definition)
+        for definition in definitions
+        if not is_table_constraint(definition)
+    ]
 
 
 def extract_columns(sql_statement: str) -> list[str]:
-    parsed = sqlparse.parse(sql_statement)[0]
-    columns = []
-
-    for token in parsed.tokens:
-        if isinstance(token, Parenthesis):
-            for sub_token in token.tokens:
-                if isinstance(sub_token, Identifier):
-                    columns.append(sub_token.value)
-                if isinstance(sub_token, IdentifierList):
-                    for sub_sub_token in sub_token.get_identifiers():
-                        if isinstance(sub_sub_token, Identifier):
-                            columns.append(sub_sub_token.value)
-
-    columns = [
-        column.lower()
-        for column in columns
-        if column
-        not in {"autoincrement", "primary key", "not null", "text", "integer", "year"}
+    """Column names of a CREATE TABLE, or the indexed columns of a CREATE INDEX."""
+    definitions, _ = column_definitions(sql_statement)
+    return [
+        column_name(sql_statement, definition)
+        for definition in definitions
+        if not is_table_constraint(definition)
     ]
 
-    return columns
-
-
-def parse_command(command: str) -> ParsedCommand:
-    parsed = sqlparse.parse(command)[0]
-    parsed_command = ParsedCommand()
-    from_seen = False
-    for token in parsed.tokens:
-        if token.ttype is Keyword and token.value.upper() == "FROM":
-            from_seen = True
-        match token:
-            case Where():
-                where = token.value.replace("WHERE", "").replace("where", "").strip()
-                column, param = map(str.strip, where.split("="))
-                param = param.strip("'")
-                parsed_command.where = {column: param}
-            case Function():
-                parsed_command.function = token.get_name()
-            case IdentifierList():
-                parsed_command.columns = [
-                    sub_token.value
-                    for sub_token in token.tokens
-                    if not sub_token.is_whitespace and sub_token.value.strip() != ","
+
+def is_partial_index(sql_statement: str) -> bool:
+    """Whether a CREATE INDEX has a WHERE clause, so only holds some rows."""
+    _, trailing = column_definitions(sql_statement)
+    return "WHERE" in trailing
+
+
+def extract_rowid_column(sql_statement: str) -> str | None:
+    """Name of the INTEGER PRIMARY KEY column, which aliases the rowid."""
+    definitions, trailing = column_definitions(sql_statement)
+    if "WITHOUT" in trailing:
+        return None
+    types = {}
+    primary_key = []
+    for definition in definitions:
+        words = [token[0].upper() for token in definition]
+        if is_table_constraint(definition):
+            if "PRIMARY" in words:
+                primary_key = [
+                    unquote(token[0]).lower()
+                    for token in definition[words.index("(") + 1 : -1]
+                    if token["punct"] is None and token[0].upper() not in SORT_ORDERS
                 ]
-            case Identifier():
-                if from_seen:
-                    parsed_command.table_name = token.value
-                    from_seen = False
-                else:
-                    parsed_command.columns = [token.value]
-    return parsed_command
+            continue
+        name = unquote(definition[0][0]).lower()
+        type_name = []
+        for word in words[1:]:
+            if word in COLUMN_CONSTRAINTS or word == "(":
+                break
+            type_name.append(word)
+        types[name] = type_name
+        if "PRIMARY" in words:
+            # INTEGER PRIMARY KEY DESC is a quirk: it is not a rowid alias.
+            key = words[words.index("PRIMARY") :]
+            primary_key = [] if key[2:3] == ["DESC"] else [name]
+    if len(primary_key) == 1 and types.get(primary_key[0]) == ["INTEGER"]:
+        return primary_key[0]
+    return None
 
 
 def get_offsets(buffer, page_size, cell_count, page_nr=1):
@@ -0,0 +1,73 @@
+"""Throughput benchmark: columnar batches against fetching tuples.
+
+The tuple path is what analytics jobs do today: fetch rows as tuples,
+then transpose them into typed arrays and lists per column.
+
+    python -m benchmarks.bench_columnar [--rows N] [--repeat N]
+"""
+
+import sqlite3
+import tempfile
+import time
+from argparse import ArgumentParser
+from array import array
+from pathlib import Path
+
+from app.parser import SqliteParser
+
+COLUMNS = ("id", "quantity", "price", "label")
+
+
+def create_database(path: Path, rows: int):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE bench (id integer primary key, quantity int, price real,"
+            " label text)"
+        )
+        conn.executemany(
+            "INSERT INTO bench (quantity, price, label) VALUES (?, ?, ?)",
+            ((i % 1000, i / 7, f"label {i % 5000}") for i in range(rows)),
+        )
+
+
+def tuple_path(parser):
+    rows = list(parser.iter_columns(*COLUMNS, table_name="bench"))
+    ids, quantities, prices, labels = zip(*rows)
+    return array("q", ids), array("q", quantities), array("d", prices), list(labels)
+
+
+def columnar_path(parser):
+    return list(parser.iter_column_batches(*COLUMNS, table_name="bench"))
+
+
+def best_of(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(*, rows: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        create_database(path, rows)
+        with SqliteParser(path) as parser:
+            # Warm the page cache and the decoder caches before measuring.
+            tuple_path(parser)
+            results = {
+                "tuples + transpose": best_of(repeat, lambda: tuple_path(parser)),
+                "column batches": best_of(repeat, lambda: columnar_path(parser)),
+            }
+
+    for name, seconds in results.items():
+        print(f"{name:<20} {rows / seconds:12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    namespace = parser.parse_args()
+    main(rows=namespace.rows, repeat=namespace.repeat)
@@ -0,0 +1,132 @@
+"""Micro-benchmark for record decoding: records/sec before and after the kernel.
+
+python -m benchmarks.bench_decoding [--rows N] [--repeat N]
+"""
+
+import io
+import sqlite3
+import struct
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from app.cursor import TableCursor
+from app.decoder import decode_payload, read_varint
+from app.parser import SqliteParser
+
+
+def legacy_get_varint(buffer):
+    result = 0
+    while True:
+        value = int.from_bytes(buffer.read(1), "big")
+        result = (result << 7) | (value & 0x7F)
+        if (value & 0x80) == 0:
+            break
+    return result
+
+
+def legacy_decode_value(buffer, serial_type):
+    match serial_type:
+        case 0:
+            return None
+        case 1:
+            return struct.unpack(">b", buffer.read(1))[0]
+        case 2:
+            return struct.unpack(">h", buffer.read(2))[0]
+        case 3:
+            return int.from_bytes(buffer.read(3), "big", signed=True)
+        case 4:
+            return struct.unpack(">i", buffer.read(4))[0]
+        case 5:
+            return int.from_bytes(buffer.read(6), "big", signed=True)
+        case 6:
+            return struct.unpack(">q", buffer.read(8))[0]
+        case 7:
+            return struct.unpack(">d", buffer.read(8))[0]
+        case 8:
+            return 0
+        case 9:
+            return 1
+        case _ if serial_type % 2 == 0:
+            return buffer.read((serial_type - 12) // 2)
+        case _:
+            return buffer.read((serial_type - 13) // 2).decode("utf-8")
+
+
+def legacy_decode_record(page, offset):
+    """The per-byte, file-like decoding path the parser used originally."""
+    buffer = io.BytesIO(page)
+    buffer.seek(offset)
+    legacy_get_varint(buffer)
+    legacy_get_varint(buffer)
+    header_start = buffer.tell()
+    header_size = legacy_get_varint(buffer)
+    serial_types = []
+    while buffer.tell() < header_start + header_size:
+        serial_types.append(legacy_get_varint(buffer))
+    return [legacy_decode_value(buffer, serial_type) for serial_type in serial_types]
+
+
+def kernel_decode_record(page, offset):
+    _, offset = read_varint(page, offset)
+    _, offset = read_varint(page, offset)
+    return decode_payload(page, offset)[1]
+
+
+def create_database(path: Path, rows: int):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE bench (id integer primary key, small int, big int,"
+            " ratio real, name text, payload blob)"
+        )
+        conn.executemany(
+            "INSERT INTO bench (small, big, ratio, name, payload) VALUES (?, ?, ?, ?, ?)",
+            (
+                (i % 100, i * 1_000_003, i / 7, f"name {i}", bytes(i % 40))
+                for i in range(rows)
+            ),
+        )
+
+
+def collect_cells(path: Path):
+    with SqliteParser(path) as parser:
+        cell = parser.get_cell("bench")
+        return [
+            (bytes(page.buffer), offset)
+            for page in TableCursor(parser, cell.root_page).leaf_pages()
+            for offset in page.cell_offsets
+        ]
+
+
+def measure(decode, cells, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page, offset in cells:
+            decode(page, offset)
+        best = min(best, time.perf_counter() - start)
+    return len(cells) / best
+
+
+def main(*, rows: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        create_database(path, rows)
+        cells = collect_cells(path)
+
+    assert tuple(legacy_decode_record(*cells[-1])) == kernel_decode_record(*cells[-1])
+    before = measure(legacy_decode_record, cells, repeat)
+    after = measure(kernel_decode_record, cells, repeat)
+    print(f"records:  {len(cells)}")
+    print(f"before:   {before:,.0f} records/sec")
+    print(f"after:    {after:,.0f} records/sec")
+    print(f"speedup:  {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    namespace = parser.parse_args()
+    main(rows=namespace.rows, repeat=namespace.repeat)
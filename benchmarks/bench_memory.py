@@ -0,0 +1,79 @@
+"""Memory benchmark: bytes per row held by a materialised scan.
+
+Compares the original dataclass records (per-instance __dict__ and a list
+of values) with the slotted, tuple-backed Record and the column-major
+RecordBatch.
+
+    python -m benchmarks.bench_memory [--rows N]
+"""
+
+import sqlite3
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.cursor import TableCursor
+from app.parser import SqliteParser
+
+
+@dataclass
+class LegacyRecord:
+    record_size: int
+    row_id: int
+    values: list[Any] = field(default_factory=list)
+
+
+def create_database(path: Path, rows: int):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE bench (id integer primary key, small int, big int, ratio real)"
+        )
+        conn.executemany(
+            "INSERT INTO bench (small, big, ratio) VALUES (?, ?, ?)",
+            ((i % 100, i * 1_000_003, i / 7) for i in range(rows)),
+        )
+
+
+def measure(build) -> tuple[int, int]:
+    tracemalloc.start()
+    rows = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), size
+
+
+def main(*, rows: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        create_database(path, rows)
+        with SqliteParser(path) as parser:
+            root_page = parser.get_cell("bench").root_page
+            # Warm the page cache and the decoder caches before measuring.
+            parser.count_rows("bench")
+            list(TableCursor(parser, root_page))
+
+            results = {
+                "legacy dataclass": measure(
+                    lambda: [
+                        LegacyRecord(r.record_size, r.row_id, list(r.values))
+                        for r in TableCursor(parser, root_page)
+                    ]
+                ),
+                "slotted Record": measure(lambda: list(TableCursor(parser, root_page))),
+                "RecordBatch": measure(
+                    lambda: next(parser.iter_batches("bench", batch_size=rows))
+                ),
+            }
+
+    for name, (count, size) in results.items():
+        print(f"{name:<18} {size / count:8.1f} bytes/row")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    namespace = parser.parse_args()
+    main(rows=namespace.rows)
@@ -0,0 +1,65 @@
+"""Cold-start benchmark: wall time of one CLI invocation.
+
+Runs `python -m app.main` in a fresh interpreter for .dbinfo, .tables and
+a SELECT against a schema with many tables, and prints the median.
+
+    python -m benchmarks.bench_startup [--tables N] [--runs N]
+"""
+
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+
+def create_database(path: Path, tables: int):
+    with sqlite3.connect(path) as conn:
+        for i in range(tables):
+            conn.execute(
+                f"CREATE TABLE table_{i} (id integer primary key autoincrement,"
+                f' name text not null, "created at" text default current_timestamp,'
+                f" score real check (score >= 0), UNIQUE (name))"
+            )
+        conn.executemany(
+            "INSERT INTO table_0 (name, score) VALUES (?, ?)",
+            ((f"name {i}", i / 3) for i in range(1000)),
+        )
+
+
+def cold_start(path: Path, command: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "app.main", str(path), command],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(*, tables: int, runs: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "schema.db"
+        create_database(path, tables)
+        for command in (
+            ".dbinfo",
+            ".tables",
+            "SELECT count(*) FROM table_0",
+            "SELECT name FROM table_0 WHERE score > 300",
+        ):
+            timing = cold_start(path, command, runs)
+            print(f"{command:<45} {timing * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=10)
+    namespace = parser.parse_args()
+    main(tables=namespace.tables, runs=namespace.runs)
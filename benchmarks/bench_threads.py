@@ -0,0 +1,60 @@
+"""Throughput of a shared ReaderPool as threads are added.
+
+Runs the same mix of point lookups and short scans from 1, 2, 4 and 8
+threads, with the page cache too small to hold the table, and prints
+queries per second.
+
+    python -m benchmarks.bench_threads [--rows N] [--queries N]
+"""
+
+import random
+import sqlite3
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.pool import ReaderPool
+
+
+def create_database(path: Path, rows: int):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE bench (id integer primary key, name text, score real)"
+        )
+        conn.executemany(
+            "INSERT INTO bench (name, score) VALUES (?, ?)",
+            ((f"name {i}" * 4, i / 7) for i in range(rows)),
+        )
+
+
+def main(*, rows: int, queries: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        create_database(path, rows)
+        rng = random.Random(0)
+        workload = []
+        for _ in range(queries):
+            start = rng.randrange(rows)
+            workload.append(
+                f"SELECT name FROM bench WHERE id BETWEEN {start} AND {start + 50}"
+            )
+        for threads in (1, 2, 4, 8):
+            with ReaderPool(
+                path, max_readers=threads, page_cache_size=256 * 1024
+            ) as pool:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(threads) as executor:
+                    for _ in executor.map(pool.execute, workload):
+                        pass
+                elapsed = time.perf_counter() - started
+            print(f"{threads} threads: {queries / elapsed:10.0f} queries/s")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=5_000)
+    namespace = parser.parse_args()
+    main(rows=namespace.rows, queries=namespace.queries)
@@ -0,0 +1,119 @@
+"""Synthetic SQLite databases for the benchmark suite.
+
+Each DatabaseSpec describes one table, `bench`, written with the stdlib
+sqlite3 module:
+
+    id        integer primary key
+    category  text, one of `categories` values (indexed when `indexed`)
+    c1 .. cN  `width` extra columns cycling through int, real and text
+    payload   a blob of `payload_size` bytes, larger than a page when
+              `overflow` is wanted
+
+    python -m benchmarks.generate PATH [--preset NAME] [--rows N]
+"""
+
+import random
+import sqlite3
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+__all__ = ["PRESETS", "DatabaseSpec", "generate"]
+
+COLUMN_TYPES = ("int", "real", "text")
+
+
+@dataclass(frozen=True)
+class DatabaseSpec:
+    name: str
+    rows: int = 100_000
+    width: int = 4
+    page_size: int = 4096
+    text_size: int = 16
+    payload_size: int = 0
+    categories: int = 100
+    indexed: bool = False
+    seed: int = 0
+
+    def scaled(self, scale: float) -> "DatabaseSpec":
+        return replace(self, rows=max(1, int(self.rows * scale)))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def columns(self) -> list[tuple[str, str]]:
+        return [
+            (f"c{i + 1}", COLUMN_TYPES[i % len(COLUMN_TYPES)])
+            for i in range(self.width)
+        ]
+
+
+PRESETS = {
+    spec.name: spec
+    for spec in (
+        DatabaseSpec("narrow"),
+        DatabaseSpec("wide", rows=50_000, width=32),
+        # Rows several times the page size spill onto overflow chains.
+        DatabaseSpec("overflow", rows=5_000, width=2, payload_size=10_000),
+        # Small pages make for a tall table B-tree.
+        DatabaseSpec("deep", rows=200_000, width=2, page_size=512),
+        DatabaseSpec("indexed", categories=1000, indexed=True),
+    )
+}
+
+
+def row_values(spec: DatabaseSpec, rng: random.Random, i: int) -> list:
+    values = [f"category {rng.randrange(spec.categories)}"]
+    for j, (_, column_type) in enumerate(spec.columns):
+        match column_type:
+            case "int":
+                values.append(rng.randrange(-(2**40), 2**40))
+            case "real":
+                values.append(rng.random() * 1000)
+            case _:
+                values.append(f"{i}-{j}-".ljust(spec.text_size, "x"))
+    if spec.payload_size:
+        values.append(rng.randbytes(spec.payload_size))
+    return values
+
+
+def generate(path: Path, spec: DatabaseSpec) -> Path:
+    """Write the database described by spec to path, replacing any file there."""
+    path.unlink(missing_ok=True)
+    rng = random.Random(spec.seed)
+    columns = ["id integer primary key", "category text"]
+    columns += [f"{name} {column_type}" for name, column_type in spec.columns]
+    if spec.payload_size:
+        columns.append("payload blob")
+    placeholders = ", ".join("?" * (len(columns) - 1))
+    names = ", ".join(column.split()[0] for column in columns[1:])
+
+    conn = sqlite3.connect(path)
+    try:
+        # The page size only takes effect before the first table is created.
+        conn.execute(f"PRAGMA page_size = {spec.page_size}")
+        conn.execute(f"CREATE TABLE bench ({', '.join(columns)})")
+        with conn:
+            conn.executemany(
+                f"INSERT INTO bench ({names}) VALUES ({placeholders})",
+                (row_values(spec, rng, i) for i in range(spec.rows)),
+            )
+        if spec.indexed:
+            with conn:
+                conn.execute("CREATE INDEX idx_bench_category ON bench (category)")
+    finally:
+        conn.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="narrow")
+    parser.add_argument("--rows", type=int)
+    namespace = parser.parse_args()
+    spec = PRESETS[namespace.preset]
+    if namespace.rows is not None:
+        spec = replace(spec, rows=namespace.rows)
+    generate(namespace.path, spec)
@@ -0,0 +1,183 @@
+"""Benchmark suite: times the CLI commands against synthetic databases.
+
+Generates every preset of benchmarks.generate and runs .dbinfo, .tables,
+count(*), a projection and a filtered query against each. Every case runs
+in a fresh interpreter, so its peak RSS is its own. The results are
+printed as JSON for tracking regressions between commits:
+
+    python -m benchmarks.suite [--preset NAME ...] [--scale F] [--repeat N]
+                               [--data-dir DIR] [--output FILE]
+
+For each case, `seconds` is the best of `repeat` runs with a fresh parser
+and page cache. `rows` is the number of rows the query returned, or
+counted for count(*). `pages` is the number of pages read from the file.
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from datetime import UTC, datetime
+from pathlib import Path
+
+from benchmarks.generate import PRESETS, DatabaseSpec, generate
+
+CASES = {
+    "dbinfo": ".dbinfo",
+    "tables": ".tables",
+    "count": "SELECT count(*) FROM bench",
+    "projection": "SELECT id, category, c1 FROM bench",
+    "filtered": "SELECT id, c1 FROM bench WHERE category = 'category 7'",
+    "overflow": "SELECT id, payload FROM bench",
+}
+
+
+def cases_for(spec: DatabaseSpec) -> list[str]:
+    return [case for case in CASES if case != "overflow" or spec.payload_size]
+
+
+def peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows.
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_command(parser, command: str) -> int:
+    match command:
+        case ".dbinfo":
+            parser.db_info()
+            return 1
+        case ".tables":
+            return len(parser.tables())
+    result = parser.execute(command)
+    return result if isinstance(result, int) else len(result)
+
+
+def run_case(path: Path, case: str, repeat: int) -> dict:
+    """Time one case in this process; meant to run in a fresh interpreter."""
+    from app.pager import MmapPageSource
+    from app.parser import SqliteParser
+
+    class CountingPageSource(MmapPageSource):
+        pages_read = 0
+
+        def get_page(self, page_number):
+            self.pages_read += 1
+            return super().get_page(page_number)
+
+        def read_run(self, first, count):
+            self.pages_read += count
+            return super().read_run(first, count)
+
+    command = CASES[case]
+    timings = []
+    for _ in range(repeat):
+        with CountingPageSource(path) as source:
+            started = time.perf_counter()
+            with SqliteParser(path, page_source=source) as parser:
+                rows = run_command(parser, command)
+            timings.append(time.perf_counter() - started)
+            pages = source.pages_read
+    seconds = min(timings)
+    return {
+        "case": case,
+        "command": command,
+        "seconds": seconds,
+        "mean_seconds": sum(timings) / len(timings),
+        "rows": rows,
+        "rows_per_sec": rows / seconds,
+        "pages": pages,
+        "pages_per_sec": pages / seconds,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def run_case_subprocess(path: Path, case: str, repeat: int) -> dict:
+    code = (
+        "import json, sys; from pathlib import Path;"
+        " from benchmarks.suite import run_case;"
+        " print(json.dumps(run_case(Path(sys.argv[1]), sys.argv[2], int(sys.argv[3]))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(path), case, str(repeat)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main(
+    *,
+    presets: list[str],
+    scale: float,
+    repeat: int,
+    data_dir: Path | None,
+    output: Path | None,
+):
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = data_dir or Path(directory)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        databases = []
+        results = []
+        for name in presets:
+            spec = PRESETS[name].scaled(scale)
+            path = generate(data_dir / f"{name}.db", spec)
+            databases.append({**spec.as_dict(), "file_size": path.stat().st_size})
+            for case in cases_for(spec):
+                result = run_case_subprocess(path, case, repeat)
+                results.append({"database": name, **result})
+                print(
+                    f"{name:<10} {case:<12} {result['seconds'] * 1000:10.2f} ms",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "repeat": repeat,
+        "databases": databases,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output is None:
+        print(text)
+    else:
+        output.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--preset",
+        dest="presets",
+        action="append",
+        choices=sorted(PRESETS),
+        help="database to benchmark; repeat for several, defaults to all",
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply every row count by this"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--data-dir", type=Path, help="keep the generated databases here"
+    )
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    namespace = parser.parse_args()
+    main(
+        presets=namespace.presets or list(PRESETS),
+        scale=namespace.scale,
+        repeat=namespace.repeat,
+        data_dir=namespace.data_dir,
+        output=namespace.output,
+    )